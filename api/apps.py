@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from django.core.signals import request_started
+        from api.db_metrics import count_request
+
+        request_started.connect(count_request)
@@ -0,0 +1,10 @@
+from django.db.backends.postgresql import base
+from api.db_metrics import timed_connect
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """The postgresql backend, recording connection metrics."""
+
+    def get_new_connection(self, conn_params):
+        with timed_connect():
+            return super().get_new_connection(conn_params)
@@ -0,0 +1,71 @@
+"""
+Per process database connection metrics: how many connections were
+opened and how long it took (TCP + TLS + auth handshake), and how many
+requests reused an open connection instead of waiting for a new one.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from django.db import connection
+
+
+_lock = threading.Lock()
+_metrics = {
+    "connections_opened": 0,
+    "connect_time_total": 0.0,
+    "connect_time_max": 0.0,
+    "requests": 0,
+    "requests_reusing_connection": 0,
+}
+
+
+def record_connect(seconds):
+    with _lock:
+        _metrics["connections_opened"] += 1
+        _metrics["connect_time_total"] += seconds
+        _metrics["connect_time_max"] = max(_metrics["connect_time_max"], seconds)
+
+
+def record_request(reused):
+    with _lock:
+        _metrics["requests"] += 1
+        if reused:
+            _metrics["requests_reusing_connection"] += 1
+
+
+def count_request(**kwargs):
+    # runs after close_old_connections, so an open connection here
+    # is one this request will reuse
+    record_request(reused=connection.connection is not None)
+
+
+def get_db_metrics():
+    with _lock:
+        metrics = dict(_metrics)
+
+    opened = metrics["connections_opened"]
+    requests = metrics["requests"]
+    metrics["pid"] = os.getpid()
+    metrics["connect_time_avg"] = (
+        metrics["connect_time_total"] / opened if opened else 0.0
+    )
+    metrics["reuse_rate"] = (
+        metrics["requests_reusing_connection"] / requests if requests else 0.0
+    )
+    return metrics
+
+
+def reset_db_metrics():
+    with _lock:
+        for key in _metrics:
+            _metrics[key] = 0 if isinstance(_metrics[key], int) else 0.0
+
+
+@contextmanager
+def timed_connect():
+    """Time the opening of a new database connection and record it."""
+    started = time.perf_counter()
+    yield
+    record_connect(time.perf_counter() - started)
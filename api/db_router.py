@@ -0,0 +1,78 @@
+"""
+Read replica routing. Reads go to a replica only inside a replica_reads()
+block, which the ReplicaRoutingMiddleware opens for safe-method requests
+to views tagged with replica_ok = True. The first write inside the block
+pins the rest of it to the primary, so a request always reads its own
+writes. A primary_reads() block inside it reads from the primary again.
+Everything else (other views, workers, commands) uses the primary.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+
+PRIMARY = "default"
+
+_route = ContextVar("db_route", default=None)
+
+
+class Route:
+    def __init__(self):
+        self.pinned = False
+
+
+def start_replica_reads():
+    return _route.set(Route())
+
+
+def end_replica_reads(token):
+    _route.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    token = start_replica_reads()
+    try:
+        yield
+    finally:
+        end_replica_reads(token)
+
+
+@contextmanager
+def primary_reads():
+    token = _route.set(None)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def get_replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        route = _route.get()
+        replicas = get_replicas()
+
+        if route is None or route.pinned or not replicas:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        route = _route.get()
+        if route is not None:
+            # read your writes for the rest of the request
+            route.pinned = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema through replication
+        return db == PRIMARY
@@ -0,0 +1,172 @@
+"""
+Sparse fieldsets for list and detail responses.
+
+    ?fields=id,name,instructor      only these fields
+    ?expand=instructor              embed these relations in full
+    ?fields=id,user.email           dotted names select inside a relation
+
+Once either parameter is given, nested relations that are not expanded
+are returned as their primary key (to-many relations such as images are
+left out), and the view narrows the joins, prefetches and columns of its
+queryset to the requested shape. Without them the full shape is kept.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def split_names(names):
+    """Split ["id", "user.email"] into {"id"} and {"user": ["email"]}."""
+    top, nested = set(), {}
+    for name in names:
+        head, _, rest = name.partition(".")
+        if rest:
+            nested.setdefault(head, []).append(rest)
+        else:
+            top.add(head)
+    return top, nested
+
+
+def parse_names(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def apply_fieldset(serializer, fields=None, expand=(), prefix=""):
+    """Drop the fields that were not asked for and collapse the relations."""
+    top_fields, nested_fields = split_names(fields or [])
+    top_expand, nested_expand = split_names(expand)
+
+    if fields is not None:
+        unknown = (top_fields | set(nested_fields)) - set(serializer.fields)
+        if unknown:
+            names = ", ".join(f"{prefix}{name}" for name in sorted(unknown))
+            raise ValidationError({"fields": f"Unknown field(s): {names}."})
+
+    for name in list(serializer.fields):
+        if fields is not None and name not in top_fields | set(nested_fields):
+            serializer.fields.pop(name)
+            continue
+
+        field = serializer.fields[name]
+        if not isinstance(field, serializers.BaseSerializer):
+            continue
+
+        expanded = top_expand | set(nested_expand) | set(nested_fields)
+        if name not in expanded:
+            if isinstance(field, serializers.ListSerializer):
+                serializer.fields.pop(name)
+            else:
+                source = {} if field.source == name else {"source": field.source}
+                serializer.fields[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True, **source
+                )
+            continue
+
+        child = field.child if isinstance(field, serializers.ListSerializer) else field
+        apply_fieldset(
+            child,
+            nested_fields.get(name),
+            nested_expand.get(name, ()),
+            f"{prefix}{name}.",
+        )
+
+
+def shape_queryset(queryset, serializer, extra_columns=()):
+    """
+    Narrow select_related, prefetch_related and only() to the fields the
+    serializer still renders. Columns are only restricted when every
+    rendered field maps to a model field (properties may need any column).
+    """
+    related, prefetch, columns = [], [], set(extra_columns)
+    complete = True
+
+    def walk(serializer, model, prefix):
+        nonlocal complete
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+
+            source = field.source
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                complete = False
+                continue
+
+            path = f"{prefix}{source}"
+            if model_field.one_to_many or model_field.many_to_many:
+                prefetch.append(path)
+            elif isinstance(field, serializers.BaseSerializer):
+                related.append(path)
+                columns.add(path)
+                walk(field, model_field.related_model, f"{path}__")
+            elif model_field.concrete:
+                columns.add(path)
+            else:
+                complete = False
+
+    walk(serializer, queryset.model, "")
+
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if complete:
+        queryset = queryset.only(*columns)
+    return queryset
+
+
+class SparseFieldsMixin:
+    """Serializer side: accepts fields= and expand= keyword arguments."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        expand = kwargs.pop("expand", None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None or expand is not None:
+            apply_fieldset(self, fields, expand or ())
+
+
+class SparseFieldsViewMixin:
+    """
+    View side: passes ?fields= and ?expand= to serializers using
+    SparseFieldsMixin and shapes the queryset of list and retrieve to match.
+    """
+
+    def get_fieldset(self):
+        if self.action not in ["list", "retrieve"]:
+            return None
+        fields = parse_names(self.request, "fields")
+        expand = parse_names(self.request, "expand")
+        if fields is None and expand is None:
+            return None
+        return {"fields": fields, "expand": expand or []}
+
+    def get_serializer(self, *args, **kwargs):
+        fieldset = self.get_fieldset()
+        if fieldset and issubclass(self.get_serializer_class(), SparseFieldsMixin):
+            kwargs.update(fieldset)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+
+        fieldset = self.get_fieldset()
+        if not fieldset or not issubclass(
+            self.get_serializer_class(), SparseFieldsMixin
+        ):
+            return queryset
+
+        serializer = self.get_serializer_class()(
+            context=self.get_serializer_context(), **fieldset
+        )
+        ordering = getattr(self, "keyset_ordering", ())
+        return shape_queryset(
+            queryset, serializer, [field.lstrip("-") for field in ordering]
+        )
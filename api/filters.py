@@ -0,0 +1,17 @@
+from django_filters import DateFromToRangeFilter
+from api.utils import datetime_range_filter
+
+
+class DayRangeFilter(DateFromToRangeFilter):
+    """
+    ?<name>_after=YYYY-MM-DD&?<name>_before=YYYY-MM-DD on a DateTimeField,
+    both days included, compared against day boundaries so the index on
+    the column is used.
+    """
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return qs.filter(
+            **datetime_range_filter(self.field_name, value.start, value.stop)
+        )
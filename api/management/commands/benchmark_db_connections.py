@@ -0,0 +1,69 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the latency of an API request with a new database connection "
+        "per request and with a reused (persistent) connection"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default="/api/v1/memberships/",
+            help="Request path to benchmark (an anonymous GET)",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Requests per mode"
+        )
+
+    def run(self, client, path, requests, conn_max_age):
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = conn_max_age
+
+        timings = []
+        for _ in range(requests):
+            # what the request_started/request_finished handlers do in a
+            # real worker (the test client leaves the connection alone)
+            close_old_connections()
+            started = time.perf_counter()
+            client.get(path)
+            timings.append((time.perf_counter() - started) * 1000)
+            close_old_connections()
+
+        timings.sort()
+        return {
+            "mean": statistics.mean(timings),
+            "p50": timings[len(timings) // 2],
+            "p95": timings[int(len(timings) * 0.95) - 1],
+        }
+
+    def handle(self, *args, **options):
+        conn_max_age = connection.settings_dict["CONN_MAX_AGE"]
+        client = Client()
+
+        try:
+            with override_settings(ALLOWED_HOSTS=["*"]):
+                results = {
+                    "new connection per request": self.run(
+                        client, options["path"], options["requests"], 0
+                    ),
+                    "reused connection": self.run(
+                        client, options["path"], options["requests"], None
+                    ),
+                }
+        finally:
+            connection.close()
+            connection.settings_dict["CONN_MAX_AGE"] = conn_max_age
+
+        self.stdout.write(f"GET {options['path']}, {options['requests']} requests")
+        for mode, timing in results.items():
+            self.stdout.write(
+                f"{mode:<28} mean {timing['mean']:7.2f} ms   "
+                f"p50 {timing['p50']:7.2f} ms   p95 {timing['p95']:7.2f} ms"
+            )
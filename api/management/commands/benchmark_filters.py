@@ -0,0 +1,131 @@
+import json
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from api.search import IndexedSearchFilter
+from classes.views import BookingViewSet, AttendanceViewSet
+from plans.views import MembershipViewSet, SubscriptionViewSet, PaymentViewSet
+
+
+class SearchView:
+    """Stands in for a viewset, the search backends only read search_fields."""
+
+    def __init__(self, search_fields):
+        self.search_fields = search_fields
+
+
+def cases():
+    """
+    (name, viewset, search_fields before the FilterSets, ?search=, filter
+    params): the same question asked through free-text search and through
+    the FilterSet of the viewset.
+    """
+    return [
+        (
+            "active subscriptions",
+            SubscriptionViewSet,
+            ["user__email", "membership__name", "status"],
+            "ACTIVE",
+            {"status": "ACTIVE"},
+        ),
+        (
+            "booked bookings",
+            BookingViewSet,
+            ["user__email", "fitness_class__name", "status"],
+            "BOOKED",
+            {"status": "BOOKED"},
+        ),
+        (
+            "present attendance",
+            AttendanceViewSet,
+            ["user__email", "fitness_class__name", "status"],
+            "PRESENT",
+            {"status": "PRESENT"},
+        ),
+        (
+            "completed payments",
+            PaymentViewSet,
+            ["user__email", "amount", "status"],
+            "COMPLETED",
+            {"status": "COMPLETED"},
+        ),
+        (
+            "monthly memberships",
+            MembershipViewSet,
+            ["name", "price", "duration"],
+            "MONTHLY",
+            {"duration": "MONTHLY"},
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the cost of filtering the list endpoints with the FilterSets "
+        "against free-text search (SearchFilter and the indexed search)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=50, help="Queries per path"
+        )
+        parser.add_argument(
+            "--limit", type=int, default=20, help="Rows fetched per query (a page)"
+        )
+
+    def run(self, queryset, iterations, limit):
+        queryset = queryset.order_by("-pk")[:limit]
+
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            # a fresh clone each time, the result cache would skip the query
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        result = {
+            "mean": statistics.mean(timings),
+            "p95": timings[max(int(len(timings) * 0.95) - 1, 0)],
+            "cost": None,
+        }
+        if connection.vendor == "postgresql":
+            plan = json.loads(queryset.explain(format="json"))
+            if isinstance(plan, list):
+                plan = plan[0]
+            result["cost"] = plan["Plan"]["Total Cost"]
+        return result
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        iterations, limit = options["iterations"], options["limit"]
+
+        for name, viewset, search_fields, term, params in cases():
+            request = Request(factory.get("/", {"search": term}))
+            filterset = viewset.filterset_class
+            model = filterset._meta.model
+            queryset = model.objects.all()
+            query = "&".join(f"{key}={value}" for key, value in params.items())
+
+            paths = {
+                f"search={term} (SearchFilter)": SearchFilter().filter_queryset(
+                    request, queryset, SearchView(search_fields)
+                ),
+                f"search={term} (indexed)": IndexedSearchFilter().filter_queryset(
+                    request, queryset, viewset
+                ),
+                f"filter {query}": filterset(params, queryset=queryset).qs,
+            }
+
+            self.stdout.write(f"{name} ({model.objects.count()} rows)")
+            for path, path_queryset in paths.items():
+                timing = self.run(path_queryset, iterations, limit)
+                cost = "" if timing["cost"] is None else f"   cost {timing['cost']:.2f}"
+                self.stdout.write(
+                    f"  {path:<42} mean {timing['mean']:7.2f} ms   "
+                    f"p95 {timing['p95']:7.2f} ms{cost}"
+                )
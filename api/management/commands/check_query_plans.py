@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from api.query_plans import explain, hot_queries
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the main queries of the viewsets and fail if one of them "
+        "reads its table with a sequential scan (Postgres only)"
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write("Query plans are only checked on Postgres, skipped.")
+            return
+
+        failures = []
+        for name, table, queryset in hot_queries():
+            plan = explain(queryset)
+
+            if f"Seq Scan on {table}" in plan:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"SEQ SCAN  {name}"))
+                self.stdout.write(plan)
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok        {name}"))
+
+        if failures:
+            raise CommandError(
+                f"{len(failures)} queries regressed to a sequential scan: "
+                + ", ".join(failures)
+            )
@@ -0,0 +1,29 @@
+from rest_framework.permissions import SAFE_METHODS
+from api.db_router import start_replica_reads, end_replica_reads
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let safe-method requests to views tagged with replica_ok = True (the
+    view class, for DRF views) read from a replica, see api/db_router.py.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._replica_token = None
+        try:
+            return self.get_response(request)
+        finally:
+            if request._replica_token is not None:
+                end_replica_reads(request._replica_token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS:
+            return None
+
+        view_class = getattr(view_func, "cls", None)
+        if getattr(view_class or view_func, "replica_ok", False):
+            request._replica_token = start_replica_reads()
+        return None
@@ -0,0 +1,185 @@
+"""
+Keyset pagination on a (timestamp, id) ordering. The cursor holds the
+values of the last (or first) row of a page, so the next page is an index
+range scan starting right after it: deep pages cost the same as the
+first one, there is no OFFSET and no COUNT(*). Views pick their ordering
+with keyset_ordering, e.g. ("-booking_date", "-id"); the last field must
+be unique. The cursor also records its ordering, a cursor of another
+ordering (e.g. of a ranked search) is rejected.
+"""
+
+import datetime
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from api.search import RANK_FIELD
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # keep the microseconds, a cursor truncated to milliseconds would
+    # land before its own row
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def estimate_count(queryset):
+    """
+    Row estimate of the planner on Postgres (no table scan), an exact
+    count on other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    plan = json.loads(queryset.explain(format="json"))
+    if isinstance(plan, list):
+        plan = plan[0]
+    return int(plan["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-id",)
+    total_query_param = "include_total"
+
+    def get_ordering(self, request, queryset, view):
+        # ranked search results page on the rank (see api/search.py)
+        if RANK_FIELD in queryset.query.annotations:
+            return (f"-{RANK_FIELD}", "-id")
+        return tuple(getattr(view, "keyset_ordering", self.ordering))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [field.lstrip("-") for field in self.ordering]
+
+        cursor = self.decode_cursor(request, queryset)
+        reverse, values = cursor if cursor else (False, None)
+
+        self.estimated_total = None
+        if request.query_params.get(self.total_query_param) and request.user.is_staff:
+            self.estimated_total = estimate_count(queryset)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert(field) for field in ordering]
+
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.after(ordering, values))
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else True
+        self.has_previous = values is not None if not reverse else has_more
+        return rows
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    def after(self, ordering, values):
+        """
+        Rows after the cursor: (a, b) > (x, y) as a AND b, written with a
+        bound on the first field alone so the index range is used.
+        """
+        lookups = [
+            (field.lstrip("-"), "lt" if field.startswith("-") else "gt")
+            for field in ordering
+        ]
+
+        condition = Q(**{f"{lookups[-1][0]}__{lookups[-1][1]}": values[-1]})
+        for (field, lookup), value in zip(lookups[-2::-1], values[-2::-1]):
+            condition = Q(**{f"{field}__{lookup}": value}) | (
+                Q(**{field: value}) & condition
+            )
+
+        field, lookup = lookups[0]
+        return Q(**{f"{field}__{lookup}e": values[0]}) & condition
+
+    def row_values(self, row):
+        if isinstance(row, dict):
+            return [row[field] for field in self.fields]
+        return [getattr(row, field) for field in self.fields]
+
+    def output_field(self, queryset, name):
+        """Model field (or annotation output field) of an ordering field."""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, reverse, values):
+        data = json.dumps(
+            {"o": list(self.ordering), "r": int(reverse), "v": values},
+            cls=CursorEncoder,
+        )
+        cursor = b64encode(data.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            data = json.loads(b64decode(encoded.encode()).decode())
+            ordering, reverse, values = data["o"], bool(data["r"]), data["v"]
+        except (TypeError, ValueError, KeyError, BinasciiError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if ordering != list(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+
+        # the JSON values back to the types of their fields, a value that
+        # doesn't convert would otherwise fail in the database
+        try:
+            values = [
+                self.output_field(queryset, field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, values
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.row_values(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(True, self.row_values(self.page[0]))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict(
+            [("next", self.get_next_link()), ("previous", self.get_previous_link())]
+        )
+        if self.estimated_total is not None:
+            response["estimated_total"] = self.estimated_total
+        response["results"] = data
+        return Response(response)
@@ -0,0 +1,135 @@
+"""
+SQL instrumentation: count the queries of a block of code, their total
+time and the statements that were run more than once with the same
+shape (the usual sign of an N+1). Used by QueryBudgetMiddleware for every
+request and by assert_max_queries in tests.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger("api.queries")
+
+# "IN (%s, %s, %s)" has the same shape whatever the number of values
+IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[IN_LIST.sub("IN (...)", sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Number of queries that repeated an earlier statement shape."""
+        return sum(count - 1 for count in self.shapes.values() if count > 1)
+
+    def describe(self):
+        text = f"{self.count} queries, {self.duplicates} repeated"
+        shape, count = self.shapes.most_common(1)[0] if self.shapes else ("", 0)
+        if count > 1:
+            text += f" (most often, {count} times: {shape})"
+        return text
+
+
+@contextmanager
+def record_queries():
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+def get_budget(endpoint, method):
+    """Budget of a url name for one HTTP method, e.g. "bookings-list:GET"."""
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    return budgets.get(
+        f"{endpoint}:{method}", getattr(settings, "DEFAULT_QUERY_BUDGET", None)
+    )
+
+
+@contextmanager
+def assert_max_queries(budget):
+    """
+    Test helper: fail when the block runs more than `budget` queries,
+    showing the most repeated statement.
+    """
+    with record_queries() as recorder:
+        yield recorder
+    if recorder.count > budget:
+        raise AssertionError(f"The budget is {budget}: {recorder.describe()}")
+
+
+class QueryBudgetMiddleware:
+    """
+    Record the SQL of every request and report it as X-Query-* response
+    headers (when QUERY_INSTRUMENTATION_HEADERS is on) and as a log line
+    on the "api.queries" logger. Endpoints (url name and method) over their
+    budget in QUERY_BUDGETS are logged as warnings, or fail the request when
+    QUERY_BUDGET_RAISE is on (tests).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        endpoint = match.url_name if match and match.url_name else request.path
+        budget = get_budget(endpoint, request.method)
+        stats = {
+            "endpoint": endpoint,
+            "method": request.method,
+            "status": response.status_code,
+            "queries": recorder.count,
+            "query_time_ms": round(recorder.duration * 1000, 2),
+            "duplicate_queries": recorder.duplicates,
+            "query_budget": budget,
+        }
+
+        if getattr(settings, "QUERY_INSTRUMENTATION_HEADERS", False):
+            response["X-Query-Count"] = str(recorder.count)
+            response["X-Query-Time-Ms"] = str(stats["query_time_ms"])
+            response["X-Query-Duplicates"] = str(recorder.duplicates)
+
+        if budget is not None and recorder.count > budget:
+            message = (
+                f"{request.method} {endpoint} is over its budget of {budget} "
+                f"queries: {recorder.describe()}"
+            )
+            if getattr(settings, "QUERY_BUDGET_RAISE", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra=stats)
+        else:
+            logger.info(
+                "%s %s ran %s queries",
+                request.method,
+                endpoint,
+                recorder.count,
+                extra=stats,
+            )
+
+        return response
@@ -0,0 +1,149 @@
+"""
+The main queries of the viewsets, checked by the check_query_plans
+command and by the api tests on Postgres. Each entry is a (name, table,
+queryset) tuple; the plan of the query must not read the table with a
+sequential scan.
+"""
+
+from datetime import timedelta
+from django.db import connections, transaction
+from django.utils import timezone
+from classes.models import FitnessClass, Booking, Attendance, Waitlist
+from classes.attendance import class_roster
+from classes.scheduling import overlapping_classes
+from classes.views import FitnessClassViewSet, BookingViewSet
+from plans.models import Membership, Subscription, Payment
+from plans.views import MembershipViewSet
+from reviews.models import Feedback
+from api.search import IndexedSearchFilter
+from api.utils import datetime_range_filter
+
+
+def explain(queryset):
+    """EXPLAIN a queryset with sequential scans disabled for its transaction."""
+    with transaction.atomic(using=queryset.db):
+        with connections[queryset.db].cursor() as cursor:
+            # small dev tables are cheaper to scan than to index, so
+            # make the planner use an index whenever there is one
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+
+def search(viewset, queryset, term):
+    """The ?search= query of a viewset, as IndexedSearchFilter builds it."""
+    return IndexedSearchFilter().search(queryset, viewset.search_fields, [term])
+
+
+def hot_queries():
+    today = timezone.now().date()
+    now = timezone.now()
+    week = datetime_range_filter("payment_date", today - timedelta(days=7), today)
+
+    return [
+        (
+            "member bookings",
+            "classes_booking",
+            Booking.objects.select_related("user", "fitness_class").filter(user_id=1),
+        ),
+        (
+            "active booking of a member",
+            "classes_booking",
+            Booking.objects.filter(user_id=1, fitness_class_id=1).exclude(
+                status="CANCELLED"
+            ),
+        ),
+        (
+            "booked members of a class",
+            "classes_booking",
+            Booking.objects.filter(fitness_class_id=1, status="BOOKED"),
+        ),
+        (
+            "booking history page",
+            "classes_booking",
+            Booking.objects.filter(user_id=1).order_by("-booking_date", "-id")[:21],
+        ),
+        ("class roster", "classes_booking", class_roster(1)),
+        (
+            "timetable",
+            "classes_fitnessclass",
+            FitnessClass.objects.filter(
+                schedule__gte=today, schedule__lte=today + timedelta(days=6)
+            ),
+        ),
+        (
+            "instructor overlaps",
+            "classes_fitnessclass",
+            overlapping_classes(1, now, now + timedelta(hours=1)),
+        ),
+        (
+            "finished classes to close",
+            "classes_fitnessclass",
+            FitnessClass.objects.filter(attendance_closed=False, schedule__lt=today),
+        ),
+        (
+            "member attendance",
+            "classes_attendance",
+            Attendance.objects.filter(user_id=1),
+        ),
+        (
+            "class attendance of a day",
+            "classes_attendance",
+            Attendance.objects.filter(fitness_class_id=1, date=today),
+        ),
+        (
+            "waitlist head",
+            "classes_waitlist",
+            Waitlist.objects.filter(fitness_class_id=1).order_by("position")[:1],
+        ),
+        (
+            "member subscriptions",
+            "plans_subscription",
+            Subscription.objects.filter(user_id=1),
+        ),
+        (
+            "active subscription check",
+            "plans_subscription",
+            Subscription.objects.filter(user_id=1, membership_id=1, status="ACTIVE"),
+        ),
+        (
+            "inactive subscriptions (staff)",
+            "plans_subscription",
+            Subscription.objects.filter(status__in=["CANCELLED", "EXPIRED"]),
+        ),
+        ("member payments", "plans_payment", Payment.objects.filter(user_id=1)),
+        (
+            "payment history page",
+            "plans_payment",
+            Payment.objects.filter(user_id=1).order_by("-payment_date", "-id")[:21],
+        ),
+        (
+            "completed payments of a week",
+            "plans_payment",
+            Payment.objects.filter(status="COMPLETED", **week),
+        ),
+        (
+            "class feedback",
+            "reviews_feedback",
+            Feedback.objects.filter(fitness_class_id=1).order_by("-created_at"),
+        ),
+        (
+            "member feedback",
+            "reviews_feedback",
+            Feedback.objects.filter(user_id=1),
+        ),
+        (
+            "class search, ranked full-text",
+            "classes_fitnessclass",
+            search(FitnessClassViewSet, FitnessClass.objects.all(), "yoga"),
+        ),
+        (
+            "membership search, trigram on name",
+            "plans_membership",
+            search(MembershipViewSet, Membership.objects.all(), "gold"),
+        ),
+        (
+            "booking search, trigram on member email",
+            "users_user",
+            search(BookingViewSet, Booking.objects.all(), "member@"),
+        ),
+    ]
@@ -0,0 +1,58 @@
+import csv
+import gzip
+import io
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline delimited JSON. Streamed exports build their own
+    StreamingHttpResponse, this renderer only has to handle the
+    regular (error) responses for ?format=ndjson requests.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return (json.dumps(data, cls=DjangoJSONEncoder) + "\n").encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV exports are streamed by the views, this renderer only has to
+    handle the regular (error) responses for ?format=csv requests.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if not isinstance(data, dict):
+            data = {"detail": data}
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for key, value in data.items():
+            writer.writerow([key, value])
+        return buffer.getvalue().encode(self.charset)
+
+
+class GzipCSVRenderer(CSVRenderer):
+    media_type = "application/gzip"
+    format = "csv.gz"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return gzip.compress(super().render(data, accepted_media_type, renderer_context))
+
+
+# formats answered with a streamed file instead of a serialized Response
+EXPORT_FORMATS = [NDJSONRenderer.format, CSVRenderer.format, GzipCSVRenderer.format]
@@ -0,0 +1,95 @@
+"""
+Index backed replacement for SearchFilter. search_fields use the same
+prefixes:
+
+    "@name"          full-text, ranked (GIN index on the tsvector)
+    "user__email"    substring (trigram GIN index on UPPER(email))
+    "=status"        exact (case-insensitive for text, typed otherwise)
+    "^name"          prefix
+
+Related fields are matched in a subquery on their own table, where the
+trigram index applies, instead of a join per search field. On Postgres
+the full-text fields are ranked and results come best match first; on
+other databases (SQLite in development) "@" fields fall back to a
+substring match, so the same requests keep working, without a rank.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import CharField, FloatField, Q, TextField
+from django.db.models.functions import Cast
+from rest_framework.filters import SearchFilter
+
+
+SEARCH_CONFIG = "english"
+RANK_FIELD = "search_rank"
+
+
+def is_postgres(queryset):
+    return connections[queryset.db].vendor == "postgresql"
+
+
+class IndexedSearchFilter(SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        return self.search(queryset, search_fields, search_terms)
+
+    def search(self, queryset, search_fields, search_terms):
+        """The search of filter_queryset, without a request (query plans)."""
+        if not search_fields or not search_terms:
+            return queryset
+
+        postgres = is_postgres(queryset)
+        text_fields = [field[1:] for field in search_fields if field[0] == "@"]
+        other_fields = [field for field in search_fields if field[0] != "@"]
+
+        vector = None
+        if text_fields and postgres:
+            vector = SearchVector(*text_fields, config=SEARCH_CONFIG)
+            queryset = queryset.alias(search_vector=vector)
+        elif text_fields:
+            other_fields += text_fields
+
+        # every term has to match one of the fields
+        for term in search_terms:
+            condition = Q()
+            if vector is not None:
+                condition |= Q(search_vector=SearchQuery(term, config=SEARCH_CONFIG))
+            for field in other_fields:
+                condition |= self.match(queryset.model, field, term)
+            queryset = queryset.filter(condition)
+
+        if vector is not None:
+            query = SearchQuery(" ".join(search_terms), config=SEARCH_CONFIG)
+            queryset = queryset.annotate(
+                **{RANK_FIELD: Cast(SearchRank(vector, query), FloatField())}
+            ).order_by(f"-{RANK_FIELD}", "-id")
+        return queryset
+
+    def match(self, model, field, term):
+        prefix = field[0] if field[0] in "^=" else ""
+        relation, _, rest = field[len(prefix) :].partition("__")
+        model_field = model._meta.get_field(relation)
+
+        # a subquery on the related table can use that table's index
+        if rest and model_field.many_to_one:
+            related = model_field.related_model
+            matches = related.objects.filter(
+                self.match(related, f"{prefix}{rest}", term)
+            )
+            return Q(**{f"{relation}__in": matches.values("pk")})
+
+        path = field[len(prefix) :]
+        if prefix == "^":
+            return Q(**{f"{path}__istartswith": term})
+        if prefix == "=":
+            if isinstance(model_field, (CharField, TextField)):
+                return Q(**{f"{path}__iexact": term})
+            try:
+                return Q(**{path: model_field.to_python(term)})
+            except ValidationError:
+                # e.g. a word searched against a price, it can't match
+                return Q(pk__in=[])
+        return Q(**{f"{path}__icontains": term})
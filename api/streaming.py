@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+import zlib
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+# rows fetched per round trip when iterating a server side cursor
+STREAM_CHUNK_SIZE = 2000
+
+# size of the CSV text buffered before it is sent (or compressed)
+CSV_FLUSH_SIZE = 64 * 1024
+
+
+def iter_rows(queryset, fields, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Iterate a queryset as plain dicts without building model instances.
+    On PostgreSQL .iterator() reads through a server side cursor, so
+    only one chunk is held in memory at a time.
+    """
+    return queryset.values(*fields).iterator(chunk_size=chunk_size)
+
+
+def stream_ndjson(rows, filename=None):
+    def generate():
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+    response = StreamingHttpResponse(generate(), content_type="application/x-ndjson")
+    if filename:
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def serializer_columns(serializer_class):
+    """(header, row key) pairs taken from a report serializer's fields."""
+    return [
+        (name, field.source or name)
+        for name, field in serializer_class().fields.items()
+    ]
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_csv(rows, columns, filename, compress=False):
+    """
+    Stream rows (dicts) as a CSV file, optionally gzip compressed.
+    columns is a list of (header, row key) pairs or plain row keys.
+    """
+    columns = [
+        column if isinstance(column, tuple) else (column, column)
+        for column in columns
+    ]
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([header for header, _ in columns])
+
+        for row in rows:
+            writer.writerow([row[key] for _, key in columns])
+            if buffer.tell() >= CSV_FLUSH_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    if compress:
+        response = StreamingHttpResponse(
+            gzip_chunks(generate()), content_type="application/gzip"
+        )
+        filename = f"{filename}.csv.gz"
+    else:
+        response = StreamingHttpResponse(
+            generate(), content_type="text/csv; charset=utf-8"
+        )
+        filename = f"{filename}.csv"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -1,3 +1,397 @@
-from django.test import TestCase
+import json
+import os
+import runpy
+import tempfile
+from base64 import b64encode
+from datetime import timedelta
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections
+from django.db.backends.sqlite3 import base as sqlite3
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from classes.models import FitnessClass, FitnessClassImage, Booking, Attendance
+from plans.models import Membership, MembershipImage, Subscription, Payment
+from reviews.models import Feedback
+from reports.cache import get_or_compute
+from api.db_metrics import count_request, get_db_metrics, reset_db_metrics
+from api.db_router import replica_reads
+from api.query_budget import QueryBudgetExceeded, assert_max_queries, get_budget
+from api.query_plans import explain, hot_queries
+
+User = get_user_model()
+
 
 # Create your tests here.
+
+
+@skipUnless(connection.vendor == "postgresql", "query plans are checked on Postgres")
+class QueryPlanTests(TestCase):
+    def test_hot_queries_read_their_table_through_an_index(self):
+        for name, table, queryset in hot_queries():
+            with self.subTest(name):
+                self.assertNotIn(f"Seq Scan on {table}", explain(queryset))
+
+
+class HotQueriesTests(TestCase):
+    def test_hot_queries_run(self):
+        for name, table, queryset in hot_queries():
+            with self.subTest(name):
+                self.assertEqual(list(queryset), [])
+
+
+class DatabaseMetricsTests(TestCase):
+    def setUp(self):
+        reset_db_metrics()
+        self.addCleanup(reset_db_metrics)
+        self.client = APIClient()
+
+    def test_requests_on_an_open_connection_count_as_reused(self):
+        connection.ensure_connection()
+        count_request()
+        with mock.patch("api.db_metrics.connection", mock.Mock(connection=None)):
+            count_request()
+
+        metrics = get_db_metrics()
+        self.assertEqual(metrics["requests"], 2)
+        self.assertEqual(metrics["requests_reusing_connection"], 1)
+        self.assertEqual(metrics["reuse_rate"], 0.5)
+
+    def test_every_request_is_counted(self):
+        admin = User.objects.create_superuser("admin@x.com", "pw")
+        self.client.force_authenticate(admin)
+
+        self.client.get("/api/v1/db-metrics/")
+        response = self.client.get("/api/v1/db-metrics/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["mode"], settings.DB_POOL_MODE)
+        self.assertEqual(response.data["requests"], 2)
+
+    def test_metrics_are_admin_only(self):
+        response = self.client.get("/api/v1/db-metrics/")
+        self.assertEqual(response.status_code, 401)
+
+        self.client.force_authenticate(User.objects.create_user("m@x.com", "pw"))
+        response = self.client.get("/api/v1/db-metrics/")
+        self.assertEqual(response.status_code, 403)
+
+    def test_unknown_pool_mode_is_refused(self):
+        with mock.patch.dict(os.environ, {"DB_POOL_MODE": "pooled"}):
+            with self.assertRaisesMessage(ImproperlyConfigured, "DB_POOL_MODE"):
+                runpy.run_path(settings.BASE_DIR / "iron_temple" / "settings.py")
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # the replica is a second, in-memory SQLite database with its own
+        # membership rows, so the rows returned show where a read went
+        cls.replica = sqlite3.DatabaseWrapper(
+            {
+                **connections["default"].settings_dict,
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": ":memory:",
+                "OPTIONS": {},
+            },
+            alias="replica",
+        )
+        connections["replica"] = cls.replica
+        with cls.replica.schema_editor() as editor:
+            editor.create_model(Membership)
+            editor.create_model(MembershipImage)
+        Membership.objects.using("replica").create(
+            name="Replica", price=30, duration="MONTHLY"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.replica.close()
+        del connections["replica"]
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user("member@x.com", "pw")
+        Membership.objects.create(name="Primary", price=30, duration="MONTHLY")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def names(self):
+        return list(Membership.objects.values_list("name", flat=True))
+
+    def test_tagged_gets_read_a_replica(self):
+        response = self.client.get("/api/v1/memberships/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [membership["name"] for membership in response.data["results"]],
+            ["Replica"],
+        )
+
+    def test_untagged_requests_read_the_primary(self):
+        with CaptureQueriesContext(self.replica) as replica_queries:
+            response = self.client.get("/api/v1/subscriptions/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(replica_queries), 0)
+        self.assertEqual(self.names(), ["Primary"])
+
+    def test_writes_pin_the_rest_of_the_block_to_the_primary(self):
+        with replica_reads():
+            self.assertEqual(self.names(), ["Replica"])
+
+            Membership.objects.create(name="New", price=10, duration="WEEKLY")
+
+            self.assertEqual(self.names(), ["Primary", "New"])
+        self.assertEqual(Membership.objects.using("replica").count(), 1)
+
+    def test_cached_reports_are_computed_on_the_primary(self):
+        with replica_reads():
+            # not cached with the process local cache of the tests
+            self.assertEqual(
+                get_or_compute("Names", [Membership], {}, self.names), ["Replica"]
+            )
+
+            with tempfile.TemporaryDirectory() as location:
+                shared = {
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                        "LOCATION": location,
+                    }
+                }
+                with override_settings(CACHES=shared):
+                    self.assertEqual(
+                        get_or_compute("Names", [Membership], {}, self.names),
+                        ["Primary"],
+                    )
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.member = User.objects.create_user("member@x.com", "pw")
+        self.classes = [
+            FitnessClass.objects.create(
+                name=f"Class {number}",
+                description="Class",
+                instructor=instructor,
+                schedule=timezone.now().date() + timedelta(days=number + 1),
+                duration=60,
+                capacity=10,
+            )
+            for number in range(4)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    @override_settings(QUERY_BUDGETS={"bookings-list:GET": 4}, DEFAULT_QUERY_BUDGET=30)
+    def test_budgets_are_per_method(self):
+        self.assertEqual(get_budget("bookings-list", "GET"), 4)
+        self.assertEqual(get_budget("bookings-list", "POST"), 30)
+
+    def test_member_booking_list_is_within_its_budget(self):
+        for fitness_class in self.classes:
+            Booking.objects.create(user=self.member, fitness_class=fitness_class)
+
+        with assert_max_queries(settings.QUERY_BUDGETS["bookings-list:GET"]):
+            response = self.client.get("/api/v1/bookings/")
+        self.assertEqual(len(response.data["results"]), len(self.classes))
+
+    @override_settings(QUERY_BUDGETS={"bookings-list:GET": 0}, QUERY_BUDGET_RAISE=True)
+    def test_only_the_budget_of_the_method_applies(self):
+        response = self.client.post(
+            "/api/v1/bookings/", {"fitness_class_id": self.classes[0].pk}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get("/api/v1/bookings/")
+
+    def test_assert_max_queries_fails_over_budget(self):
+        with self.assertRaises(AssertionError):
+            with assert_max_queries(1):
+                User.objects.count()
+                User.objects.count()
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class QueryBudgetWalkTests(TestCase):
+    """Every budgeted endpoint, with a few rows of everything it shows."""
+
+    def setUp(self):
+        instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.admin = User.objects.create_superuser("admin@x.com", "pw")
+        self.members = [
+            User.objects.create_user(f"member{number}@x.com", "pw")
+            for number in range(3)
+        ]
+        today = timezone.now().date()
+        self.classes = [
+            FitnessClass.objects.create(
+                name=f"Class {number}",
+                description="Class",
+                instructor=instructor,
+                schedule=today + timedelta(days=number + 1),
+                duration=60,
+                capacity=10,
+            )
+            for number in range(3)
+        ]
+        self.spare_classes = [
+            FitnessClass.objects.create(
+                name=f"Spare {number}",
+                description="Class",
+                instructor=instructor,
+                schedule=today + timedelta(days=10 + number),
+                duration=60,
+                capacity=10,
+            )
+            for number in range(3)
+        ]
+        for fitness_class in self.classes:
+            FitnessClassImage.objects.create(fitness_class=fitness_class, image="x")
+            for member in self.members:
+                Booking.objects.create(user=member, fitness_class=fitness_class)
+                Attendance.objects.create(
+                    user=member,
+                    fitness_class=fitness_class,
+                    date=fitness_class.schedule,
+                    status="PRESENT",
+                )
+                Feedback.objects.create(
+                    user=member, fitness_class=fitness_class, ratings=4, comment="Ok"
+                )
+        for number, member in enumerate(self.members):
+            membership = Membership.objects.create(
+                name=f"Plan {number}", price=30, duration="MONTHLY"
+            )
+            MembershipImage.objects.create(membership=membership, image="x")
+            subscription = Subscription.objects.create(
+                user=member,
+                membership=membership,
+                start_date=today,
+                end_date=today + timedelta(days=30),
+                status="ACTIVE",
+            )
+            Payment.objects.create(
+                user=member, subscription=subscription, amount=30, status="COMPLETED"
+            )
+        self.client = APIClient()
+
+    def requests(self):
+        fitness_class = self.classes[0]
+        window = f"from={self.classes[0].schedule}&to={self.classes[-1].schedule}"
+        return {
+            "fitness-classes-list:GET": ("get", "/api/v1/fitness-classes/"),
+            "fitness-classes-detail:GET": (
+                "get",
+                f"/api/v1/fitness-classes/{fitness_class.pk}/",
+            ),
+            "fitness-classes-timetable:GET": (
+                "get",
+                f"/api/v1/fitness-classes/timetable/?{window}",
+            ),
+            "fitness-classes-roster:GET": (
+                "get",
+                f"/api/v1/fitness-classes/{fitness_class.pk}/roster/",
+            ),
+            "memberships-list:GET": ("get", "/api/v1/memberships/"),
+            "bookings-list:GET": ("get", "/api/v1/bookings/"),
+            "bookings-bulk:POST": ("post", "/api/v1/bookings/bulk/"),
+            "attendance-list:GET": ("get", "/api/v1/attendance/"),
+            "feedback-list:GET": ("get", "/api/v1/feedback/"),
+            "subscriptions-list:GET": ("get", "/api/v1/subscriptions/"),
+            "payments-list:GET": ("get", "/api/v1/payments/"),
+        }
+
+    def test_every_budgeted_endpoint_is_within_its_budget(self):
+        requests = self.requests()
+        # a new budget needs a request here
+        self.assertEqual(set(requests), set(settings.QUERY_BUDGETS))
+
+        for endpoint, (method, url) in requests.items():
+            with self.subTest(endpoint):
+                if method == "post":
+                    self.client.force_authenticate(self.members[0])
+                    data = {
+                        "fitness_class_ids": [
+                            fitness_class.pk for fitness_class in self.spare_classes
+                        ]
+                    }
+                    response = self.client.post(url, data, format="json")
+                else:
+                    self.client.force_authenticate(self.admin)
+                    response = self.client.get(url)
+
+                self.assertLess(response.status_code, 400, response.data)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.member = User.objects.create_user("member@x.com", "pw")
+        for number in range(5):
+            fitness_class = FitnessClass.objects.create(
+                name=f"Class {number}",
+                description="Class",
+                instructor=instructor,
+                schedule=timezone.now().date() + timedelta(days=number + 1),
+                duration=60,
+                capacity=10,
+            )
+            Booking.objects.create(user=self.member, fitness_class=fitness_class)
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def cursor(self, data):
+        return b64encode(json.dumps(data).encode()).decode()
+
+    def test_next_and_previous_links_walk_every_row_once(self):
+        expected = list(
+            Booking.objects.order_by("-booking_date", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        pages = []
+        url = "/api/v1/bookings/?page_size=2"
+        while url:
+            response = self.client.get(url)
+            pages.append([booking["id"] for booking in response.data["results"]])
+            url = response.data["next"]
+
+        self.assertEqual(pages, [expected[:2], expected[2:4], expected[4:]])
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(
+            [booking["id"] for booking in response.data["results"]], expected[2:4]
+        )
+
+    def test_malformed_cursors_are_not_found(self):
+        ordering = ["-booking_date", "-id"]
+        for cursor in [
+            "not base64",
+            self.cursor({"r": 0, "v": ["garbage", 1]}),
+            self.cursor({"o": ordering, "r": 0, "v": ["garbage", 1]}),
+            self.cursor({"o": ordering, "r": 0, "v": [None, 1]}),
+            self.cursor({"o": ordering, "r": 0, "v": [[1], 1]}),
+        ]:
+            with self.subTest(cursor):
+                response = self.client.get("/api/v1/bookings/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_cursor_of_another_ordering_is_not_found(self):
+        # the cursor of a ranked search, reused without ?search=
+        cursor = self.cursor({"o": ["-search_rank", "-id"], "r": 0, "v": [0.5, 3]})
+
+        response = self.client.get("/api/v1/bookings/", {"cursor": cursor})
+
+        self.assertEqual(response.status_code, 404)
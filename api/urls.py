@@ -5,6 +5,8 @@ from classes.views import (
     BookingViewSet,
     AttendanceViewSet,
     FitenessClassImageViewSet,
+    ClassSeriesViewSet,
+    SeriesExceptionViewSet,
 )
 from plans.views import (
     MembershipViewSet,
@@ -19,12 +21,14 @@ from plans.views import (
     HasSubscribedMembership,
 )
 from reviews.views import FeedbackViewSet
-from reports.views import ReportViewSet
+from reports.views import ReportViewSet, ReportJobViewSet
+from api.views import DatabaseMetricsView
 
 
 router = routers.DefaultRouter()
 
 router.register("fitness-classes", FitnessClassViewSet, basename="fitness-classes")
+router.register("class-series", ClassSeriesViewSet, basename="class-series")
 router.register("memberships", MembershipViewSet, basename="memberships")
 router.register("subscriptions", SubscriptionViewSet, basename="subscriptions")
 router.register("bookings", BookingViewSet, basename="bookings")
@@ -33,6 +37,7 @@ router.register("payments", PaymentViewSet, basename="payments")
 router.register("payment-reports", PaymentReportViewSet, basename="payment-reports")
 router.register("feedback", FeedbackViewSet, basename="feedback")
 router.register("reports", ReportViewSet, basename="reports")
+router.register("report-jobs", ReportJobViewSet, basename="report-jobs")
 
 membership_router = routers.NestedDefaultRouter(
     router, "memberships", lookup="membership"
@@ -47,6 +52,11 @@ fitness_class_router.register(
     "images", FitenessClassImageViewSet, basename="fitness-class-images"
 )
 
+series_router = routers.NestedDefaultRouter(router, "class-series", lookup="series")
+series_router.register(
+    "exceptions", SeriesExceptionViewSet, basename="class-series-exceptions"
+)
+
 
 urlpatterns = [
     path("auth/", include("djoser.urls")),
@@ -54,6 +64,8 @@ urlpatterns = [
     path("", include(router.urls)),
     path("", include(membership_router.urls)),
     path("", include(fitness_class_router.urls)),
+    path("", include(series_router.urls)),
+    path("db-metrics/", DatabaseMetricsView.as_view(), name="db-metrics"),
     path("payment/initiate/", initiate_payment, name="payment-initiate"),
     path("payment/success/", payment_success, name="payment-success"),
     path("payment/cancel/", payment_cancel, name="payment-cancel"),
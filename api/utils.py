@@ -0,0 +1,55 @@
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+
+def get_date_param(request, name, required=False):
+    """Read a YYYY-MM-DD query parameter and return it as a date."""
+    value = request.query_params.get(name)
+
+    if not value:
+        if required:
+            raise ValidationError({name: "This query parameter is required."})
+        return None
+
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+
+    if parsed is None:
+        raise ValidationError({name: "Enter a valid date in YYYY-MM-DD format."})
+    return parsed
+
+
+def get_choice_param(request, name, choices):
+    """Read a query parameter that must be one of the model field choices."""
+    value = request.query_params.get(name)
+
+    if not value:
+        return None
+
+    allowed = [choice[0] for choice in choices]
+    if value not in allowed:
+        raise ValidationError({name: f"Must be one of: {', '.join(allowed)}."})
+    return value
+
+
+def datetime_range_filter(field, start=None, end=None):
+    """
+    Build lookups for a DateTimeField from inclusive start/end dates.
+    Comparing against day boundaries (instead of field__date) keeps
+    the filter sargable so an index on the column can be used.
+    """
+    filters = {}
+
+    if start:
+        filters[f"{field}__gte"] = timezone.make_aware(
+            datetime.combine(start, time.min)
+        )
+    if end:
+        filters[f"{field}__lt"] = timezone.make_aware(
+            datetime.combine(end + timedelta(days=1), time.min)
+        )
+    return filters
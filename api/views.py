@@ -1,3 +1,28 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.db import connection
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from api.db_metrics import get_db_metrics
 
 # Create your views here.
+
+
+class DatabaseMetricsView(APIView):
+    """
+    API endpoint for database connection metrics
+     - Allow authenticated Admin to view the connection mode and the
+        connection metrics of the worker process that serves the request
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {
+                "mode": settings.DB_POOL_MODE,
+                "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+                "health_checks": connection.settings_dict["CONN_HEALTH_CHECKS"],
+                **get_db_metrics(),
+            }
+        )
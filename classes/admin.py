@@ -1,8 +1,21 @@
 from django.contrib import admin
-from classes.models import FitnessClass, FitnessClassImage, Booking, Attendance
+from classes.models import (
+    ClassSeries,
+    SeriesException,
+    FitnessClass,
+    FitnessClassImage,
+    Booking,
+    Attendance,
+    Waitlist,
+)
 
 
 # Register your models here.
+@admin.register(ClassSeries)
+class ClassSeriesAdmin(admin.ModelAdmin):
+    list_display = ["name", "instructor", "frequency", "starts_on", "ends_on"]
+
+
 @admin.register(FitnessClass)
 class FitnessClassAdmin(admin.ModelAdmin):
     list_display = ["name", "instructor", "capacity"]
@@ -13,9 +26,15 @@ class BookingAdmin(admin.ModelAdmin):
     list_display = ["user", "fitness_class", "status"]
 
 
+@admin.register(Waitlist)
+class WaitlistAdmin(admin.ModelAdmin):
+    list_display = ["user", "fitness_class", "position", "joined_at"]
+
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ["user", "fitness_class", "status"]
 
 
 admin.site.register(FitnessClassImage)
+admin.site.register(SeriesException)
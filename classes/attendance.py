@@ -0,0 +1,141 @@
+"""
+Roster based attendance marking and attendance generated from bookings.
+The whole roster of a class is written with one upsert on
+unique_attendance; bulk_create skips the model signals, so the rollup
+bucket and the report cache are refreshed here. Marks recorded after a
+class was closed also move its bookings to (or back from) ATTENDED.
+"""
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+from classes.models import FitnessClass, Booking, Attendance
+from reports.cache import bump_version
+from reports.rollups import refresh_attendance_rollups
+
+
+def mark_roster(fitness_class, date, present, absent):
+    rows = [
+        Attendance(
+            user_id=user_id, fitness_class=fitness_class, date=date, status=status
+        )
+        for status, user_ids in (("PRESENT", present), ("ABSENT", absent))
+        for user_id in user_ids
+    ]
+
+    with transaction.atomic():
+        # lock the class, so close_finished_classes can't close it meanwhile
+        closed = (
+            FitnessClass.objects.select_for_update()
+            .values_list("attendance_closed", flat=True)
+            .get(pk=fitness_class.pk)
+        )
+        Attendance.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["user", "fitness_class", "date"],
+            update_fields=["status"],
+        )
+        if closed and date == fitness_class.schedule:
+            # the class was closed already, its bookings follow the new marks
+            bookings = Booking.objects.filter(fitness_class=fitness_class)
+            bookings.filter(user_id__in=present, status="BOOKED").update(
+                status="ATTENDED"
+            )
+            bookings.filter(user_id__in=absent, status="ATTENDED").update(
+                status="BOOKED"
+            )
+        refresh_attendance_rollups([(fitness_class.pk, date)])
+        transaction.on_commit(lambda: bump_version(Attendance))
+
+    return Attendance.objects.select_related("user", "fitness_class").filter(
+        fitness_class=fitness_class, date=date
+    )
+
+
+def class_roster(fitness_class_id):
+    """
+    Booked members of a class with their contact fields and attendance
+    status on the class day, as one joined query.
+    """
+    attendance_status = Attendance.objects.filter(
+        user=OuterRef("user"),
+        fitness_class=OuterRef("fitness_class"),
+        date=OuterRef("fitness_class__schedule"),
+    ).values("status")[:1]
+
+    return (
+        Booking.objects.filter(fitness_class_id=fitness_class_id)
+        .exclude(status="CANCELLED")
+        .annotate(attendance_status=Subquery(attendance_status))
+        .order_by("user__first_name", "user__last_name", "id")
+        .values(
+            "id",
+            "user_id",
+            "user__first_name",
+            "user__last_name",
+            "user__email",
+            "user__phone_number",
+            "status",
+            "booking_date",
+            "attendance_status",
+        )
+    )
+
+
+def close_finished_classes(chunk_size=100):
+    """
+    Generate the attendance of classes whose day has passed, chunk_size
+    classes per transaction: BOOKED members without an attendance row are
+    marked ABSENT, bookings of PRESENT members move to ATTENDED and the
+    class is flagged attendance_closed so it is never scanned again.
+    Returns the number of classes closed.
+    """
+    today = timezone.now().date()
+    closed = 0
+
+    while True:
+        with transaction.atomic():
+            classes = dict(
+                FitnessClass.objects.select_for_update(skip_locked=True)
+                .filter(attendance_closed=False, schedule__lt=today)
+                .order_by("schedule", "id")
+                .values_list("id", "schedule")[:chunk_size]
+            )
+            if not classes:
+                return closed
+
+            attendance = Attendance.objects.filter(
+                user=OuterRef("user"),
+                fitness_class=OuterRef("fitness_class"),
+                date=OuterRef("fitness_class__schedule"),
+            )
+            booked = Booking.objects.filter(
+                fitness_class_id__in=classes, status="BOOKED"
+            )
+
+            missing = booked.filter(~Exists(attendance)).values_list(
+                "user_id", "fitness_class_id"
+            )
+            Attendance.objects.bulk_create(
+                (
+                    Attendance(
+                        user_id=user_id,
+                        fitness_class_id=fitness_class_id,
+                        date=classes[fitness_class_id],
+                        status="ABSENT",
+                    )
+                    for user_id, fitness_class_id in missing.iterator()
+                ),
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            booked.filter(Exists(attendance.filter(status="PRESENT"))).update(
+                status="ATTENDED"
+            )
+
+            FitnessClass.objects.filter(pk__in=classes).update(attendance_closed=True)
+            refresh_attendance_rollups(classes.items())
+            transaction.on_commit(lambda: bump_version(Attendance))
+
+        closed += len(classes)
@@ -0,0 +1,110 @@
+"""
+Seat accounting for bookings. FitnessClass.booked_count holds the number
+of bookings of a class that are not cancelled; a seat is taken with a
+single conditional UPDATE, so two members can never get the last seat.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from classes.models import FitnessClass, Booking, Waitlist
+
+
+def reserve_seat(fitness_class_id):
+    """Take a seat if one is left, returns False when the class is full."""
+    return bool(
+        FitnessClass.objects.filter(
+            pk=fitness_class_id, booked_count__lt=F("capacity")
+        ).update(booked_count=F("booked_count") + 1)
+    )
+
+
+def release_seat(fitness_class_id):
+    FitnessClass.objects.filter(pk=fitness_class_id, booked_count__gt=0).update(
+        booked_count=F("booked_count") - 1
+    )
+
+
+def recompute_booked_counts(queryset=None):
+    """Recompute booked_count of the given classes from their bookings."""
+    if queryset is None:
+        queryset = FitnessClass.objects.all()
+
+    return queryset.update(
+        booked_count=Coalesce(
+            Subquery(
+                Booking.objects.filter(fitness_class=OuterRef("pk"))
+                .exclude(status="CANCELLED")
+                .values("fitness_class")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            0,
+        )
+    )
+
+
+def book_classes(user, fitness_class_ids):
+    """
+    Book several classes for one member in a single transaction, using a
+    constant number of queries whatever the number of classes: lock the
+    classes, look up existing bookings, take the seats in one UPDATE and
+    insert the bookings with one bulk_create. Returns one result per id.
+    """
+    fitness_class_ids = list(dict.fromkeys(fitness_class_ids))
+    today = timezone.now().date()
+    errors = {}
+
+    with transaction.atomic():
+        classes = FitnessClass.objects.select_for_update().in_bulk(fitness_class_ids)
+        already_booked = set(
+            Booking.objects.filter(user=user, fitness_class_id__in=fitness_class_ids)
+            .exclude(status="CANCELLED")
+            .values_list("fitness_class_id", flat=True)
+        )
+
+        for class_id in fitness_class_ids:
+            fitness_class = classes.get(class_id)
+            if fitness_class is None:
+                errors[class_id] = "Fitness class not found."
+            elif fitness_class.schedule < today:
+                errors[class_id] = "Cannot book a class that has already occurred."
+            elif class_id in already_booked:
+                errors[class_id] = "You have already booked this class."
+            elif fitness_class.booked_count >= fitness_class.capacity:
+                errors[class_id] = "This class is fully booked."
+
+        accepted = [class_id for class_id in fitness_class_ids if class_id not in errors]
+        bookings = {}
+
+        if accepted:
+            FitnessClass.objects.filter(pk__in=accepted).update(
+                booked_count=F("booked_count") + 1
+            )
+            created = Booking.objects.bulk_create(
+                Booking(user=user, fitness_class_id=class_id, status="BOOKED")
+                for class_id in accepted
+            )
+            bookings = {booking.fitness_class_id: booking for booking in created}
+            Waitlist.objects.filter(user=user, fitness_class_id__in=accepted).delete()
+
+    results = []
+    for class_id in fitness_class_ids:
+        if class_id in errors:
+            results.append(
+                {
+                    "fitness_class_id": class_id,
+                    "status": "FAILED",
+                    "error": errors[class_id],
+                }
+            )
+        else:
+            results.append(
+                {
+                    "fitness_class_id": class_id,
+                    "status": "BOOKED",
+                    "booking_id": bookings[class_id].pk,
+                }
+            )
+    return results
@@ -0,0 +1,36 @@
+from django_filters import rest_framework as filters
+from classes.models import FitnessClass, Booking, Attendance
+from api.filters import DayRangeFilter
+
+
+class FitnessClassFilter(filters.FilterSet):
+    # fitness_class_schedule_idx, fitness_class_instructor_idx
+    schedule = filters.DateFromToRangeFilter()
+    instructor = filters.NumberFilter()
+    series = filters.NumberFilter()
+
+    class Meta:
+        model = FitnessClass
+        fields = ["schedule", "instructor", "series"]
+
+
+class BookingFilter(filters.FilterSet):
+    # booking_class_status_idx, booking_user_date_idx, booking_date_id_idx
+    booking_date = DayRangeFilter()
+    fitness_class = filters.NumberFilter()
+    user = filters.NumberFilter()
+
+    class Meta:
+        model = Booking
+        fields = ["status", "fitness_class", "user", "booking_date"]
+
+
+class AttendanceFilter(filters.FilterSet):
+    # attendance_class_date_idx, attendance_user_date_idx, attendance_date_id_idx
+    date = filters.DateFromToRangeFilter()
+    fitness_class = filters.NumberFilter()
+    user = filters.NumberFilter()
+
+    class Meta:
+        model = Attendance
+        fields = ["status", "fitness_class", "user", "date"]
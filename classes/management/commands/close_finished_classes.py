@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from classes.attendance import close_finished_classes
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the attendance of finished classes from their bookings "
+        "(safe to run every few minutes from cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Number of classes closed per transaction",
+        )
+
+    def handle(self, *args, **options):
+        closed = close_finished_classes(options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Closed {closed} finished classes."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from classes.models import FitnessClass
+from classes.bookings import recompute_booked_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute the booked seat count of fitness classes from their bookings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "class_ids",
+            nargs="*",
+            type=int,
+            help="Only repair these fitness classes (default: all)",
+        )
+
+    def handle(self, *args, **options):
+        queryset = FitnessClass.objects.all()
+        if options["class_ids"]:
+            queryset = queryset.filter(pk__in=options["class_ids"])
+
+        updated = recompute_booked_counts(queryset)
+        self.stdout.write(
+            self.style.SUCCESS(f"Repaired booked counts of {updated} classes.")
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 08:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0004_alter_fitnessclassimage_fitness_class"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["fitness_class", "date"], name="attendance_class_date_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0005_attendance_class_date_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="rating_1_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="rating_2_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="rating_3_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="rating_4_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="rating_5_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="rating_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="rating_sum",
+            field=models.IntegerField(default=0),
+        ),
+    ]
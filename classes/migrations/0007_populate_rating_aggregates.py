@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_ratings(apps, schema_editor):
+    FitnessClass = apps.get_model("classes", "FitnessClass")
+    Feedback = apps.get_model("reviews", "Feedback")
+
+    def rating_subquery(aggregate):
+        return Coalesce(
+            Subquery(
+                Feedback.objects.filter(fitness_class=OuterRef("pk"))
+                .values("fitness_class")
+                .annotate(value=aggregate)
+                .values("value")
+            ),
+            0,
+        )
+
+    FitnessClass.objects.update(
+        rating_sum=rating_subquery(Sum("ratings")),
+        rating_count=rating_subquery(Count("id")),
+        **{
+            f"rating_{stars}_count": rating_subquery(
+                Count("id", filter=Q(ratings=stars))
+            )
+            for stars in range(1, 6)
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0006_fitnessclass_rating_aggregates"),
+        ("reviews", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_ratings, migrations.RunPython.noop),
+    ]
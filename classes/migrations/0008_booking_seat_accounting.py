@@ -0,0 +1,71 @@
+# Generated by Django 5.2 on 2026-10-18 08:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def cancel_duplicate_bookings(apps, schema_editor):
+    """Keep the oldest active booking of a member per class, cancel the rest."""
+    Booking = apps.get_model("classes", "Booking")
+
+    duplicates = (
+        Booking.objects.exclude(status="CANCELLED")
+        .values("user_id", "fitness_class_id")
+        .annotate(first_id=Min("id"), bookings=Count("id"))
+        .filter(bookings__gt=1)
+    )
+    for duplicate in duplicates:
+        Booking.objects.filter(
+            user_id=duplicate["user_id"],
+            fitness_class_id=duplicate["fitness_class_id"],
+        ).exclude(status="CANCELLED").exclude(pk=duplicate["first_id"]).update(
+            status="CANCELLED"
+        )
+
+
+def populate_booked_count(apps, schema_editor):
+    FitnessClass = apps.get_model("classes", "FitnessClass")
+    Booking = apps.get_model("classes", "Booking")
+
+    FitnessClass.objects.update(
+        booked_count=Coalesce(
+            Subquery(
+                Booking.objects.filter(fitness_class=OuterRef("pk"))
+                .exclude(status="CANCELLED")
+                .values("fitness_class")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0007_populate_rating_aggregates"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="booked_count",
+            field=models.IntegerField(
+                default=0, help_text="Seats taken by bookings that are not cancelled"
+            ),
+        ),
+        migrations.RunPython(cancel_duplicate_bookings, migrations.RunPython.noop),
+        migrations.RunPython(populate_booked_count, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="booking",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "CANCELLED"), _negated=True),
+                fields=("user", "fitness_class"),
+                name="unique_active_booking",
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-18 08:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0008_booking_seat_accounting"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Waitlist",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("position", models.PositiveIntegerField()),
+                ("joined_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "fitness_class",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="waitlist",
+                        to="classes.fitnessclass",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="waitlist_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["fitness_class", "position"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("fitness_class", "position"),
+                        name="unique_waitlist_position",
+                    ),
+                    models.UniqueConstraint(
+                        fields=("fitness_class", "user"), name="unique_waitlist_member"
+                    ),
+                ],
+            },
+        ),
+    ]
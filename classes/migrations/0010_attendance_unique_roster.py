@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-18 08:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def delete_duplicate_attendance(apps, schema_editor):
+    """
+    Keep the latest attendance row of a member per class and day, delete
+    the rest and recompute the rollup buckets they were counted in.
+    """
+    Attendance = apps.get_model("classes", "Attendance")
+    AttendanceRollup = apps.get_model("reports", "AttendanceRollup")
+
+    duplicates = (
+        Attendance.objects.values("user_id", "fitness_class_id", "date")
+        .annotate(last_id=Max("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    buckets = set()
+    for duplicate in duplicates:
+        Attendance.objects.filter(
+            user_id=duplicate["user_id"],
+            fitness_class_id=duplicate["fitness_class_id"],
+            date=duplicate["date"],
+        ).exclude(pk=duplicate["last_id"]).delete()
+        buckets.add((duplicate["fitness_class_id"], duplicate["date"]))
+
+    for fitness_class_id, date in buckets:
+        counts = Attendance.objects.filter(
+            fitness_class_id=fitness_class_id, date=date
+        ).aggregate(
+            present_count=Count("id", filter=Q(status="PRESENT")),
+            absent_count=Count("id", filter=Q(status="ABSENT")),
+            total_count=Count("id"),
+        )
+        AttendanceRollup.objects.update_or_create(
+            fitness_class_id=fitness_class_id, date=date, defaults=counts
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0009_waitlist"),
+        ("reports", "0003_report_job"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="attendance",
+            constraint=models.UniqueConstraint(
+                fields=("user", "fitness_class", "date"), name="unique_attendance"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 08:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0010_attendance_unique_roster"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="attendance_closed",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="fitnessclass",
+            index=models.Index(
+                condition=models.Q(("attendance_closed", False)),
+                fields=["schedule"],
+                name="fitness_class_open_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 5.2 on 2026-10-18 08:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0011_fitnessclass_attendance_closed"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SeriesException",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateField(help_text="Occurrence that does not take place"),
+                ),
+                ("reason", models.CharField(blank=True, max_length=255)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ClassSeries",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("description", models.TextField()),
+                (
+                    "duration",
+                    models.PositiveIntegerField(help_text="Duration in minutes"),
+                ),
+                (
+                    "capacity",
+                    models.PositiveIntegerField(help_text="Max number of participants"),
+                ),
+                (
+                    "frequency",
+                    models.CharField(
+                        choices=[("DAILY", "Daily"), ("WEEKLY", "Weekly")],
+                        default="WEEKLY",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "interval",
+                    models.PositiveIntegerField(
+                        default=1, help_text="Repeat every <interval> days or weeks"
+                    ),
+                ),
+                (
+                    "weekdays",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text="Weekdays of a weekly series, 0 = Monday (default: the start day)",
+                    ),
+                ),
+                ("starts_on", models.DateField()),
+                ("ends_on", models.DateField(blank=True, null=True)),
+                (
+                    "instructor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="class_series",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="series",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="occurrences",
+                to="classes.classseries",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="fitnessclass",
+            constraint=models.UniqueConstraint(
+                fields=("series", "schedule"), name="unique_series_occurrence"
+            ),
+        ),
+        migrations.AddField(
+            model_name="seriesexception",
+            name="series",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="exceptions",
+                to="classes.classseries",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="seriesexception",
+            constraint=models.UniqueConstraint(
+                fields=("series", "date"), name="unique_series_exception"
+            ),
+        ),
+    ]
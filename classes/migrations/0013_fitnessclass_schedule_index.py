@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 08:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0012_class_series"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fitnessclass",
+            index=models.Index(fields=["schedule"], name="fitness_class_schedule_idx"),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-18 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def add_overlap_constraint(apps, schema_editor):
+    """Postgres only: no two timed classes of an instructor may overlap."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "ALTER TABLE classes_fitnessclass "
+        "ADD CONSTRAINT fitness_class_no_instructor_overlap EXCLUDE USING gist "
+        "(instructor_id WITH =, tstzrange(starts_at, ends_at) WITH &&) "
+        "WHERE (starts_at IS NOT NULL AND ends_at IS NOT NULL)"
+    )
+
+
+def remove_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE classes_fitnessclass "
+        "DROP CONSTRAINT IF EXISTS fitness_class_no_instructor_overlap"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0013_fitnessclass_schedule_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="ends_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="start_time",
+            field=models.TimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="fitnessclass",
+            name="starts_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="fitnessclass",
+            index=models.Index(
+                fields=["instructor", "starts_at"], name="fitness_class_instructor_idx"
+            ),
+        ),
+        migrations.RunPython(add_overlap_constraint, remove_overlap_constraint),
+    ]
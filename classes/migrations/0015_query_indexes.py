@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 09:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0014_fitnessclass_start_time"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["fitness_class", "status"], name="booking_class_status_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-18 09:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0015_query_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="fitnessclass",
+            name="fitness_class_schedule_idx",
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["user", "date", "id"], name="attendance_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(fields=["date", "id"], name="attendance_date_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["user", "booking_date", "id"], name="booking_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["booking_date", "id"], name="booking_date_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fitnessclass",
+            index=models.Index(
+                fields=["schedule", "id"], name="fitness_class_schedule_idx"
+            ),
+        ),
+    ]
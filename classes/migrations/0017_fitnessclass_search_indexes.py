@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-18 09:30
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import TextField
+from django.db.models.functions import Cast, Upper
+
+
+def search_indexes():
+    return [
+        # full-text search on the name and description (api/search.py)
+        GinIndex(
+            SearchVector("name", "description", config="english"),
+            name="fitness_class_search_idx",
+        ),
+        # substring search on the name, also from bookings and attendance
+        GinIndex(
+            OpClass(Upper(Cast("name", TextField())), name="gin_trgm_ops"),
+            name="fitness_class_name_trgm_idx",
+        ),
+    ]
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    model = apps.get_model("classes", "FitnessClass")
+    for index in search_indexes():
+        schema_editor.add_index(model, index)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    model = apps.get_model("classes", "FitnessClass")
+    for index in search_indexes():
+        schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0016_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
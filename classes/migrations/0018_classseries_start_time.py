@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0017_fitnessclass_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="classseries",
+            name="start_time",
+            field=models.TimeField(blank=True, null=True),
+        ),
+    ]
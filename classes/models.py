@@ -1,10 +1,59 @@
+from datetime import datetime, timedelta
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from cloudinary.models import CloudinaryField
 
 # Create your models here.
 
 
+class ClassSeries(models.Model):
+    FREQUENCY_CHOICES = [
+        ("DAILY", "Daily"),
+        ("WEEKLY", "Weekly"),
+    ]
+
+    name = models.CharField(max_length=100)
+    description = models.TextField()
+    instructor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="class_series"
+    )
+    start_time = models.TimeField(null=True, blank=True)
+    duration = models.PositiveIntegerField(help_text="Duration in minutes")
+    capacity = models.PositiveIntegerField(help_text="Max number of participants")
+    frequency = models.CharField(
+        max_length=10, choices=FREQUENCY_CHOICES, default="WEEKLY"
+    )
+    interval = models.PositiveIntegerField(
+        default=1, help_text="Repeat every <interval> days or weeks"
+    )
+    weekdays = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Weekdays of a weekly series, 0 = Monday (default: the start day)",
+    )
+    starts_on = models.DateField()
+    ends_on = models.DateField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class SeriesException(models.Model):
+    series = models.ForeignKey(
+        ClassSeries, on_delete=models.CASCADE, related_name="exceptions"
+    )
+    date = models.DateField(help_text="Occurrence that does not take place")
+    reason = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["series", "date"], name="unique_series_exception"
+            ),
+        ]
+
+
 class FitnessClass(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
@@ -12,9 +61,106 @@ class FitnessClass(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="instructor"
     )
     schedule = models.DateField()
+    start_time = models.TimeField(null=True, blank=True)
     duration = models.PositiveIntegerField(help_text="Duration in minutes")
     capacity = models.PositiveIntegerField(help_text="Max number of participants")
 
+    # start/end of the class, derived from schedule, start_time and duration
+    # (see save) so overlaps can be found with a range query
+    starts_at = models.DateTimeField(null=True, blank=True, editable=False)
+    ends_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    booked_count = models.IntegerField(
+        default=0, help_text="Seats taken by bookings that are not cancelled"
+    )
+
+    # rating aggregates, kept up to date from Feedback (reviews/signals.py)
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    rating_1_count = models.IntegerField(default=0)
+    rating_2_count = models.IntegerField(default=0)
+    rating_3_count = models.IntegerField(default=0)
+    rating_4_count = models.IntegerField(default=0)
+    rating_5_count = models.IntegerField(default=0)
+
+    # set once the attendance of the finished class was generated from its bookings
+    attendance_closed = models.BooleanField(default=False)
+
+    # occurrence of a recurring series, created when it is first booked
+    series = models.ForeignKey(
+        ClassSeries,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="occurrences",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["series", "schedule"], name="unique_series_occurrence"
+            ),
+        ]
+        indexes = [
+            # date range scans (timetable) and keyset pages of the classes
+            models.Index(fields=["schedule", "id"], name="fitness_class_schedule_idx"),
+            # overlap checks and availability of an instructor
+            models.Index(
+                fields=["instructor", "starts_at"], name="fitness_class_instructor_idx"
+            ),
+            # finished classes still waiting for their attendance
+            models.Index(
+                fields=["schedule"],
+                condition=models.Q(attendance_closed=False),
+                name="fitness_class_open_idx",
+            ),
+        ]
+
+    # written with F() expressions only (classes/bookings.py, reviews/ratings.py),
+    # a full save of an instance loaded earlier would put back stale values
+    COUNTER_FIELDS = {
+        "booked_count",
+        "rating_sum",
+        "rating_count",
+        "rating_1_count",
+        "rating_2_count",
+        "rating_3_count",
+        "rating_4_count",
+        "rating_5_count",
+    }
+
+    def get_interval(self):
+        if self.start_time is None:
+            return None, None
+        starts_at = timezone.make_aware(datetime.combine(self.schedule, self.start_time))
+        return starts_at, starts_at + timedelta(minutes=self.duration)
+
+    def save(self, *args, **kwargs):
+        self.starts_at, self.ends_at = self.get_interval()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "starts_at", "ends_at"}
+        elif not self._state.adding and not kwargs.get("force_insert"):
+            # the counters are only saved when named in update_fields
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
+    @property
+    def rating_histogram(self):
+        return {
+            str(stars): getattr(self, f"rating_{stars}_count") for stars in range(1, 6)
+        }
+
 
 class FitnessClassImage(models.Model):
     fitness_class = models.ForeignKey(
@@ -39,6 +185,52 @@ class Booking(models.Model):
     booking_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="BOOKED")
 
+    class Meta:
+        constraints = [
+            # a member holds at most one seat per class
+            models.UniqueConstraint(
+                fields=["user", "fitness_class"],
+                condition=~models.Q(status="CANCELLED"),
+                name="unique_active_booking",
+            ),
+        ]
+        indexes = [
+            # bookings of a class by status (roster, closing finished classes)
+            models.Index(
+                fields=["fitness_class", "status"], name="booking_class_status_idx"
+            ),
+            # keyset pages of the booking history, newest first
+            models.Index(
+                fields=["user", "booking_date", "id"], name="booking_user_date_idx"
+            ),
+            models.Index(fields=["booking_date", "id"], name="booking_date_id_idx"),
+        ]
+
+
+class Waitlist(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="waitlist_entries",
+    )
+    fitness_class = models.ForeignKey(
+        FitnessClass, on_delete=models.CASCADE, related_name="waitlist"
+    )
+    position = models.PositiveIntegerField()
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["fitness_class", "position"]
+        constraints = [
+            # also the index used to find the head of the queue
+            models.UniqueConstraint(
+                fields=["fitness_class", "position"], name="unique_waitlist_position"
+            ),
+            models.UniqueConstraint(
+                fields=["fitness_class", "user"], name="unique_waitlist_member"
+            ),
+        ]
+
 
 class Attendance(models.Model):
     STATUS_CHOICES = [
@@ -54,3 +246,21 @@ class Attendance(models.Model):
     )
     date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Present")
+
+    class Meta:
+        constraints = [
+            # one attendance row per member, class and day (roster upserts)
+            models.UniqueConstraint(
+                fields=["user", "fitness_class", "date"],
+                name="unique_attendance",
+            ),
+        ]
+        indexes = [
+            # per class date range scans (attendance trends, rollup refresh)
+            models.Index(
+                fields=["fitness_class", "date"], name="attendance_class_date_idx"
+            ),
+            # keyset pages of the attendance history, newest first
+            models.Index(fields=["user", "date", "id"], name="attendance_user_date_idx"),
+            models.Index(fields=["date", "id"], name="attendance_date_id_idx"),
+        ]
@@ -1,4 +1,5 @@
-from rest_framework.pagination import PageNumberPagination
+from api.pagination import KeysetPagination
 
-class DefaultPagination(PageNumberPagination):
-    page_size = 6
\ No newline at end of file
+
+class DefaultPagination(KeysetPagination):
+    page_size = 6
@@ -0,0 +1,68 @@
+"""
+Instructor timetables. A class with a start_time occupies the interval
+[starts_at, ends_at). On Postgres the exclusion constraint
+fitness_class_no_instructor_overlap rejects overlapping classes of an
+instructor, the query below finds them on every database: bounding
+starts_at from both sides keeps it a range scan on
+fitness_class_instructor_idx instead of the instructor's whole history.
+"""
+
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from classes.models import FitnessClass
+
+
+# longest class allowed, the lower bound of the overlap range scan
+MAX_CLASS_DURATION = 24 * 60
+
+# hours in which free slots are offered
+OPENING_TIME = time(6, 0)
+CLOSING_TIME = time(22, 0)
+
+
+def overlapping_classes(instructor_id, starts_at, ends_at, exclude_pk=None):
+    queryset = FitnessClass.objects.filter(
+        instructor_id=instructor_id,
+        starts_at__gt=starts_at - timedelta(minutes=MAX_CLASS_DURATION),
+        starts_at__lt=ends_at,
+        ends_at__gt=starts_at,
+    )
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    return queryset
+
+
+def free_slots(instructor_id, start, end):
+    """
+    Free slots of an instructor within opening hours for every day from
+    start to end (inclusive), from one range query over their classes.
+    """
+    opens = timezone.make_aware(datetime.combine(start, OPENING_TIME))
+    closes = timezone.make_aware(datetime.combine(end, CLOSING_TIME))
+    busy = list(
+        overlapping_classes(instructor_id, opens, closes)
+        .order_by("starts_at")
+        .values_list("starts_at", "ends_at")
+    )
+
+    slots = []
+    day = start
+    while day <= end:
+        cursor = timezone.make_aware(datetime.combine(day, OPENING_TIME))
+        day_end = timezone.make_aware(datetime.combine(day, CLOSING_TIME))
+
+        for starts_at, ends_at in busy:
+            if ends_at <= cursor or starts_at >= day_end:
+                continue
+            if starts_at > cursor:
+                slots.append((cursor, starts_at))
+            cursor = max(cursor, ends_at)
+        if cursor < day_end:
+            slots.append((cursor, day_end))
+
+        day += timedelta(days=1)
+
+    return [
+        {"start": timezone.localtime(slot_start), "end": timezone.localtime(slot_end)}
+        for slot_start, slot_end in slots
+    ]
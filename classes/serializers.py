@@ -1,8 +1,21 @@
 from rest_framework import serializers
-from classes.models import FitnessClass, Booking, Attendance, FitnessClassImage
+from classes.models import (
+    ClassSeries,
+    SeriesException,
+    FitnessClass,
+    Booking,
+    Attendance,
+    FitnessClassImage,
+    Waitlist,
+)
 from django.utils import timezone
+from django.db import IntegrityError, transaction
+from classes.bookings import reserve_seat
+from classes.scheduling import MAX_CLASS_DURATION, overlapping_classes
+from classes.waitlist import hand_over_seat
 from django.contrib.auth import get_user_model
 from reviews.serializers import SimpleFitnessClassSerializer
+from api.fieldsets import SparseFieldsMixin
 
 
 User = get_user_model()
@@ -28,9 +41,13 @@ class FitnessClassImageSerializer(serializers.ModelSerializer):
 
 
 # to show fitness class info
-class FitnessClassSerializer(serializers.ModelSerializer):
+class FitnessClassSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     instructor = SimpleUserSerializer(read_only=True)
     images = FitnessClassImageSerializer(many=True, read_only=True)
+    average_rating = serializers.FloatField(read_only=True)
+    rating_histogram = serializers.DictField(
+        child=serializers.IntegerField(), read_only=True
+    )
 
     class Meta:
         model = FitnessClass
@@ -40,13 +57,34 @@ class FitnessClassSerializer(serializers.ModelSerializer):
             "description",
             "instructor",
             "schedule",
+            "start_time",
+            "ends_at",
             "duration",
             "capacity",
             "images",
+            "booked_count",
+            "average_rating",
+            "rating_count",
+            "rating_histogram",
         ]
+        read_only_fields = ["booked_count", "rating_count", "ends_at"]
+
+
+# one class of the timetable, occurrences of a series have no id until booked
+class TimetableSerializer(serializers.Serializer):
+    id = serializers.IntegerField(allow_null=True)
+    series = serializers.IntegerField(allow_null=True)
+    name = serializers.CharField()
+    instructor = serializers.IntegerField()
+    schedule = serializers.DateField()
+    start_time = serializers.TimeField(allow_null=True)
+    ends_at = serializers.DateTimeField(allow_null=True)
+    duration = serializers.IntegerField()
+    capacity = serializers.IntegerField()
+    seats_left = serializers.IntegerField()
 
 
-# to create fitness class
+# to create and update fitness class
 class CreateFitnessClassSerializer(serializers.ModelSerializer):
     class Meta:
         model = FitnessClass
@@ -56,11 +94,154 @@ class CreateFitnessClassSerializer(serializers.ModelSerializer):
             "description",
             "instructor",
             "schedule",
+            "start_time",
             "duration",
             "capacity",
             "images",
         ]
         read_only_fields = ["images"]
+        extra_kwargs = {"duration": {"max_value": MAX_CLASS_DURATION}}
+
+    def validate(self, data):
+        """
+        Validate the class:
+        - New classes need a start_time
+        - The instructor must not teach another class at the same time
+        """
+        if self.instance is None and data.get("start_time") is None:
+            raise serializers.ValidationError({"start_time": "This field is required."})
+
+        fitness_class = FitnessClass(
+            schedule=data.get("schedule", getattr(self.instance, "schedule", None)),
+            start_time=data.get(
+                "start_time", getattr(self.instance, "start_time", None)
+            ),
+            duration=data.get("duration", getattr(self.instance, "duration", None)),
+        )
+        instructor = data.get("instructor", getattr(self.instance, "instructor", None))
+        starts_at, ends_at = fitness_class.get_interval()
+
+        if starts_at is not None:
+            overlap = (
+                overlapping_classes(
+                    instructor.pk,
+                    starts_at,
+                    ends_at,
+                    exclude_pk=getattr(self.instance, "pk", None),
+                )
+                .values("name", "starts_at", "ends_at")
+                .first()
+            )
+            if overlap:
+                raise serializers.ValidationError(
+                    {
+                        "start_time": (
+                            f"The instructor already teaches {overlap['name']} from "
+                            f"{timezone.localtime(overlap['starts_at']):%H:%M} to "
+                            f"{timezone.localtime(overlap['ends_at']):%H:%M}."
+                        )
+                    }
+                )
+        return data
+
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            # fitness_class_no_instructor_overlap, a concurrent write won
+            raise serializers.ValidationError(
+                {"start_time": "The instructor already teaches a class at this time."}
+            )
+
+    def update(self, instance, validated_data):
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"start_time": "The instructor already teaches a class at this time."}
+            )
+
+
+""" CLASS SERIES MODEL SERIALIZER """
+
+
+class SeriesExceptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SeriesException
+        fields = ["id", "date", "reason"]
+
+    def validate_date(self, value):
+        series_id = self.context.get("series_id")
+        if (
+            SeriesException.objects.filter(series_id=series_id, date=value)
+            .exclude(pk=getattr(self.instance, "pk", None))
+            .exists()
+        ):
+            raise serializers.ValidationError("This date is already an exception.")
+        return value
+
+
+class ClassSeriesSerializer(serializers.ModelSerializer):
+    exceptions = SeriesExceptionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ClassSeries
+        fields = [
+            "id",
+            "name",
+            "description",
+            "instructor",
+            "start_time",
+            "duration",
+            "capacity",
+            "frequency",
+            "interval",
+            "weekdays",
+            "starts_on",
+            "ends_on",
+            "exceptions",
+        ]
+
+    def validate_weekdays(self, value):
+        if not isinstance(value, list) or any(
+            not isinstance(day, int) or not 0 <= day <= 6 for day in value
+        ):
+            raise serializers.ValidationError(
+                "Must be a list of weekdays from 0 (Monday) to 6 (Sunday)."
+            )
+        return sorted(set(value))
+
+    def validate(self, data):
+        starts_on = data.get("starts_on", getattr(self.instance, "starts_on", None))
+        ends_on = data.get("ends_on", getattr(self.instance, "ends_on", None))
+
+        if self.instance is None and data.get("start_time") is None:
+            raise serializers.ValidationError({"start_time": "This field is required."})
+        if starts_on and ends_on and ends_on < starts_on:
+            raise serializers.ValidationError(
+                {"ends_on": "The series cannot end before it starts."}
+            )
+        return data
+
+
+# an expanded occurrence of a series (not necessarily stored)
+class OccurrenceSerializer(serializers.Serializer):
+    series = serializers.IntegerField()
+    fitness_class = serializers.IntegerField(allow_null=True)
+    name = serializers.CharField()
+    instructor = serializers.IntegerField()
+    schedule = serializers.DateField()
+    start_time = serializers.TimeField(allow_null=True)
+    duration = serializers.IntegerField()
+    capacity = serializers.IntegerField()
+    booked_count = serializers.IntegerField()
+
+
+# to book an occurrence of a series
+class BookOccurrenceSerializer(serializers.Serializer):
+    date = serializers.DateField()
 
 
 """ BOOKING MODEL SERIALIZER """
@@ -74,7 +255,7 @@ class BookedFitnessClassSerializer(serializers.ModelSerializer):
         fields = ["id", "name"]
 
 # to show all booking class info (for admin only)
-class BookingClassSerializer(serializers.ModelSerializer):
+class BookingClassSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = SimpleUserSerializer(read_only=True)
     fitness_class = BookedFitnessClassSerializer(read_only=True)
 
@@ -90,7 +271,7 @@ class BookingClassSerializer(serializers.ModelSerializer):
 
 
 # to book a new fitness class (to create a booking)
-class BookFitnessClassSerializer(serializers.ModelSerializer):
+class BookFitnessClassSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     fitness_class = BookedFitnessClassSerializer(read_only=True)
     fitness_class_id = serializers.PrimaryKeyRelatedField(
         queryset=FitnessClass.objects.all(),
@@ -114,12 +295,11 @@ class BookFitnessClassSerializer(serializers.ModelSerializer):
         """
         Validate the booking:
         - Class must be in the future
-        - Class must have available capacity
-        - User can't book same class twice
+        Capacity and duplicate bookings are enforced when the booking
+        is created (see create below).
         """
         fitness_class = data["fitness_class"]
         booking_date = data.get("booking_date", timezone.now().date())
-        user = self.context["user"]
 
         # Check if class is in the past
         if fitness_class.schedule < booking_date:
@@ -127,25 +307,33 @@ class BookFitnessClassSerializer(serializers.ModelSerializer):
                 "Cannot book a class that has already occurred."
             )
 
-        # Check capacity
-        current_bookings = Booking.objects.filter(
-            fitness_class=fitness_class, status="BOOKED"
-        ).count()
-        if current_bookings >= fitness_class.capacity:
-            raise serializers.ValidationError("This class is fully booked.")
-
-        # Check for duplicate booking
-        if Booking.objects.filter(
-            user=user, fitness_class=fitness_class, status="BOOKED"
-        ).exists():
-            raise serializers.ValidationError("You have already booked this class.")
-
         return data
 
     def create(self, validated_data):
         validated_data["user"] = self.context["user"]
         validated_data["status"] = "BOOKED"
-        return super().create(validated_data)
+
+        try:
+            with transaction.atomic():
+                # conditional UPDATE, fails instead of overbooking the class
+                if not reserve_seat(validated_data["fitness_class"].pk):
+                    raise serializers.ValidationError("This class is fully booked.")
+                booking = super().create(validated_data)
+                Waitlist.objects.filter(
+                    user=booking.user, fitness_class=booking.fitness_class
+                ).delete()
+                return booking
+        except IntegrityError:
+            # unique_active_booking, the seat taken above is rolled back
+            raise serializers.ValidationError("You have already booked this class.")
+
+
+# to book several fitness classes in one request
+class BulkBookingSerializer(serializers.Serializer):
+    fitness_class_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=50
+    )
+
 
 # to update already booked fitness class
 class UpdateBookedFitnessClassSerializer(serializers.ModelSerializer):
@@ -153,11 +341,59 @@ class UpdateBookedFitnessClassSerializer(serializers.ModelSerializer):
         model = Booking
         fields = ["status"]
 
+    def update(self, instance, validated_data):
+        status = validated_data.get("status", instance.status)
+
+        try:
+            with transaction.atomic():
+                # lock the booking so two cancellations can't both free its seat
+                current = (
+                    Booking.objects.select_for_update()
+                    .values_list("status", flat=True)
+                    .get(pk=instance.pk)
+                )
+                if current != "CANCELLED" and status == "CANCELLED":
+                    # the head of the waitlist (if any) takes the seat
+                    hand_over_seat(instance.fitness_class_id)
+                elif current == "CANCELLED" and status != "CANCELLED":
+                    if not reserve_seat(instance.fitness_class_id):
+                        raise serializers.ValidationError(
+                            "This class is fully booked."
+                        )
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError("You have already booked this class.")
+
+
+""" WAITLIST MODEL SERIALIZER """
+
+
+class WaitlistSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Waitlist
+        fields = ["id", "fitness_class", "position", "joined_at"]
+        read_only_fields = ["fitness_class", "position", "joined_at"]
+
+
+# one row of the roster of a class (for instructors)
+class RosterMemberSerializer(serializers.Serializer):
+    booking_id = serializers.IntegerField(source="id")
+    user_id = serializers.IntegerField()
+    first_name = serializers.CharField(source="user__first_name")
+    last_name = serializers.CharField(source="user__last_name")
+    email = serializers.EmailField(source="user__email")
+    phone_number = serializers.CharField(
+        source="user__phone_number", allow_null=True
+    )
+    booking_status = serializers.CharField(source="status")
+    booking_date = serializers.DateTimeField()
+    attendance_status = serializers.CharField(allow_null=True)
+
 
 """ ATTENDANCE MODEL SERIALZIER """
 
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = SimpleUserSerializer(read_only=True)
     fitness_class = SimpleFitnessClassSerializer(read_only=True)
 
@@ -177,4 +413,39 @@ class UpdateAttendanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Attendance
         fields = ["id", "user", "fitness_class", "date", "status"]
-        read_only_fields = ["user", "fitness_class"]
\ No newline at end of file
+        read_only_fields = ["user", "fitness_class"]
+
+
+# to mark the attendance of a whole class at once
+class RosterAttendanceSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    present = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list, max_length=500
+    )
+    absent = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list, max_length=500
+    )
+
+    def validate(self, data):
+        present = set(data["present"])
+        absent = set(data["absent"])
+
+        if not present and not absent:
+            raise serializers.ValidationError("The roster is empty.")
+        both = sorted(present & absent)
+        if both:
+            raise serializers.ValidationError(
+                {"absent": f"Members marked both present and absent: {both}"}
+            )
+
+        # one query for the whole roster
+        members = present | absent
+        found = set(User.objects.filter(pk__in=members).values_list("pk", flat=True))
+        if members - found:
+            raise serializers.ValidationError(
+                f"Unknown members: {sorted(members - found)}"
+            )
+
+        data["present"] = sorted(present)
+        data["absent"] = sorted(absent)
+        return data
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+Recurring class series. Occurrences are not stored: they are expanded
+from the recurrence rule for the requested window, minus the exception
+dates of the series. A FitnessClass row (series + schedule) is only
+created when an occurrence is booked for the first time.
+"""
+
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from classes.models import ClassSeries, FitnessClass
+from api.utils import get_date_param
+
+
+# longest window a single expansion may cover
+MAX_WINDOW_DAYS = 93
+
+
+def get_window(request):
+    """Read the required ?from= and ?to= dates of a timetable window."""
+    start = get_date_param(request, "from", required=True)
+    end = get_date_param(request, "to", required=True)
+
+    if end < start:
+        raise ValidationError({"to": "Must not be before from."})
+    if (end - start).days >= MAX_WINDOW_DAYS:
+        raise ValidationError(
+            {"to": f"The window cannot be longer than {MAX_WINDOW_DAYS} days."}
+        )
+    return start, end
+
+
+def occurrence_dates(series, start, end, skipped=()):
+    """Lazily yield the dates of the series between start and end (inclusive)."""
+    start = max(start, series.starts_on)
+    if series.ends_on:
+        end = min(end, series.ends_on)
+
+    interval = series.interval or 1
+
+    if series.frequency == "DAILY":
+        offset = (start - series.starts_on).days % interval
+        day = start + timedelta(days=(interval - offset) % interval)
+        while day <= end:
+            if day not in skipped:
+                yield day
+            day += timedelta(days=interval)
+        return
+
+    weekdays = set(series.weekdays or [series.starts_on.weekday()])
+    # weeks are counted from the monday of the first week of the series
+    anchor = series.starts_on - timedelta(days=series.starts_on.weekday())
+    day = start
+    while day <= end:
+        if (
+            day.weekday() in weekdays
+            and ((day - anchor).days // 7) % interval == 0
+            and day not in skipped
+        ):
+            yield day
+        day += timedelta(days=1)
+
+
+def is_occurrence(series, day):
+    skipped = set(series.exceptions.values_list("date", flat=True))
+    return next(occurrence_dates(series, day, day, skipped), None) is not None
+
+
+def series_in_window(start, end, queryset=None):
+    if queryset is None:
+        queryset = ClassSeries.objects.all()
+    return queryset.filter(
+        Q(ends_on__isnull=True) | Q(ends_on__gte=start), starts_on__lte=end
+    )
+
+
+def expand_occurrences(start, end, queryset=None):
+    """
+    Occurrences of all series (or the given ones) between start and end,
+    sorted by date. Occurrences that were already booked carry the id and
+    booked_count of their FitnessClass. Runs three queries.
+    """
+    series_list = list(
+        series_in_window(start, end, queryset).prefetch_related("exceptions")
+    )
+    materialized = {
+        (fitness_class.series_id, fitness_class.schedule): fitness_class
+        for fitness_class in FitnessClass.objects.filter(
+            series__in=series_list, schedule__gte=start, schedule__lte=end
+        ).only("id", "series_id", "schedule", "capacity", "booked_count")
+    }
+
+    occurrences = []
+    for series in series_list:
+        skipped = {exception.date for exception in series.exceptions.all()}
+        for day in occurrence_dates(series, start, end, skipped):
+            fitness_class = materialized.get((series.pk, day))
+            occurrences.append(
+                {
+                    "series": series.pk,
+                    "fitness_class": fitness_class.pk if fitness_class else None,
+                    "name": series.name,
+                    "instructor": series.instructor_id,
+                    "schedule": day,
+                    "start_time": series.start_time,
+                    "duration": series.duration,
+                    "capacity": (
+                        fitness_class.capacity if fitness_class else series.capacity
+                    ),
+                    "booked_count": fitness_class.booked_count if fitness_class else 0,
+                }
+            )
+    occurrences.sort(
+        key=lambda occurrence: (occurrence["schedule"], occurrence["name"])
+    )
+    return occurrences
+
+
+def materialize_occurrence(series, day):
+    """Return the FitnessClass of an occurrence, creating it if needed."""
+    if not is_occurrence(series, day):
+        raise ValidationError({"date": "The series has no class on this date."})
+
+    defaults = {
+        "name": series.name,
+        "description": series.description,
+        "instructor_id": series.instructor_id,
+        "start_time": series.start_time,
+        "duration": series.duration,
+        "capacity": series.capacity,
+    }
+    try:
+        with transaction.atomic():
+            fitness_class, _ = FitnessClass.objects.get_or_create(
+                series=series, schedule=day, defaults=defaults
+            )
+    except IntegrityError:
+        # created by a concurrent booking (unique_series_occurrence), or the
+        # instructor teaches another class then (no_instructor_overlap)
+        fitness_class = FitnessClass.objects.filter(series=series, schedule=day).first()
+        if fitness_class is None:
+            raise ValidationError(
+                {"date": "The instructor already teaches a class at this time."}
+            )
+    return fitness_class
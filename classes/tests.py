@@ -1,3 +1,993 @@
-from django.test import TestCase
+import threading
+from io import StringIO
+from datetime import date, datetime, time, timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from api.query_budget import assert_max_queries
+from classes.attendance import close_finished_classes, mark_roster
+from classes.bookings import reserve_seat, release_seat
+from classes.models import ClassSeries, FitnessClass, Booking, Attendance, Waitlist
+from classes.serializers import (
+    BookFitnessClassSerializer,
+    CreateFitnessClassSerializer,
+    UpdateBookedFitnessClassSerializer,
+)
+from reviews.models import Feedback
+from reports.cache import get_version
+from reports.models import AttendanceRollup
+
+User = get_user_model()
+
 
 # Create your tests here.
+
+
+def create_class(instructor, **fields):
+    return FitnessClass.objects.create(
+        **{
+            "name": "Yoga",
+            "description": "Stretch",
+            "instructor": instructor,
+            "schedule": timezone.now().date() + timedelta(days=1),
+            "duration": 60,
+            "capacity": 10,
+            **fields,
+        }
+    )
+
+
+class FitnessClassSaveTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.member = User.objects.create_user("member@x.com", "pw")
+        self.fitness_class = create_class(self.instructor)
+
+    def test_full_save_keeps_counters_updated_meanwhile(self):
+        stale = FitnessClass.objects.get(pk=self.fitness_class.pk)
+        reserve_seat(self.fitness_class.pk)
+        Feedback.objects.create(
+            user=self.member, fitness_class=self.fitness_class, ratings=5, comment="ok"
+        )
+
+        stale.name = "Power Yoga"
+        stale.save()
+
+        fitness_class = FitnessClass.objects.get(pk=self.fitness_class.pk)
+        self.assertEqual(fitness_class.name, "Power Yoga")
+        self.assertEqual(fitness_class.booked_count, 1)
+        self.assertEqual(
+            (fitness_class.rating_count, fitness_class.rating_5_count), (1, 1)
+        )
+
+    def test_serializer_update_keeps_booked_count(self):
+        stale = FitnessClass.objects.get(pk=self.fitness_class.pk)
+        reserve_seat(self.fitness_class.pk)
+
+        serializer = CreateFitnessClassSerializer(
+            stale, data={"capacity": 20}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        fitness_class = FitnessClass.objects.get(pk=self.fitness_class.pk)
+        self.assertEqual((fitness_class.capacity, fitness_class.booked_count), (20, 1))
+
+    def test_counters_named_in_update_fields_are_saved(self):
+        self.fitness_class.booked_count = 3
+        self.fitness_class.save(update_fields=["booked_count"])
+
+        self.fitness_class.refresh_from_db()
+        self.assertEqual(self.fitness_class.booked_count, 3)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    def setUp(self):
+        # every thread opens its own connection, an in-memory SQLite test
+        # database fails those with "table is locked" instead of waiting
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("needs a test database shared by several connections")
+
+    def test_last_seats_are_never_overbooked(self):
+        capacity, attempts = 2, 6
+        instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        members = [
+            User.objects.create_user(f"member{number}@x.com", "pw")
+            for number in range(attempts)
+        ]
+        fitness_class = create_class(instructor, capacity=capacity)
+
+        barrier = threading.Barrier(attempts)
+        results = []
+
+        def book(member):
+            serializer = BookFitnessClassSerializer(
+                data={"fitness_class_id": fitness_class.pk}, context={"user": member}
+            )
+            try:
+                serializer.is_valid(raise_exception=True)
+                barrier.wait()
+                serializer.save()
+                results.append("BOOKED")
+            except serializers.ValidationError:
+                results.append("FULL")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=[member]) for member in members]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count("BOOKED"), capacity)
+        self.assertEqual(results.count("FULL"), attempts - capacity)
+        self.assertEqual(Booking.objects.count(), capacity)
+        fitness_class.refresh_from_db()
+        self.assertEqual(fitness_class.booked_count, capacity)
+
+
+class SeatAccountingTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.member = User.objects.create_user("member@x.com", "pw")
+        self.fitness_class = create_class(instructor, capacity=2)
+
+    def booked_count(self):
+        return FitnessClass.objects.get(pk=self.fitness_class.pk).booked_count
+
+    def book(self):
+        serializer = BookFitnessClassSerializer(
+            data={"fitness_class_id": self.fitness_class.pk},
+            context={"user": self.member},
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_reserve_seat_refuses_when_the_class_is_full(self):
+        self.assertTrue(reserve_seat(self.fitness_class.pk))
+        self.assertTrue(reserve_seat(self.fitness_class.pk))
+
+        self.assertFalse(reserve_seat(self.fitness_class.pk))
+        self.assertEqual(self.booked_count(), 2)
+
+    def test_release_seat_never_goes_below_zero(self):
+        reserve_seat(self.fitness_class.pk)
+
+        release_seat(self.fitness_class.pk)
+        release_seat(self.fitness_class.pk)
+
+        self.assertEqual(self.booked_count(), 0)
+
+    def test_booking_a_full_class_is_rejected(self):
+        FitnessClass.objects.filter(pk=self.fitness_class.pk).update(booked_count=2)
+
+        with self.assertRaisesMessage(
+            serializers.ValidationError, "This class is fully booked."
+        ):
+            self.book()
+
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(self.booked_count(), 2)
+
+    def test_reactivating_a_booking_needs_a_free_seat(self):
+        booking = self.book()
+        self.assertEqual(self.booked_count(), 1)
+
+        cancel = UpdateBookedFitnessClassSerializer(
+            booking, data={"status": "CANCELLED"}, partial=True
+        )
+        cancel.is_valid(raise_exception=True)
+        cancel.save()
+        self.assertEqual(self.booked_count(), 0)
+
+        FitnessClass.objects.filter(pk=self.fitness_class.pk).update(booked_count=2)
+        reactivate = UpdateBookedFitnessClassSerializer(
+            booking, data={"status": "BOOKED"}, partial=True
+        )
+        reactivate.is_valid(raise_exception=True)
+        with self.assertRaisesMessage(
+            serializers.ValidationError, "This class is fully booked."
+        ):
+            reactivate.save()
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, "CANCELLED")
+        self.assertEqual(self.booked_count(), 2)
+
+
+class BulkBookingTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.member = User.objects.create_user("member@x.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def create_classes(self, count, **fields):
+        return [
+            create_class(self.instructor, name=f"Class {number}", **fields).pk
+            for number in range(count)
+        ]
+
+    def book(self, fitness_class_ids):
+        response = self.client.post(
+            "/api/v1/bookings/bulk/",
+            {"fitness_class_ids": fitness_class_ids},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_query_count_does_not_grow_with_the_classes(self):
+        one = self.create_classes(1)
+        many = self.create_classes(20)
+        budget = settings.QUERY_BUDGETS["bookings-bulk:POST"]
+
+        with assert_max_queries(budget) as single:
+            self.book(one)
+        with assert_max_queries(single.count):
+            results = self.book(many)
+
+        self.assertEqual([result["status"] for result in results], ["BOOKED"] * 20)
+        self.assertEqual(Booking.objects.count(), 21)
+        self.assertEqual(
+            set(FitnessClass.objects.values_list("booked_count", flat=True)), {1}
+        )
+
+    def test_each_class_is_rejected_on_its_own(self):
+        today = timezone.now().date()
+        open_class = create_class(self.instructor, name="Open")
+        past = create_class(
+            self.instructor, name="Past", schedule=today - timedelta(days=1)
+        )
+        full = create_class(self.instructor, name="Full", capacity=1)
+        FitnessClass.objects.filter(pk=full.pk).update(booked_count=1)
+        booked = create_class(self.instructor, name="Booked")
+        Booking.objects.create(user=self.member, fitness_class=booked)
+
+        results = self.book([open_class.pk, past.pk, full.pk, booked.pk, 999999])
+
+        self.assertEqual(
+            [(result["status"], result.get("error")) for result in results],
+            [
+                ("BOOKED", None),
+                ("FAILED", "Cannot book a class that has already occurred."),
+                ("FAILED", "This class is fully booked."),
+                ("FAILED", "You have already booked this class."),
+                ("FAILED", "Fitness class not found."),
+            ],
+        )
+        self.assertEqual(Booking.objects.filter(user=self.member).count(), 2)
+        full.refresh_from_db()
+        self.assertEqual(full.booked_count, 1)
+
+    def test_a_class_listed_twice_is_booked_once(self):
+        [class_id] = self.create_classes(1)
+
+        results = self.book([class_id, class_id])
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class WaitlistTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin@x.com", "pw")
+        self.members = [
+            User.objects.create_user(f"member{number}@x.com", "pw")
+            for number in range(3)
+        ]
+        self.fitness_class = create_class(self.admin, capacity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.members[0])
+        self.client.post(
+            "/api/v1/bookings/", {"fitness_class_id": self.fitness_class.pk}
+        )
+        self.booking = Booking.objects.get()
+        self.url = f"/api/v1/fitness-classes/{self.fitness_class.pk}/waitlist/"
+
+    def join(self, member):
+        self.client.force_authenticate(member)
+        return self.client.post(self.url)
+
+    def position(self, member):
+        self.client.force_authenticate(member)
+        return self.client.get(self.url).data
+
+    def booked_members(self):
+        return set(
+            Booking.objects.filter(status="BOOKED").values_list("user", flat=True)
+        )
+
+    def cancel(self):
+        self.client.force_authenticate(self.members[0])
+        return self.client.patch(
+            f"/api/v1/bookings/{self.booking.pk}/update_status/",
+            {"status": "CANCELLED"},
+        )
+
+    def test_waitlist_is_first_in_first_out(self):
+        self.assertEqual(self.join(self.members[1]).status_code, 201)
+        self.assertEqual(self.join(self.members[2]).status_code, 201)
+
+        self.assertEqual(self.position(self.members[1]), {"position": 1, "waiting": 2})
+        self.assertEqual(self.position(self.members[2]), {"position": 2, "waiting": 2})
+        self.assertEqual(
+            self.position(self.members[0]), {"position": None, "waiting": 2}
+        )
+
+        self.client.force_authenticate(self.members[1])
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertEqual(self.position(self.members[2]), {"position": 1, "waiting": 1})
+
+    def test_only_full_classes_can_be_joined_once(self):
+        self.assertEqual(self.join(self.members[0]).status_code, 400)
+        self.join(self.members[1])
+        self.assertEqual(self.join(self.members[1]).status_code, 400)
+
+        FitnessClass.objects.filter(pk=self.fitness_class.pk).update(capacity=2)
+        self.assertEqual(self.join(self.members[2]).status_code, 400)
+
+    def test_cancelling_promotes_the_head_of_the_queue(self):
+        self.join(self.members[1])
+        self.join(self.members[2])
+
+        self.assertEqual(self.cancel().status_code, 200)
+
+        self.assertEqual(self.booked_members(), {self.members[1].pk})
+        self.assertEqual(
+            list(Waitlist.objects.values_list("user", flat=True)),
+            [self.members[2].pk],
+        )
+        self.fitness_class.refresh_from_db()
+        self.assertEqual(self.fitness_class.booked_count, 1)
+
+    def test_deleting_a_booking_promotes_the_head_of_the_queue(self):
+        self.join(self.members[1])
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.delete(f"/api/v1/bookings/{self.booking.pk}/")
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.booked_members(), {self.members[1].pk})
+        self.assertFalse(Waitlist.objects.exists())
+
+    def test_nobody_is_promoted_into_a_past_class(self):
+        self.join(self.members[1])
+        FitnessClass.objects.filter(pk=self.fitness_class.pk).update(
+            schedule=timezone.now().date() - timedelta(days=1)
+        )
+
+        self.assertEqual(self.cancel().status_code, 200)
+
+        self.assertEqual(self.booked_members(), set())
+        self.fitness_class.refresh_from_db()
+        self.assertEqual(self.fitness_class.booked_count, 0)
+
+
+class RosterAttendanceTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.members = [
+            User.objects.create_user(f"member{number}@x.com", "pw")
+            for number in range(3)
+        ]
+        self.fitness_class = create_class(self.instructor)
+        self.client = APIClient()
+        self.client.force_authenticate(self.instructor)
+
+    def mark(self, present, absent):
+        return self.client.post(
+            f"/api/v1/fitness-classes/{self.fitness_class.pk}/attendance/",
+            {
+                "present": [member.pk for member in present],
+                "absent": [member.pk for member in absent],
+            },
+            format="json",
+        )
+
+    def test_marking_again_updates_the_rows_in_place(self):
+        first, second, third = self.members
+        self.assertEqual(self.mark([first, second], [third]).status_code, 200)
+
+        response = self.mark([first], [second])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(
+            dict(Attendance.objects.values_list("user", "status")),
+            {first.pk: "PRESENT", second.pk: "ABSENT", third.pk: "ABSENT"},
+        )
+
+    def test_rollup_bucket_follows_the_roster(self):
+        first, second, third = self.members
+        self.mark([first, second], [third])
+        self.mark([first], [second])
+
+        rollup = AttendanceRollup.objects.get(
+            fitness_class=self.fitness_class, date=self.fitness_class.schedule
+        )
+        self.assertEqual(
+            (rollup.present_count, rollup.absent_count, rollup.total_count),
+            (1, 2, 3),
+        )
+
+    def test_report_version_is_bumped_after_commit(self):
+        version = get_version(Attendance)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            mark_roster(
+                self.fitness_class,
+                self.fitness_class.schedule,
+                [self.members[0].pk],
+                [],
+            )
+            self.assertEqual(get_version(Attendance), version)
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertGreater(get_version(Attendance), version)
+
+    def test_invalid_rosters_are_rejected(self):
+        first, second, _ = self.members
+        self.assertEqual(self.mark([first], [first]).status_code, 400)
+        self.assertEqual(self.mark([], []).status_code, 400)
+
+        response = self.client.post(
+            f"/api/v1/fitness-classes/{self.fitness_class.pk}/attendance/",
+            {"present": [second.pk, 999999]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
+
+
+class CloseFinishedClassesTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.members = [
+            User.objects.create_user(f"member{number}@x.com", "pw")
+            for number in range(4)
+        ]
+        yesterday = timezone.now().date() - timedelta(days=1)
+        self.finished = create_class(instructor, schedule=yesterday)
+        self.upcoming = create_class(instructor, name="Spin")
+        for member in self.members[:3]:
+            Booking.objects.create(user=member, fitness_class=self.finished)
+        Booking.objects.create(
+            user=self.members[3], fitness_class=self.finished, status="CANCELLED"
+        )
+        Booking.objects.create(user=self.members[0], fitness_class=self.upcoming)
+        mark_roster(self.finished, yesterday, [self.members[0].pk], [])
+
+    def statuses(self, model, fitness_class):
+        return dict(
+            model.objects.filter(fitness_class=fitness_class).values_list(
+                "user", "status"
+            )
+        )
+
+    def test_finished_classes_are_closed_from_their_bookings(self):
+        first, second, third, _ = self.members
+
+        self.assertEqual(close_finished_classes(), 1)
+
+        self.assertEqual(
+            self.statuses(Attendance, self.finished),
+            {first.pk: "PRESENT", second.pk: "ABSENT", third.pk: "ABSENT"},
+        )
+        self.assertEqual(self.statuses(Booking, self.finished)[first.pk], "ATTENDED")
+        self.assertEqual(self.statuses(Booking, self.finished)[second.pk], "BOOKED")
+        self.assertFalse(Attendance.objects.filter(fitness_class=self.upcoming))
+        self.finished.refresh_from_db()
+        self.assertTrue(self.finished.attendance_closed)
+
+    def test_closing_again_changes_nothing(self):
+        close_finished_classes()
+        attendance = self.statuses(Attendance, self.finished)
+
+        self.assertEqual(close_finished_classes(), 0)
+
+        self.assertEqual(self.statuses(Attendance, self.finished), attendance)
+        self.assertEqual(Attendance.objects.count(), 3)
+
+    def test_marks_after_closing_move_the_bookings(self):
+        first, second, _, _ = self.members
+        close_finished_classes()
+        self.finished.refresh_from_db()
+
+        mark_roster(self.finished, self.finished.schedule, [second.pk], [first.pk])
+
+        bookings = self.statuses(Booking, self.finished)
+        self.assertEqual(bookings[second.pk], "ATTENDED")
+        self.assertEqual(bookings[first.pk], "BOOKED")
+        self.assertEqual(self.statuses(Attendance, self.finished)[second.pk], "PRESENT")
+
+    def test_command_reports_the_closed_classes(self):
+        out = StringIO()
+        call_command("close_finished_classes", stdout=out)
+
+        self.assertIn("Closed 1 finished classes.", out.getvalue())
+
+
+class QueryCountTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.members = [
+            User.objects.create_user(f"member{number}@x.com", "pw")
+            for number in range(10)
+        ]
+        self.client = APIClient()
+
+    def roster_queries(self, size):
+        fitness_class = create_class(self.instructor, name=f"Roster of {size}")
+        for member in self.members[:size]:
+            Booking.objects.create(user=member, fitness_class=fitness_class)
+        Attendance.objects.create(
+            user=self.members[0],
+            fitness_class=fitness_class,
+            date=fitness_class.schedule,
+            status="PRESENT",
+        )
+        self.client.force_authenticate(self.instructor)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                f"/api/v1/fitness-classes/{fitness_class.pk}/roster/"
+            )
+        self.assertEqual(len(response.data), size)
+        return len(queries)
+
+    def test_roster_is_two_queries_whatever_its_size(self):
+        # the class lookup (404) and the roster itself
+        self.assertEqual(self.roster_queries(1), 2)
+        self.assertEqual(self.roster_queries(len(self.members)), 2)
+
+    def test_member_booking_list_is_one_query(self):
+        member = self.members[0]
+        for number in range(5):
+            fitness_class = create_class(
+                self.instructor,
+                name=f"Class {number}",
+                schedule=timezone.now().date() + timedelta(days=number + 1),
+            )
+            Booking.objects.create(user=member, fitness_class=fitness_class)
+        self.client.force_authenticate(member)
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/bookings/")
+        self.assertEqual(len(response.data["results"]), 5)
+
+
+class SeriesBookingTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.member = User.objects.create_user("member@x.com", "pw")
+        self.series = ClassSeries.objects.create(
+            name="Morning Yoga",
+            description="Stretch",
+            instructor=self.instructor,
+            duration=60,
+            capacity=10,
+            frequency="DAILY",
+            starts_on=timezone.now().date() - timedelta(days=7),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def book(self, day):
+        return self.client.post(
+            f"/api/v1/class-series/{self.series.pk}/book/", {"date": day.isoformat()}
+        )
+
+    def test_booking_creates_the_occurrence(self):
+        day = timezone.now().date() + timedelta(days=1)
+
+        response = self.book(day)
+
+        self.assertEqual(response.status_code, 201)
+        fitness_class = FitnessClass.objects.get(series=self.series)
+        self.assertEqual((fitness_class.schedule, fitness_class.booked_count), (day, 1))
+
+    def test_rejected_booking_leaves_no_occurrence(self):
+        response = self.book(timezone.now().date() - timedelta(days=1))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FitnessClass.objects.filter(series=self.series).exists())
+
+
+class SchedulingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin@x.com", "pw")
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create(self, start_time, **fields):
+        return self.client.post(
+            "/api/v1/fitness-classes/",
+            {
+                "name": f"Class at {start_time}",
+                "description": "Class",
+                "instructor": self.instructor.pk,
+                "schedule": self.day.isoformat(),
+                "start_time": start_time,
+                "duration": 60,
+                "capacity": 10,
+                **fields,
+            },
+        )
+
+    def at(self, hour, minute=0):
+        return timezone.make_aware(datetime.combine(self.day, time(hour, minute)))
+
+    def test_overlapping_classes_are_rejected(self):
+        self.assertEqual(self.create("09:00").status_code, 201)
+
+        response = self.create("09:30")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("start_time", response.data)
+
+        # back to back is fine, and so is another instructor at the same time
+        self.assertEqual(self.create("10:00").status_code, 201)
+        self.assertEqual(
+            self.create("09:30", instructor=self.admin.pk).status_code, 201
+        )
+
+    def test_moving_a_class_onto_another_is_rejected(self):
+        self.create("09:00")
+        later = FitnessClass.objects.get(pk=self.create("11:00").data["id"])
+
+        response = self.client.patch(
+            f"/api/v1/fitness-classes/{later.pk}/", {"start_time": "09:15"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.patch(
+            f"/api/v1/fitness-classes/{later.pk}/", {"start_time": "10:30"}
+        )
+        self.assertEqual(response.status_code, 200)
+        later.refresh_from_db()
+        self.assertEqual(
+            (later.starts_at, later.ends_at), (self.at(10, 30), self.at(11, 30))
+        )
+
+    def test_new_classes_need_a_start_time(self):
+        response = self.client.post(
+            "/api/v1/fitness-classes/",
+            {
+                "name": "Yoga",
+                "description": "Stretch",
+                "instructor": self.instructor.pk,
+                "schedule": self.day.isoformat(),
+                "duration": 60,
+                "capacity": 10,
+            },
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("start_time", response.data)
+
+    def test_availability_lists_the_free_slots(self):
+        self.create("09:00")
+        self.create("10:00")
+        self.create("13:00", duration=30)
+        self.create("07:00", instructor=self.admin.pk)
+
+        response = self.client.get(
+            "/api/v1/fitness-classes/availability/",
+            {
+                "instructor": self.instructor.pk,
+                "from": self.day.isoformat(),
+                "to": self.day.isoformat(),
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(slot["start"], slot["end"]) for slot in response.data["free_slots"]],
+            [
+                (self.at(6), self.at(9)),
+                (self.at(11), self.at(13)),
+                (self.at(13, 30), self.at(22)),
+            ],
+        )
+
+    def test_series_occurrences_keep_the_start_time(self):
+        response = self.client.post(
+            "/api/v1/class-series/",
+            {
+                "name": "Morning Yoga",
+                "description": "Stretch",
+                "instructor": self.instructor.pk,
+                "duration": 45,
+                "capacity": 10,
+                "frequency": "DAILY",
+                "starts_on": self.day.isoformat(),
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("start_time", response.data)
+
+        series = ClassSeries.objects.create(
+            name="Morning Yoga",
+            description="Stretch",
+            instructor=self.instructor,
+            start_time=time(7, 0),
+            duration=45,
+            capacity=10,
+            frequency="DAILY",
+            starts_on=self.day,
+        )
+        self.client.post(
+            f"/api/v1/class-series/{series.pk}/book/", {"date": self.day.isoformat()}
+        )
+
+        fitness_class = FitnessClass.objects.get(series=series)
+        self.assertEqual(fitness_class.start_time, time(7, 0))
+        self.assertEqual(
+            (fitness_class.starts_at, fitness_class.ends_at),
+            (self.at(7), self.at(7, 45)),
+        )
+
+
+class TimetableTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.member = User.objects.create_user("member@x.com", "pw")
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.series = ClassSeries.objects.create(
+            name="Morning Yoga",
+            description="Stretch",
+            instructor=self.instructor,
+            start_time=time(7, 0),
+            duration=45,
+            capacity=10,
+            frequency="DAILY",
+            starts_on=self.day,
+            ends_on=self.day + timedelta(days=2),
+        )
+        self.spin = create_class(
+            self.instructor,
+            name="Spin",
+            schedule=self.day,
+            start_time=time(9, 0),
+            capacity=5,
+        )
+        FitnessClass.objects.filter(pk=self.spin.pk).update(booked_count=3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def timetable(self):
+        response = self.client.get(
+            "/api/v1/fitness-classes/timetable/",
+            {
+                "from": self.day.isoformat(),
+                "to": (self.day + timedelta(days=2)).isoformat(),
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+    def test_stored_classes_and_occurrences_are_merged(self):
+        self.client.post(
+            f"/api/v1/class-series/{self.series.pk}/book/",
+            {"date": (self.day + timedelta(days=1)).isoformat()},
+        )
+        booked = FitnessClass.objects.get(series=self.series)
+
+        rows = [
+            (row["id"], row["name"], row["schedule"], row["seats_left"])
+            for row in self.timetable()
+        ]
+
+        second, third = self.day + timedelta(days=1), self.day + timedelta(days=2)
+        self.assertEqual(
+            rows,
+            [
+                (None, "Morning Yoga", str(self.day), 10),
+                (self.spin.pk, "Spin", str(self.day), 2),
+                (booked.pk, "Morning Yoga", str(second), 9),
+                (None, "Morning Yoga", str(third), 10),
+            ],
+        )
+
+    def test_rows_carry_their_start_and_end(self):
+        rows = self.timetable()
+
+        self.assertEqual(
+            [(row["start_time"], parse_datetime(row["ends_at"])) for row in rows[:2]],
+            [
+                ("07:00:00", self.at(self.day, 7, 45)),
+                ("09:00:00", self.at(self.day, 10)),
+            ],
+        )
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.member = User.objects.create_user("member@x.com", "pw")
+        self.fitness_class = create_class(self.instructor)
+        self.booking = Booking.objects.create(
+            user=self.member, fitness_class=self.fitness_class
+        )
+        Attendance.objects.create(
+            user=self.member,
+            fitness_class=self.fitness_class,
+            date=self.fitness_class.schedule,
+            status="PRESENT",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def test_fields_select_the_keys_and_collapse_relations(self):
+        response = self.client.get(
+            "/api/v1/fitness-classes/", {"fields": "id,name,instructor"}
+        )
+
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "id": self.fitness_class.pk,
+                    "name": "Yoga",
+                    "instructor": self.instructor.pk,
+                }
+            ],
+        )
+
+    def test_expand_embeds_a_relation(self):
+        collapsed = self.client.get("/api/v1/bookings/", {"fields": "id,fitness_class"})
+        expanded = self.client.get("/api/v1/bookings/", {"expand": "fitness_class"})
+
+        self.assertEqual(
+            collapsed.data["results"][0]["fitness_class"], self.fitness_class.pk
+        )
+        self.assertEqual(
+            expanded.data["results"][0]["fitness_class"]["id"], self.fitness_class.pk
+        )
+
+    def test_dotted_fields_select_inside_a_relation(self):
+        self.client.force_authenticate(self.instructor)
+
+        response = self.client.get(
+            "/api/v1/attendance/", {"fields": "id,date,user.email"}
+        )
+
+        row = response.data["results"][0]
+        self.assertEqual(set(row), {"id", "date", "user"})
+        self.assertEqual(row["user"], {"email": "member@x.com"})
+
+    def test_unknown_field_is_a_bad_request(self):
+        response = self.client.get("/api/v1/fitness-classes/", {"fields": "id,nope"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("fields", response.data)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.admin = User.objects.create_superuser("admin@x.com", "pw")
+        self.yoga = create_class(instructor, name="Yoga", description="Stretch")
+        self.spin = create_class(instructor, name="Spin", description="Bike")
+        self.bookings = [
+            Booking.objects.create(
+                user=User.objects.create_user(f"member{number}@x.com", "pw"),
+                fitness_class=fitness_class,
+                status=status,
+            )
+            for number, (fitness_class, status) in enumerate(
+                [(self.yoga, "BOOKED"), (self.spin, "CANCELLED")]
+            )
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def search(self, url, term):
+        response = self.client.get(url, {"search": term})
+        return [row["id"] for row in response.data["results"]]
+
+    def test_text_fields_match_words_and_substrings(self):
+        # full-text on Postgres, a substring match on other databases
+        self.assertEqual(
+            self.search("/api/v1/fitness-classes/", "stretch"), [self.yoga.pk]
+        )
+        self.assertEqual(self.search("/api/v1/fitness-classes/", "spi"), [self.spin.pk])
+
+    def test_every_term_has_to_match(self):
+        self.assertEqual(self.search("/api/v1/fitness-classes/", "yoga spin"), [])
+
+    def test_related_fields_match(self):
+        self.assertEqual(
+            self.search("/api/v1/bookings/", "member1@"), [self.bookings[1].pk]
+        )
+        self.assertEqual(self.search("/api/v1/bookings/", "yog"), [self.bookings[0].pk])
+
+    def test_exact_fields_match_the_whole_value(self):
+        self.assertEqual(
+            self.search("/api/v1/bookings/", "cancelled"), [self.bookings[1].pk]
+        )
+        self.assertEqual(self.search("/api/v1/bookings/", "cancel"), [])
+
+
+class FilterTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.admin = User.objects.create_superuser("admin@x.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def ids(self, url, params):
+        response = self.client.get(url, params)
+        return sorted(row["id"] for row in response.data["results"])
+
+    def test_booking_date_range_covers_both_days_in_full(self):
+        fitness_class = create_class(self.instructor)
+        booked_at = [
+            datetime(2024, 12, 31, 23, 59, 59),
+            datetime(2025, 1, 1, 0, 0),
+            datetime(2025, 1, 31, 23, 59, 59, 999999),
+            datetime(2025, 2, 1, 0, 0),
+        ]
+        bookings = []
+        for number, moment in enumerate(booked_at):
+            booking = Booking.objects.create(
+                user=User.objects.create_user(f"member{number}@x.com", "pw"),
+                fitness_class=fitness_class,
+            )
+            Booking.objects.filter(pk=booking.pk).update(
+                booking_date=timezone.make_aware(moment)
+            )
+            bookings.append(booking.pk)
+
+        url = "/api/v1/bookings/"
+        january = {
+            "booking_date_after": "2025-01-01",
+            "booking_date_before": "2025-01-31",
+        }
+        self.assertEqual(self.ids(url, january), bookings[1:3])
+        self.assertEqual(
+            self.ids(url, {"booking_date_after": "2025-01-31"}), bookings[2:]
+        )
+        self.assertEqual(
+            self.ids(url, {"booking_date_before": "2024-12-31"}), bookings[:1]
+        )
+
+    def test_schedule_range_is_inclusive(self):
+        classes = [
+            create_class(
+                self.instructor, name=f"Class {day}", schedule=date(2025, 1, day)
+            )
+            for day in [5, 6, 12, 13]
+        ]
+
+        ids = self.ids(
+            "/api/v1/fitness-classes/",
+            {"schedule_after": "2025-01-06", "schedule_before": "2025-01-12"},
+        )
+
+        self.assertEqual(ids, [classes[1].pk, classes[2].pk])
+
+    def test_invalid_values_are_bad_requests(self):
+        for params in [
+            {"booking_date_after": "2025-13-01"},
+            {"status": "SOMETIMES"},
+            {"fitness_class": "three"},
+        ]:
+            with self.subTest(params):
+                response = self.client.get("/api/v1/bookings/", params)
+                self.assertEqual(response.status_code, 400)
@@ -1,5 +1,12 @@
 from rest_framework.viewsets import ModelViewSet
-from classes.models import FitnessClass, Booking, Attendance, FitnessClassImage
+from classes.models import (
+    ClassSeries,
+    SeriesException,
+    FitnessClass,
+    Booking,
+    Attendance,
+    FitnessClassImage,
+)
 from classes.serializers import (
     FitnessClassSerializer,
     BookingClassSerializer,
@@ -10,28 +17,73 @@ from classes.serializers import (
     CreateAttendanceSerializer,
     UpdateAttendanceSerializer,
     CreateFitnessClassSerializer,
+    BulkBookingSerializer,
+    WaitlistSerializer,
+    RosterAttendanceSerializer,
+    RosterMemberSerializer,
+    ClassSeriesSerializer,
+    SeriesExceptionSerializer,
+    OccurrenceSerializer,
+    BookOccurrenceSerializer,
+    TimetableSerializer,
 )
 from classes.permissions import AdminOrReadOnlyFitnessClass
+from classes.paginations import DefaultPagination
+from api.fieldsets import SparseFieldsViewMixin
 from api.permissions import IsAdminOrReadOnly, IsAdminOrStaff
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.filters import SearchFilter
+from api.search import IndexedSearchFilter
+from django_filters.rest_framework import DjangoFilterBackend
+from classes.filters import FitnessClassFilter, BookingFilter, AttendanceFilter
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.db.models import F
+from django.utils import timezone
+from datetime import time, timedelta
+from rest_framework.exceptions import ValidationError
+from classes.bookings import book_classes
+from classes.attendance import mark_roster, class_roster
+from classes.scheduling import free_slots
+from classes.series import (
+    expand_occurrences,
+    materialize_occurrence,
+    get_window,
+)
+from classes.waitlist import (
+    hand_over_seat,
+    join_waitlist,
+    leave_waitlist,
+    waitlist_position,
+)
 
 
 # Create your views here.
 
 
-class FitnessClassViewSet(ModelViewSet):
+class FitnessClassViewSet(SparseFieldsViewMixin, ModelViewSet):
     """
     API endpoints for managing fitness class:
      - Allow authenticated Admin to manage all fitness classes
      - Allow authenticated Staff to create, update and delete fitness class
      - Allow authenticated Members to view fitness classes and info
+     - Allow authenticated Members to join the waitlist of a full class
+        and check their position in the queue
+     - Allow authenticated Staff to mark the attendance of a whole class
+        and view its roster
+     - Allow everyone to view the timetable of a date range with the
+        seats left in each class, and the free slots of an instructor
+     - Reject classes that overlap another class of their instructor
     """
 
-    filter_backends = [SearchFilter]
-    search_fields = ["name", "description"]
+    replica_ok = True
+
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
+    filterset_class = FitnessClassFilter
+    search_fields = ["@name", "@description", "name"]
+    pagination_class = DefaultPagination
+    keyset_ordering = ("schedule", "id")
 
     queryset = (
         FitnessClass.objects.select_related("instructor")
@@ -41,11 +93,255 @@ class FitnessClassViewSet(ModelViewSet):
     permission_classes = [AdminOrReadOnlyFitnessClass]
     serializer_class = FitnessClassSerializer
 
+    def get_permissions(self):
+        if self.action == "waitlist":
+            return [IsAuthenticated()]
+        if self.action == "attendance":
+            return [IsAdminOrStaff()]
+        if self.action == "roster":
+            return [IsAdminUser()]
+        return super().get_permissions()
+
     def get_serializer_class(self):
-        if self.request.method == "POST":
+        if self.action == "waitlist":
+            return WaitlistSerializer
+        if self.action == "attendance":
+            return RosterAttendanceSerializer
+        if self.action == "roster":
+            return RosterMemberSerializer
+        if self.action == "timetable":
+            return TimetableSerializer
+        if self.request.method in ["POST", "PUT", "PATCH"]:
             return CreateFitnessClassSerializer
         return FitnessClassSerializer
 
+    @action(detail=False, methods=["get"])
+    def timetable(self, request):
+        """
+        Compact list of the classes between ?from= and ?to= (YYYY-MM-DD)
+        with the seats left, including the occurrences of class series
+        that nobody has booked yet (id is null for those). Classes of a
+        day are sorted by start_time.
+        """
+        start, end = get_window(request)
+
+        classes = (
+            FitnessClass.objects.filter(schedule__gte=start, schedule__lte=end)
+            .annotate(seats_left=F("capacity") - F("booked_count"))
+            .values(
+                "id",
+                "series",
+                "name",
+                "instructor",
+                "schedule",
+                "start_time",
+                "ends_at",
+                "duration",
+                "capacity",
+                "seats_left",
+            )
+        )
+        timetable = list(classes) + [
+            {
+                "id": None,
+                "series": occurrence["series"],
+                "name": occurrence["name"],
+                "instructor": occurrence["instructor"],
+                "schedule": occurrence["schedule"],
+                "start_time": occurrence["start_time"],
+                # same interval as the FitnessClass the occurrence would become
+                "ends_at": FitnessClass(
+                    schedule=occurrence["schedule"],
+                    start_time=occurrence["start_time"],
+                    duration=occurrence["duration"],
+                ).get_interval()[1],
+                "duration": occurrence["duration"],
+                "capacity": occurrence["capacity"],
+                "seats_left": occurrence["capacity"],
+            }
+            for occurrence in expand_occurrences(start, end)
+            if occurrence["fitness_class"] is None
+        ]
+        timetable.sort(
+            key=lambda row: (
+                row["schedule"],
+                row["start_time"] or time.min,
+                row["name"],
+            )
+        )
+
+        serializer = self.get_serializer(timetable, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    def availability(self, request):
+        """
+        Free slots of ?instructor= within opening hours between ?from= and
+        ?to= (YYYY-MM-DD), defaults to the current week.
+        """
+        try:
+            instructor_id = int(request.query_params.get("instructor", ""))
+        except ValueError:
+            raise ValidationError({"instructor": "A valid instructor id is required."})
+
+        if "from" in request.query_params or "to" in request.query_params:
+            start, end = get_window(request)
+        else:
+            today = timezone.now().date()
+            start = today - timedelta(days=today.weekday())
+            end = start + timedelta(days=6)
+
+        return Response(
+            {
+                "instructor": instructor_id,
+                "from": start,
+                "to": end,
+                "free_slots": free_slots(instructor_id, start, end),
+            }
+        )
+
+    @action(detail=True, methods=["get", "post", "delete"])
+    def waitlist(self, request, pk=None):
+        """
+        GET: your position in the waitlist of this class
+        POST: join the waitlist of this (full) class
+        DELETE: leave the waitlist of this class
+        """
+        fitness_class = self.get_object()
+
+        if request.method == "POST":
+            entry = join_waitlist(request.user, fitness_class.pk)
+            return Response(self.get_serializer(entry).data, status=201)
+
+        if request.method == "DELETE":
+            if not leave_waitlist(request.user, fitness_class.pk):
+                return Response(
+                    {"detail": "You are not on the waitlist of this class."},
+                    status=404,
+                )
+            return Response(status=204)
+
+        position, waiting = waitlist_position(request.user, fitness_class.pk)
+        return Response({"position": position, "waiting": waiting})
+
+    @action(detail=True, methods=["post"])
+    def attendance(self, request, pk=None):
+        """
+        Mark the attendance of the class in one request:
+        {"date": "2025-01-31", "present": [1, 2], "absent": [3]}
+        The date defaults to the class schedule, members already marked
+        on that date are updated. Returns the roster of that date.
+        """
+        fitness_class = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        roster = mark_roster(
+            fitness_class,
+            serializer.validated_data.get("date", fitness_class.schedule),
+            serializer.validated_data["present"],
+            serializer.validated_data["absent"],
+        )
+        return Response(AttendanceSerializer(roster, many=True).data)
+
+    @action(detail=True, methods=["get"])
+    def roster(self, request, pk=None):
+        """
+        Booked members of the class with their contact info, booking status
+        and attendance status (null until marked), in a single query.
+        """
+        get_object_or_404(FitnessClass.objects.only("id"), pk=pk)
+        serializer = self.get_serializer(class_roster(pk), many=True)
+        return Response(serializer.data)
+
+
+class ClassSeriesViewSet(ModelViewSet):
+    """
+    API endpoints for managing recurring class series
+     - Allow authenticated Staff to create, update and delete series
+        and their exception dates
+     - Allow authenticated Members to view the occurrences of the series
+        in a date window and to book an occurrence
+     - Occurrences are expanded from the recurrence rule on the fly, a
+        fitness class is only created when an occurrence is first booked
+    """
+
+    replica_ok = True
+
+    queryset = (
+        ClassSeries.objects.select_related("instructor")
+        .prefetch_related("exceptions")
+        .all()
+    )
+    pagination_class = DefaultPagination
+    keyset_ordering = ("-id",)
+    permission_classes = [AdminOrReadOnlyFitnessClass]
+    serializer_class = ClassSeriesSerializer
+
+    def get_permissions(self):
+        if self.action == "book":
+            return [IsAuthenticated()]
+        return super().get_permissions()
+
+    def get_serializer_class(self):
+        if self.action == "occurrences":
+            return OccurrenceSerializer
+        if self.action == "book":
+            return BookOccurrenceSerializer
+        return ClassSeriesSerializer
+
+    @action(detail=False, methods=["get"])
+    def occurrences(self, request):
+        """
+        Occurrences of all series between ?from= and ?to= (YYYY-MM-DD),
+        fitness_class is null until the occurrence is first booked.
+        """
+        start, end = get_window(request)
+        serializer = self.get_serializer(expand_occurrences(start, end), many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=["post"])
+    def book(self, request, pk=None):
+        """Book the occurrence of this series on {"date": "YYYY-MM-DD"}."""
+        series = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # a rejected booking (past date, full class) drops the new occurrence
+        with transaction.atomic():
+            fitness_class = materialize_occurrence(
+                series, serializer.validated_data["date"]
+            )
+            booking = BookFitnessClassSerializer(
+                data={"fitness_class_id": fitness_class.pk},
+                context={"user": request.user},
+            )
+            booking.is_valid(raise_exception=True)
+            booking.save()
+        return Response(booking.data, status=201)
+
+
+class SeriesExceptionViewSet(ModelViewSet):
+    """
+    API endpoints for managing the exception dates of a class series
+     - Allow authenticated Staff to add and remove dates on which the
+        series does not take place
+    """
+
+    permission_classes = [AdminOrReadOnlyFitnessClass]
+    serializer_class = SeriesExceptionSerializer
+    pagination_class = DefaultPagination
+    keyset_ordering = ("date", "id")
+
+    def get_queryset(self):
+        return SeriesException.objects.filter(series_id=self.kwargs.get("series_pk"))
+
+    def get_serializer_context(self):
+        return {"series_id": self.kwargs.get("series_pk")}
+
+    def perform_create(self, serializer):
+        serializer.save(series_id=self.kwargs.get("series_pk"))
+
 
 class FitenessClassImageViewSet(ModelViewSet):
     """
@@ -55,6 +351,8 @@ class FitenessClassImageViewSet(ModelViewSet):
 
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = FitnessClassImageSerializer
+    pagination_class = DefaultPagination
+    keyset_ordering = ("id",)
 
     def get_queryset(self):
         return FitnessClassImage.objects.filter(
@@ -65,7 +363,7 @@ class FitenessClassImageViewSet(ModelViewSet):
         serializer.save(fitness_class_id=self.kwargs.get("fitness_class_pk"))
 
 
-class BookingViewSet(ModelViewSet):
+class BookingViewSet(SparseFieldsViewMixin, ModelViewSet):
     """
     API endpoints for managing bookings
      - Allow authenticated admin to manage all bookings
@@ -73,9 +371,12 @@ class BookingViewSet(ModelViewSet):
         booking history and update booking status
     """
 
-    filter_backends = [SearchFilter]
-    search_fields = ["user__email", "fitness_class__name", "status"]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
+    filterset_class = BookingFilter
+    search_fields = ["user__email", "fitness_class__name", "=status"]
     http_method_names = ["post", "get", "delete", "patch"]
+    pagination_class = DefaultPagination
+    keyset_ordering = ("-booking_date", "-id")
 
     def get_permissions(self):
         if self.action in ["destroy"]:
@@ -103,9 +404,30 @@ class BookingViewSet(ModelViewSet):
         self.perform_create(serializer)
         return Response({"status": "Your class booked successfuly."})
 
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Book several classes at once: {"fitness_class_ids": [1, 2, 3]}.
+        Each class is booked or rejected on its own, see the per item results.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = book_classes(
+            request.user, serializer.validated_data["fitness_class_ids"]
+        )
+        return Response({"results": results})
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            if instance.status != "CANCELLED":
+                hand_over_seat(instance.fitness_class_id)
+            instance.delete()
+
     def get_serializer_class(self):
         user = self.request.user
 
+        if self.action == "bulk":
+            return BulkBookingSerializer
         if user.is_superuser:
             return BookingClassSerializer
         if self.action == "update_status":
@@ -125,12 +447,12 @@ class BookingViewSet(ModelViewSet):
                 .prefetch_related("fitness_class__images")
                 .all()
             )
-        return (
-            Booking.objects.select_related("fitness_class").filter(user=user)
+        return Booking.objects.select_related("user", "fitness_class").filter(
+            user=user
         )
 
 
-class AttendanceViewSet(ModelViewSet):
+class AttendanceViewSet(SparseFieldsViewMixin, ModelViewSet):
     """
     API endpoints for managing Attendance
      - Allow authenticated admin to manage attendance
@@ -138,8 +460,11 @@ class AttendanceViewSet(ModelViewSet):
      - Allow authenticated members to view their attendance history
     """
 
-    filter_backends = [SearchFilter]
-    search_fields = ["user__email", "fitness_class__name", "status"]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
+    filterset_class = AttendanceFilter
+    search_fields = ["user__email", "fitness_class__name", "=status"]
+    pagination_class = DefaultPagination
+    keyset_ordering = ("-date", "-id")
 
     def get_serializer_class(self):
         method = self.request.method
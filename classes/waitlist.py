@@ -0,0 +1,106 @@
+"""
+FIFO waitlist of full classes. Every entry has a position which only
+grows within a class, the head of the queue is the entry with the lowest
+position (an index lookup on unique_waitlist_position). Seat hand-overs
+and new entries of a class are serialized by locking its FitnessClass row.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from classes.models import FitnessClass, Booking, Waitlist
+from classes.bookings import release_seat
+
+
+def lock_class(fitness_class_id):
+    return FitnessClass.objects.select_for_update().get(pk=fitness_class_id)
+
+
+def join_waitlist(user, fitness_class_id):
+    with transaction.atomic():
+        fitness_class = lock_class(fitness_class_id)
+
+        if fitness_class.schedule < timezone.now().date():
+            raise ValidationError("Cannot join the waitlist of a past class.")
+        if fitness_class.booked_count < fitness_class.capacity:
+            raise ValidationError("This class has free seats, book it instead.")
+        if (
+            Booking.objects.filter(user=user, fitness_class=fitness_class)
+            .exclude(status="CANCELLED")
+            .exists()
+        ):
+            raise ValidationError("You have already booked this class.")
+
+        last_position = Waitlist.objects.filter(
+            fitness_class=fitness_class
+        ).aggregate(last=Max("position"))["last"]
+
+        try:
+            with transaction.atomic():
+                return Waitlist.objects.create(
+                    user=user,
+                    fitness_class=fitness_class,
+                    position=(last_position or 0) + 1,
+                )
+        except IntegrityError:
+            raise ValidationError("You are already on the waitlist of this class.")
+
+
+def leave_waitlist(user, fitness_class_id):
+    deleted, _ = Waitlist.objects.filter(
+        user=user, fitness_class_id=fitness_class_id
+    ).delete()
+    return bool(deleted)
+
+
+def waitlist_position(user, fitness_class_id):
+    """
+    Return (position, waiting) of the member in the queue, position is
+    1 for the head of the queue and None when the member is not waiting.
+    """
+    position = (
+        Waitlist.objects.filter(user=user, fitness_class_id=fitness_class_id)
+        .values_list("position", flat=True)
+        .first()
+    )
+    counts = Waitlist.objects.filter(fitness_class_id=fitness_class_id).aggregate(
+        ahead=Count("id", filter=Q(position__lt=position or 0)),
+        waiting=Count("id"),
+    )
+    if position is None:
+        return None, counts["waiting"]
+    return counts["ahead"] + 1, counts["waiting"]
+
+
+def hand_over_seat(fitness_class_id):
+    """
+    Give a freed seat to the head of the waitlist, or release it when
+    nobody is waiting or the class has already taken place. Must run in
+    the transaction that frees the seat. Returns the booking of the
+    promoted member, if any.
+    """
+    fitness_class = lock_class(fitness_class_id)
+
+    # nobody is promoted into a class that has already taken place
+    if fitness_class.schedule < timezone.now().date():
+        release_seat(fitness_class_id)
+        return None
+
+    head = Waitlist.objects.filter(fitness_class_id=fitness_class_id)
+    while (entry := head.first()) is not None:
+        entry.delete()
+        try:
+            with transaction.atomic():
+                # the seat moves to the promoted member, booked_count stays as is
+                return Booking.objects.create(
+                    user_id=entry.user_id,
+                    fitness_class_id=fitness_class_id,
+                    status="BOOKED",
+                )
+        except IntegrityError:
+            # the member got a seat some other way, try the next one
+            continue
+
+    release_seat(fitness_class_id)
+    return None
@@ -1,6 +1,7 @@
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 import cloudinary
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "api.query_budget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -56,6 +58,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.ReplicaRoutingMiddleware",
 ]
 
 ROOT_URLCONF = "iron_temple.urls"
@@ -88,15 +91,127 @@ CORS_ALLOWED_ORIGINS = [
 # SUPABASE CONFIG (like postgres):
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # the postgresql backend plus connection metrics (api/db_metrics.py)
+        "ENGINE": "api.backends.postgresql",
         "NAME": config("db_name"),
         "USER": config("db_user"),
         "PASSWORD": config("db_password"),
         "HOST": config("db_host"),
         "PORT": config("db_port"),
+        "OPTIONS": {
+            "connect_timeout": config("DB_CONNECT_TIMEOUT", default=5, cast=int),
+        },
     }
 }
 
+# database connection reuse (DB_POOL_MODE):
+#  - persistent: every worker keeps its connection for DB_CONN_MAX_AGE
+#    seconds (gunicorn), checked before reuse
+#  - serverless: a warm lambda reuses its connection across invocations,
+#    with a short DB_CONN_MAX_AGE so frozen lambdas don't hold it for long
+#  - none: a new connection for every request
+DB_POOL_MODE = config(
+    "DB_POOL_MODE",
+    default="serverless" if config("VERCEL", default="") else "persistent",
+)
+
+if DB_POOL_MODE == "persistent":
+    DATABASES["default"]["CONN_MAX_AGE"] = config(
+        "DB_CONN_MAX_AGE", default=600, cast=int
+    )
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+elif DB_POOL_MODE == "serverless":
+    DATABASES["default"]["CONN_MAX_AGE"] = config(
+        "DB_CONN_MAX_AGE", default=60, cast=int
+    )
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+elif DB_POOL_MODE == "none":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+else:
+    raise ImproperlyConfigured(
+        "DB_POOL_MODE must be one of: persistent, serverless, none."
+    )
+
+# a transaction pooler (Supabase pooler, pgbouncer) may hand every
+# transaction to another server connection, so cursors can't span them
+DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = config(
+    "DB_TRANSACTION_POOLER", default=False, cast=bool
+)
+
+# SQL instrumentation (api/query_budget.py): X-Query-* response headers,
+# a log line per request on the "api.queries" logger and query budgets per
+# url name and method. Over budget requests are logged as warnings, or fail when
+# QUERY_BUDGET_RAISE is on (tests).
+QUERY_INSTRUMENTATION_HEADERS = config(
+    "QUERY_INSTRUMENTATION_HEADERS", default=DEBUG, cast=bool
+)
+QUERY_BUDGET_RAISE = config("QUERY_BUDGET_RAISE", default=False, cast=bool)
+DEFAULT_QUERY_BUDGET = 30
+QUERY_BUDGETS = {
+    "fitness-classes-list:GET": 5,
+    "fitness-classes-detail:GET": 5,
+    "fitness-classes-timetable:GET": 6,
+    "fitness-classes-roster:GET": 4,
+    "memberships-list:GET": 4,
+    "bookings-list:GET": 4,
+    "bookings-bulk:POST": 12,
+    "attendance-list:GET": 4,
+    "feedback-list:GET": 4,
+    "subscriptions-list:GET": 4,
+    "payments-list:GET": 4,
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.queries": {
+            "handlers": ["console"],
+            "level": config("QUERY_LOG_LEVEL", default="WARNING"),
+        },
+    },
+}
+
+# read replicas (DB_REPLICA_HOSTS=host1,host2), same credentials as the
+# primary. Only views tagged replica_ok read from them (api/db_router.py)
+DATABASE_REPLICAS = []
+
+for number, host in enumerate(config("DB_REPLICA_HOSTS", default="", cast=Csv())):
+    alias = f"replica_{number + 1}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        # tests run against the primary only
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["api.db_router.ReplicaRouter"]
+
+# cache (report results). Report results are only cached in a shared
+# cache (Redis): a write bumps the report versions in the cache of the
+# process that made it, so with a per-process cache the other workers
+# would keep serving stale results. Without REDIS_URL reports are
+# computed on every request (see reports/cache.py).
+REDIS_URL = config("REDIS_URL", default="")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,35 @@
+from django_filters import rest_framework as filters
+from plans.models import Membership, Subscription, Payment
+from api.filters import DayRangeFilter
+
+
+class MembershipFilter(filters.FilterSet):
+    price = filters.RangeFilter()
+
+    class Meta:
+        model = Membership
+        fields = ["duration", "price"]
+
+
+class SubscriptionFilter(filters.FilterSet):
+    # subscription_user_member_idx, subscription_start_id_idx
+    start_date = filters.DateFromToRangeFilter()
+    end_date = filters.DateFromToRangeFilter()
+    membership = filters.NumberFilter()
+    user = filters.NumberFilter()
+
+    class Meta:
+        model = Subscription
+        fields = ["status", "membership", "user", "start_date", "end_date"]
+
+
+class PaymentFilter(filters.FilterSet):
+    # payment_status_date_idx, payment_user_status_date_idx
+    payment_date = DayRangeFilter()
+    amount = filters.RangeFilter()
+    subscription = filters.NumberFilter()
+    user = filters.NumberFilter()
+
+    class Meta:
+        model = Payment
+        fields = ["status", "subscription", "user", "payment_date", "amount"]
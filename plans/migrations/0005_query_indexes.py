@@ -0,0 +1,83 @@
+# Generated by Django 5.2 on 2026-10-18 09:01
+
+import logging
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+
+def cancel_duplicate_subscriptions(apps, schema_editor):
+    """
+    Keep the newest active subscription of a member per membership. The
+    ids of the cancelled ones are logged so they can be reviewed.
+    """
+    Subscription = apps.get_model("plans", "Subscription")
+
+    duplicates = (
+        Subscription.objects.filter(status="ACTIVE")
+        .values("user_id", "membership_id")
+        .annotate(last_id=Max("id"), subscriptions=Count("id"))
+        .filter(subscriptions__gt=1)
+        .order_by()
+    )
+    cancelled = []
+    for duplicate in duplicates:
+        older = Subscription.objects.filter(
+            user_id=duplicate["user_id"],
+            membership_id=duplicate["membership_id"],
+            status="ACTIVE",
+        ).exclude(pk=duplicate["last_id"])
+        ids = list(older.values_list("id", flat=True))
+        Subscription.objects.filter(pk__in=ids).update(status="CANCELLED")
+        cancelled.extend(ids)
+
+    if cancelled:
+        logger.warning(
+            "Cancelled %d duplicate active subscriptions: %s",
+            len(cancelled),
+            ", ".join(str(pk) for pk in cancelled),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plans", "0004_payment_report_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["user", "status", "payment_date"],
+                name="payment_user_status_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["user", "membership", "status"],
+                name="subscription_user_member_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                condition=models.Q(("status__in", ["CANCELLED", "EXPIRED"])),
+                fields=["status"],
+                name="subscription_inactive_idx",
+            ),
+        ),
+        migrations.RunPython(cancel_duplicate_subscriptions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="subscription",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "ACTIVE")),
+                fields=("user", "membership"),
+                name="unique_active_subscription",
+            ),
+        ),
+    ]
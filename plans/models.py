@@ -37,6 +37,36 @@ class Subscription(models.Model):
     end_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="ACTIVE")
 
+    class Meta:
+        constraints = [
+            # a member holds at most one active subscription per membership
+            models.UniqueConstraint(
+                fields=["user", "membership"],
+                condition=models.Q(status="ACTIVE"),
+                name="unique_active_subscription",
+            ),
+        ]
+        indexes = [
+            # "has subscribed" checks and member listings
+            models.Index(
+                fields=["user", "membership", "status"],
+                name="subscription_user_member_idx",
+            ),
+            # staff listing of cancelled and expired subscriptions
+            models.Index(
+                fields=["status"],
+                condition=models.Q(status__in=["CANCELLED", "EXPIRED"]),
+                name="subscription_inactive_idx",
+            ),
+            # keyset pages of the subscriptions, newest first
+            models.Index(
+                fields=["user", "start_date", "id"], name="subscription_user_start_idx"
+            ),
+            models.Index(
+                fields=["start_date", "id"], name="subscription_start_id_idx"
+            ),
+        ]
+
 
 class Payment(models.Model):
     STATUS_CHOICES = [
@@ -56,6 +86,25 @@ class Payment(models.Model):
     payment_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
 
+    class Meta:
+        indexes = [
+            # payment report: date range scans and keyset pagination
+            models.Index(fields=["payment_date", "id"], name="payment_date_id_idx"),
+            # payment report: status filter combined with a date range
+            models.Index(
+                fields=["status", "payment_date"], name="payment_status_date_idx"
+            ),
+            # payment history of a member
+            models.Index(
+                fields=["user", "status", "payment_date"],
+                name="payment_user_status_date_idx",
+            ),
+            # keyset pages of the payment history of a member
+            models.Index(
+                fields=["user", "payment_date", "id"], name="payment_user_date_idx"
+            ),
+        ]
+
 
 class MembershipImage(models.Model):
     membership = models.ForeignKey(
@@ -1,4 +1,16 @@
-from rest_framework.pagination import PageNumberPagination
+from api.pagination import KeysetPagination
 
-class MembershipPagination(PageNumberPagination):
-    page_size = 6
\ No newline at end of file
+
+class MembershipPagination(KeysetPagination):
+    page_size = 6
+
+
+class PaymentReportPagination(KeysetPagination):
+    """
+    Keyset pagination for the payment report, every page is an index
+    range scan on (payment_date, id) instead of an OFFSET scan.
+    """
+
+    page_size = 50
+    max_page_size = 500
+    ordering = ("-payment_date", "-id")
@@ -2,7 +2,9 @@ from rest_framework import serializers
 from plans.models import Membership, Subscription, Payment, MembershipImage
 from django.utils import timezone
 from datetime import timedelta
+from django.db import IntegrityError, transaction
 from django.contrib.auth import get_user_model
+from api.fieldsets import SparseFieldsMixin
 
 
 User = get_user_model()
@@ -37,7 +39,21 @@ class SimpleUserSerializer(serializers.ModelSerializer):
         ref_name = "PlansSimpleUser"
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+# to turn unique_active_subscription into a 400 when a status is updated
+class ActiveSubscriptionUpdateMixin:
+    def update(self, instance, validated_data):
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"status": "This membership already has an active subscription."}
+            )
+
+
+class SubscriptionSerializer(
+    ActiveSubscriptionUpdateMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     user = SimpleUserSerializer(read_only=True)
     membership = MembershipSerializer(read_only=True)
 
@@ -54,14 +70,16 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
 
 # to update already subscribed membership (subscription)
-class UpdateSubscriptionSerializer(serializers.ModelSerializer):
+class UpdateSubscriptionSerializer(
+    ActiveSubscriptionUpdateMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Subscription
         fields = ["status"]
 
 
 # to create a new subscription
-class SubscribeMembershipSerializer(serializers.ModelSerializer):
+class SubscribeMembershipSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     membership = MembershipSerializer(read_only=True)
     membership_id = serializers.PrimaryKeyRelatedField(
         queryset=Membership.objects.all(),
@@ -104,13 +122,20 @@ class SubscribeMembershipSerializer(serializers.ModelSerializer):
             # return "You have already subscribed this membership"
             raise serializers.ValidationError("You have already subscribed to this membership.")
 
-        subscription = Subscription.objects.create(
-            user=user,
-            membership=membership,
-            start_date=start_date,
-            end_date=end_date,
-            status="ACTIVE",
-        )
+        try:
+            with transaction.atomic():
+                subscription = Subscription.objects.create(
+                    user=user,
+                    membership=membership,
+                    start_date=start_date,
+                    end_date=end_date,
+                    status="ACTIVE",
+                )
+        except IntegrityError:
+            # unique_active_subscription, a concurrent request won
+            raise serializers.ValidationError(
+                "You have already subscribed to this membership."
+            )
 
         return subscription
 
@@ -1,3 +1,251 @@
+import json
+from datetime import datetime, timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db.models.query import QuerySet
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from plans.models import Membership, Subscription, Payment
+from plans.serializers import SubscribeMembershipSerializer
+
+User = get_user_model()
+
 
 # Create your tests here.
+
+
+class SubscriptionStatusTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user("member@x.com", "pw")
+        self.admin = User.objects.create_superuser("admin@x.com", "pw")
+        membership = Membership.objects.create(
+            name="Gold", price=30, duration="MONTHLY"
+        )
+        today = timezone.now().date()
+        self.cancelled = Subscription.objects.create(
+            user=self.member,
+            membership=membership,
+            start_date=today - timedelta(days=60),
+            end_date=today - timedelta(days=30),
+            status="CANCELLED",
+        )
+        Subscription.objects.create(
+            user=self.member,
+            membership=membership,
+            start_date=today,
+            end_date=today + timedelta(days=30),
+            status="ACTIVE",
+        )
+        self.client = APIClient()
+
+    def test_member_cannot_reactivate_a_second_subscription(self):
+        self.client.force_authenticate(self.member)
+
+        response = self.client.patch(
+            f"/api/v1/subscriptions/{self.cancelled.pk}/update_status/",
+            {"status": "ACTIVE"},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("status", response.data)
+        self.cancelled.refresh_from_db()
+        self.assertEqual(self.cancelled.status, "CANCELLED")
+
+    def test_admin_cannot_reactivate_a_second_subscription(self):
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.patch(
+            f"/api/v1/subscriptions/{self.cancelled.pk}/", {"status": "ACTIVE"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class SubscribeRaceTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user("member@x.com", "pw")
+        self.membership = Membership.objects.create(
+            name="Gold", price=30, duration="MONTHLY"
+        )
+
+    def subscribe(self):
+        serializer = SubscribeMembershipSerializer(
+            data={"membership_id": self.membership.pk},
+            context={"user": self.member},
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_subscribing_twice_is_rejected(self):
+        self.subscribe()
+
+        with self.assertRaises(serializers.ValidationError):
+            self.subscribe()
+
+    def test_a_concurrent_subscription_is_rejected_by_the_constraint(self):
+        self.subscribe()
+
+        # to act as the second request that passed the check before the
+        # first one committed
+        with mock.patch.object(QuerySet, "exists", return_value=False):
+            with self.assertRaises(serializers.ValidationError) as raised:
+                self.subscribe()
+
+        self.assertIn("already subscribed", str(raised.exception.detail[0]))
+        self.assertEqual(
+            Subscription.objects.filter(user=self.member, status="ACTIVE").count(),
+            1,
+        )
+
+
+class PaymentFilterTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user("member@x.com", "pw")
+        membership = Membership.objects.create(
+            name="Gold", price=30, duration="MONTHLY"
+        )
+        subscription = Subscription.objects.create(
+            user=self.member,
+            membership=membership,
+            start_date=timezone.now().date(),
+            end_date=timezone.now().date() + timedelta(days=30),
+        )
+        self.payments = []
+        for amount, moment in [
+            (10, datetime(2025, 1, 1, 0, 0)),
+            (30, datetime(2025, 1, 31, 23, 59)),
+            (50, datetime(2025, 2, 1, 0, 0)),
+        ]:
+            payment = Payment.objects.create(
+                user=self.member,
+                subscription=subscription,
+                amount=amount,
+                status="COMPLETED",
+            )
+            Payment.objects.filter(pk=payment.pk).update(
+                payment_date=timezone.make_aware(moment)
+            )
+            self.payments.append(str(payment.pk))
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def ids(self, params):
+        response = self.client.get("/api/v1/payments/", params)
+        return sorted(row["id"] for row in response.data["results"])
+
+    def test_payment_date_range_covers_both_days(self):
+        self.assertEqual(
+            self.ids(
+                {
+                    "payment_date_after": "2025-01-01",
+                    "payment_date_before": "2025-01-31",
+                }
+            ),
+            sorted(self.payments[:2]),
+        )
+
+    def test_amount_range(self):
+        self.assertEqual(
+            self.ids({"amount_min": 20, "amount_max": 50}), sorted(self.payments[1:])
+        )
+
+
+class PaymentReportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin@x.com", "pw")
+        member = User.objects.create_user("member@x.com", "pw")
+        membership = Membership.objects.create(
+            name="Gold", price=30, duration="MONTHLY"
+        )
+        subscription = Subscription.objects.create(
+            user=member,
+            membership=membership,
+            start_date=timezone.now().date(),
+            end_date=timezone.now().date() + timedelta(days=30),
+        )
+        self.payments = []
+        for amount, status, moment in [
+            (10, "COMPLETED", datetime(2025, 1, 1, 0, 0)),
+            (30, "PENDING", datetime(2025, 1, 31, 23, 59)),
+            (50, "FAILED", datetime(2025, 2, 1, 0, 0)),
+        ]:
+            payment = Payment.objects.create(
+                user=member, subscription=subscription, amount=amount, status=status
+            )
+            Payment.objects.filter(pk=payment.pk).update(
+                payment_date=timezone.make_aware(moment)
+            )
+            self.payments.append(str(payment.pk))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_totals_are_summed_by_the_database(self):
+        response = self.client.get("/api/v1/payment-reports/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_payments"], 3)
+        self.assertEqual(response.data["total_amount"], 90)
+        self.assertEqual(response.data["completed_payments"], 1)
+        self.assertEqual(response.data["pending_payments"], 1)
+        self.assertEqual(response.data["failed_payments"], 1)
+
+    def test_date_and_status_filters(self):
+        response = self.client.get(
+            "/api/v1/payment-reports/", {"from": "2025-01-01", "to": "2025-01-31"}
+        )
+        self.assertEqual(response.data["total_payments"], 2)
+        self.assertEqual(response.data["total_amount"], 40)
+        self.assertEqual(
+            sorted(row["id"] for row in response.data["payments"]),
+            sorted(self.payments[:2]),
+        )
+
+        response = self.client.get("/api/v1/payment-reports/", {"status": "FAILED"})
+        self.assertEqual(response.data["total_payments"], 1)
+        self.assertEqual(response.data["total_amount"], 50)
+        self.assertEqual(
+            [row["id"] for row in response.data["payments"]], [self.payments[2]]
+        )
+
+    def test_unknown_status_is_rejected(self):
+        response = self.client.get("/api/v1/payment-reports/", {"status": "LOST"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_payments_are_paged_with_a_cursor(self):
+        first = self.client.get("/api/v1/payment-reports/", {"page_size": 2})
+        self.assertEqual(len(first.data["payments"]), 2)
+        self.assertIsNone(first.data["previous"])
+        self.assertIn("cursor=", first.data["next"])
+
+        second = self.client.get(first.data["next"])
+        self.assertIsNone(second.data["next"])
+        self.assertEqual(
+            [row["id"] for row in first.data["payments"] + second.data["payments"]],
+            self.payments[::-1],
+        )
+        # the totals are not paged
+        self.assertEqual(second.data["total_payments"], 3)
+
+    def test_ndjson_streams_every_row(self):
+        response = self.client.get("/api/v1/payment-reports/", {"format": "ndjson"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual([row["id"] for row in rows], self.payments)
+        self.assertEqual(rows[0]["user__email"], "member@x.com")
+        self.assertEqual(rows[2]["status"], "FAILED")
+
+    def test_members_cannot_read_the_report(self):
+        self.client.force_authenticate(User.objects.get(email="member@x.com"))
+
+        response = self.client.get("/api/v1/payment-reports/")
+
+        self.assertEqual(response.status_code, 403)
@@ -14,8 +14,10 @@ from plans.serializers import (
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import permissions
-from django.db.models import Count, Q
-from rest_framework.filters import SearchFilter
+from django.db.models import Count, Q, Sum
+from api.search import IndexedSearchFilter
+from django_filters.rest_framework import DjangoFilterBackend
+from plans.filters import MembershipFilter, SubscriptionFilter, PaymentFilter
 from sslcommerz_lib import SSLCOMMERZ
 from rest_framework.decorators import api_view
 from decouple import config
@@ -23,6 +25,18 @@ from django.conf import settings as main_settings
 from django.http import HttpResponseRedirect
 from rest_framework.views import APIView
 from rest_framework import status
+from rest_framework.settings import api_settings
+from plans.pagination import MembershipPagination, PaymentReportPagination
+from api.fieldsets import SparseFieldsViewMixin
+from api.renderers import (
+    NDJSONRenderer,
+    CSVRenderer,
+    GzipCSVRenderer,
+    EXPORT_FORMATS,
+)
+from api.streaming import iter_rows, stream_ndjson, stream_csv
+from reports.cache import get_or_compute
+from api.utils import get_date_param, get_choice_param, datetime_range_filter
 
 # Create your views here.
 
@@ -35,12 +49,17 @@ class MembershipViewSet(ModelViewSet):
      - Allow authenticated Members to view memberships
     """
 
-    filter_backends = [SearchFilter]
-    search_fields = ["name", "price", "duration"]
+    replica_ok = True
+
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
+    filterset_class = MembershipFilter
+    search_fields = ["name", "=price", "=duration"]
 
     permission_classes = [IsAdminOrReadOnly]
     queryset = Membership.objects.prefetch_related("images").all()
     serializer_class = MembershipSerializer
+    pagination_class = MembershipPagination
+    keyset_ordering = ("id",)
 
 
 class MembershipImageViewSet(ModelViewSet):
@@ -51,6 +70,8 @@ class MembershipImageViewSet(ModelViewSet):
 
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = MembershipImageSerializer
+    pagination_class = MembershipPagination
+    keyset_ordering = ("id",)
 
     def get_queryset(self):
         return MembershipImage.objects.filter(
@@ -61,7 +82,7 @@ class MembershipImageViewSet(ModelViewSet):
         serializer.save(membership_id=self.kwargs.get("membership_pk"))
 
 
-class SubscriptionViewSet(ModelViewSet):
+class SubscriptionViewSet(SparseFieldsViewMixin, ModelViewSet):
     """
     API endpoints for managing subsciptions
      - Allow authenticated Admin to manage all subscriptions
@@ -70,9 +91,12 @@ class SubscriptionViewSet(ModelViewSet):
      - Allow authenticated Members to create, view and update their own subscriptions
     """
 
-    filter_backends = [SearchFilter]
-    search_fields = ["user__email", "membership__name", "status"]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
+    filterset_class = SubscriptionFilter
+    search_fields = ["user__email", "membership__name", "=status"]
     http_method_names = ["post", "get", "delete", "patch"]
+    pagination_class = MembershipPagination
+    keyset_ordering = ("-start_date", "-id")
 
     def get_permissions(self):
         if self.action in ["destroy"]:
@@ -121,7 +145,7 @@ class SubscriptionViewSet(ModelViewSet):
             )
         if user.is_staff:
             return Subscription.objects.select_related("user", "membership").filter(
-                Q(status="CANCELLED") | Q(status="EXPIRED")
+                status__in=["CANCELLED", "EXPIRED"]
             )
         return (
             Subscription.objects.select_related("membership")
@@ -141,8 +165,11 @@ class PaymentViewSet(ModelViewSet):
      - Allow authenticated Members to make payments for their subscriptions
     """
 
-    filter_backends = [SearchFilter]
-    search_fields = ["user__email", "amount", "status"]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
+    filterset_class = PaymentFilter
+    search_fields = ["user__email", "=amount", "=status"]
+    pagination_class = MembershipPagination
+    keyset_ordering = ("-payment_date", "-id")
 
     def get_permissions(self):
         user = self.request.user
@@ -185,36 +212,103 @@ class PaymentReportViewSet(ModelViewSet):
     """
     API endpoints for managing Payment Report
      - Allow authenticated Admin to generate and manage payment reports
+     - Supports ?from=YYYY-MM-DD, ?to=YYYY-MM-DD and ?status= filters
+     - Payments are returned as keyset paginated pages, or streamed
+        as newline delimited JSON (?format=ndjson) or CSV (?format=csv,
+        ?format=csv.gz)
+     - Totals are cached until the next payment is written
     """
 
+    replica_ok = True
+
     http_method_names = ["get"]
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = PaymentReportPagination
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + [
+        NDJSONRenderer,
+        CSVRenderer,
+        GzipCSVRenderer,
+    ]
 
     def get_queryset(self):
-        return Payment.objects.all()
+        return Payment.objects.select_related("user")
+
+    def filter_queryset(self, queryset):
+        start = get_date_param(self.request, "from")
+        end = get_date_param(self.request, "to")
+        status = get_choice_param(self.request, "status", Payment.STATUS_CHOICES)
+
+        queryset = queryset.filter(**datetime_range_filter("payment_date", start, end))
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset
 
     def list(self, request, *args, **kwrgs):
         # to get the queryset of this model viewset
         queryset = self.filter_queryset(self.get_queryset())
 
-        status_counts = queryset.aggregate(
-            total_payments=Count("id"),
-            completed_payments=Count("id", filter=Q(status="COMPLETED")),
-            pending_payments=Count("id", filter=Q(status="PENDING")),
-            failed_payments=Count("id", filter=Q(status="FAILED")),
-        )
+        export_format = request.accepted_renderer.format
+
+        if export_format in EXPORT_FORMATS:
+            rows = iter_rows(
+                queryset.order_by("payment_date", "id"),
+                [
+                    "id",
+                    "user_id",
+                    "user__email",
+                    "subscription_id",
+                    "amount",
+                    "payment_date",
+                    "status",
+                ],
+            )
+            if export_format == NDJSONRenderer.format:
+                return stream_ndjson(rows, filename="payments.ndjson")
+            return stream_csv(
+                rows,
+                [
+                    "id",
+                    "user_id",
+                    ("user_email", "user__email"),
+                    "subscription_id",
+                    "amount",
+                    "payment_date",
+                    "status",
+                ],
+                "payments",
+                compress=export_format == GzipCSVRenderer.format,
+            )
 
-        total_amount = sum([payment.amount for payment in queryset])
+        # totals are computed by the database in a single aggregate query
+        # and cached until the next payment is written
+        def compute_totals():
+            totals = queryset.aggregate(
+                total_payments=Count("id"),
+                total_amount=Sum("amount"),
+                completed_payments=Count("id", filter=Q(status="COMPLETED")),
+                pending_payments=Count("id", filter=Q(status="PENDING")),
+                failed_payments=Count("id", filter=Q(status="FAILED")),
+            )
+            totals["total_amount"] = totals["total_amount"] or 0
+            return totals
+
+        report_data = dict(
+            get_or_compute(
+                "PaymentReport",
+                [Payment],
+                {
+                    param: request.query_params.get(param, "")
+                    for param in ["from", "to", "status"]
+                },
+                compute_totals,
+            )
+        )
 
-        report_data = {
-            "total_payments": status_counts["total_payments"],
-            "total_amount": total_amount,
-            "completed_payments": status_counts["completed_payments"],
-            "pending_payments": status_counts["pending_payments"],
-            "failed_payments": status_counts["failed_payments"],
-            "payments": self.get_serializer(queryset, many=True).data,
-        }
+        page = self.paginate_queryset(queryset)
+        report_data["next"] = self.paginator.get_next_link()
+        report_data["previous"] = self.paginator.get_previous_link()
+        report_data["payments"] = self.get_serializer(page, many=True).data
 
         return Response(report_data)
 
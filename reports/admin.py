@@ -1,3 +1,8 @@
 from django.contrib import admin
+from reports.models import ReportJob
+
 
 # Register your models here.
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ["id", "report", "requested_by", "status", "progress", "created_at"]
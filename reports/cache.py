@@ -0,0 +1,165 @@
+"""
+Versioned cache for report results.
+
+Every model a report reads from has a version counter in the cache
+which is bumped whenever a row of that model is written (see
+reports/signals.py). The cache key of a report includes the current
+versions of its models, so a write makes the old entries unreachable
+and they simply expire.
+"""
+
+import hashlib
+import time
+from functools import wraps
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.response import Response
+from api.db_router import primary_reads
+from api.renderers import EXPORT_FORMATS
+
+
+CACHE_TIMEOUT = 60 * 10
+
+# how long a worker may hold the recompute lock of a report
+LOCK_TIMEOUT = 30
+
+# how long other workers wait for the lock holder before computing it themselves
+LOCK_WAIT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+STATS_KEYS = {
+    "hits": "report-cache:stats:hits",
+    "misses": "report-cache:stats:misses",
+    "coalesced": "report-cache:stats:coalesced",
+}
+
+_MISSING = object()
+
+
+def version_key(model):
+    return f"report-cache:version:{model._meta.label_lower}"
+
+
+def get_version(model):
+    key = version_key(model)
+    version = cache.get(key)
+    if version is None:
+        # seeded from the clock so a counter evicted from the cache
+        # never comes back with a version that was already used
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*models):
+    for model in models:
+        key = version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def incr_stat(name):
+    key = STATS_KEYS[name]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_stats():
+    stats = {name: cache.get(key, 0) for name, key in STATS_KEYS.items()}
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def make_key(name, models, params):
+    versions = ":".join(str(get_version(model)) for model in models)
+    query = "&".join(
+        f"{param}={','.join(sorted(params.getlist(param)))}"
+        if hasattr(params, "getlist")
+        else f"{param}={params[param]}"
+        for param in sorted(params)
+    )
+    digest = hashlib.md5(query.encode()).hexdigest()
+    return f"report-cache:{name}:{digest}:{versions}"
+
+
+def is_shared():
+    """
+    Whether the cache is seen by every worker. Version bumps in a
+    per-process cache never reach the other processes, so results are
+    not cached at all then.
+    """
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def get_or_compute(name, models, params, compute):
+    """
+    Return the cached result of a report or compute and cache it.
+    Concurrent misses for the same key are coalesced: only the worker
+    that takes the lock computes, the others wait for its result.
+    A result that is cached is computed on the primary, a lagging
+    replica would keep it stale until the next version bump.
+    """
+    if not is_shared():
+        return compute()
+
+    key = make_key(name, models, params)
+
+    result = cache.get(key, _MISSING)
+    if result is not _MISSING:
+        incr_stat("hits")
+        return result
+
+    incr_stat("misses")
+    lock_key = f"{key}:lock"
+
+    if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            result = cache.get(key, _MISSING)
+            if result is not _MISSING:
+                incr_stat("coalesced")
+                return result
+        # the lock holder is too slow (or died), compute it ourselves
+        return compute()
+
+    try:
+        with primary_reads():
+            result = compute()
+        cache.set(key, result, timeout=CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    return result
+
+
+def cached_report(*models):
+    """
+    Cache the data of a report action, keyed on the action name, its
+    query parameters and the versions of the given models.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(self, request, *args, **kwargs):
+            # streamed downloads are not cached
+            if request.accepted_renderer.format in EXPORT_FORMATS:
+                return view_func(self, request, *args, **kwargs)
+
+            def compute():
+                return view_func(self, request, *args, **kwargs).data
+
+            data = get_or_compute(
+                view_func.__name__, models, request.query_params, compute
+            )
+            return Response(data)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,90 @@
+"""
+Raw datasets offered by the report export endpoint. Every dataset is
+read as a .values() projection ordered by the primary key, so exports
+never build model instances.
+"""
+
+from classes.models import Attendance
+from plans.models import Subscription, Payment
+from reviews.models import Feedback
+from api.utils import datetime_range_filter
+
+
+DATASETS = {
+    "attendance": {
+        "model": Attendance,
+        "date_field": "date",
+        "columns": [
+            "id",
+            ("user_id", "user_id"),
+            ("user_email", "user__email"),
+            ("fitness_class_id", "fitness_class_id"),
+            ("fitness_class", "fitness_class__name"),
+            "date",
+            "status",
+        ],
+    },
+    "feedback": {
+        "model": Feedback,
+        "datetime_field": "created_at",
+        "columns": [
+            "id",
+            ("user_id", "user_id"),
+            ("user_email", "user__email"),
+            ("fitness_class_id", "fitness_class_id"),
+            ("fitness_class", "fitness_class__name"),
+            "ratings",
+            "comment",
+            "created_at",
+        ],
+    },
+    "subscriptions": {
+        "model": Subscription,
+        "date_field": "start_date",
+        "columns": [
+            "id",
+            ("user_id", "user_id"),
+            ("user_email", "user__email"),
+            ("membership_id", "membership_id"),
+            ("membership", "membership__name"),
+            ("duration", "membership__duration"),
+            ("price", "membership__price"),
+            "start_date",
+            "end_date",
+            "status",
+        ],
+    },
+    "payments": {
+        "model": Payment,
+        "datetime_field": "payment_date",
+        "columns": [
+            "id",
+            ("user_id", "user_id"),
+            ("user_email", "user__email"),
+            ("subscription_id", "subscription_id"),
+            "amount",
+            "payment_date",
+            "status",
+        ],
+    },
+}
+
+
+def get_dataset_queryset(dataset, start=None, end=None):
+    queryset = dataset["model"].objects.order_by("pk")
+
+    if "datetime_field" in dataset:
+        return queryset.filter(
+            **datetime_range_filter(dataset["datetime_field"], start, end)
+        )
+
+    field = dataset["date_field"]
+    if start:
+        queryset = queryset.filter(**{f"{field}__gte": start})
+    if end:
+        queryset = queryset.filter(**{f"{field}__lte": end})
+    return queryset
+
+
+def column_keys(columns):
+    return [column[1] if isinstance(column, tuple) else column for column in columns]
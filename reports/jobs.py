@@ -0,0 +1,166 @@
+import logging
+from datetime import date, timedelta
+from django.db import transaction
+from django.utils import timezone
+from reports import queries
+from reports.models import ReportJob
+from reports.serializers import AttendanceReportSerializer, RevenueReportSerializer
+
+
+logger = logging.getLogger(__name__)
+
+# days of data computed per chunk, progress is saved after each chunk
+CHUNK_DAYS = 31
+
+# report buckets computed per chunk of a bucketed report
+CHUNK_BUCKETS = {"day": 31, "week": 5, "month": 1}
+
+# RUNNING jobs not updated for this long belong to a worker that died
+STALE_AFTER = timedelta(minutes=15)
+
+
+def date_chunks(start, end, days=CHUNK_DAYS):
+    while start <= end:
+        chunk_end = min(start + timedelta(days=days - 1), end)
+        yield start, chunk_end
+        start = chunk_end + timedelta(days=1)
+
+
+def bucket_chunks(start, end, granularity):
+    """Date chunks aligned on bucket starts, so no bucket spans two chunks."""
+    start = queries.bucket_start(start, granularity)
+    while start <= end:
+        next_start = queries.buckets_before(
+            start, granularity, -CHUNK_BUCKETS[granularity]
+        )
+        yield start, min(next_start - timedelta(days=1), end)
+        start = next_start
+
+
+def set_progress(job, done, total):
+    job.progress = int(done * 100 / total)
+    ReportJob.objects.filter(pk=job.pk).update(
+        progress=job.progress, updated_at=timezone.now()
+    )
+
+
+""" REPORT RUNNERS """
+
+
+def run_attendance_report(job):
+    start = date.fromisoformat(job.params["from"])
+    end = date.fromisoformat(job.params["to"])
+    granularity = job.params.get(
+        "granularity", queries.DEFAULT_GRANULARITY["ATTENDANCE"]
+    )
+
+    # newest chunk first, the report rows are ordered by -date
+    chunks = list(bucket_chunks(start, end, granularity))[::-1]
+    rows = []
+    classes = {}
+
+    for done, (chunk_start, chunk_end) in enumerate(chunks, 1):
+        chunk_rows = queries.attendance_report(chunk_start, chunk_end, granularity)
+        rows.extend(AttendanceReportSerializer(chunk_rows, many=True).data)
+
+        for row in chunk_rows:
+            totals = classes.setdefault(
+                row["fitness_class__name"],
+                {"present_count": 0, "absent_count": 0, "total": 0},
+            )
+            totals["present_count"] += row["present"]
+            totals["absent_count"] += row["absent"]
+            totals["total"] += row["total"]
+
+        set_progress(job, done, len(chunks))
+
+    return {
+        "rows": rows,
+        "classes": [
+            {
+                "class_name": name,
+                "present_count": totals["present_count"],
+                "absent_count": totals["absent_count"],
+                "attendance_rate": totals["present_count"] * 100.0 / totals["total"],
+            }
+            for name, totals in sorted(classes.items())
+        ],
+    }
+
+
+def run_revenue_report(job):
+    start = date.fromisoformat(job.params["from"])
+    end = date.fromisoformat(job.params["to"])
+    granularity = job.params.get("granularity", queries.DEFAULT_GRANULARITY["REVENUE"])
+
+    chunks = list(date_chunks(start, end))
+    periods = {}
+
+    for done, (chunk_start, chunk_end) in enumerate(chunks, 1):
+        # a week (or month) may span two chunks, merge its partial sums
+        for row in queries.revenue_report(chunk_start, chunk_end, granularity):
+            totals = periods.setdefault(
+                row["period"], {"total_revenue": 0, "total_payments": 0}
+            )
+            totals["total_revenue"] += row["total_revenue"]
+            totals["total_payments"] += row["total_payments"]
+
+        set_progress(job, done, len(chunks))
+
+    rows = [{"period": period, **totals} for period, totals in sorted(periods.items())]
+    return {"rows": RevenueReportSerializer(rows, many=True).data}
+
+
+RUNNERS = {
+    "ATTENDANCE": run_attendance_report,
+    "REVENUE": run_revenue_report,
+}
+
+
+""" QUEUE """
+
+
+def claim_next_job():
+    """Take the oldest pending job, skipping rows other workers have locked."""
+    with transaction.atomic():
+        job = (
+            ReportJob.objects.select_for_update(skip_locked=True)
+            .filter(status="PENDING")
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = "RUNNING"
+        job.progress = 0
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "progress", "started_at", "updated_at"])
+    return job
+
+
+def requeue_stale_jobs():
+    return ReportJob.objects.filter(
+        status="RUNNING", updated_at__lt=timezone.now() - STALE_AFTER
+    ).update(status="PENDING", progress=0, updated_at=timezone.now())
+
+
+def run_job(job):
+    try:
+        result = RUNNERS[job.report](job)
+    except Exception as exc:
+        logger.exception("Report job %s failed", job.pk)
+        job.status = "FAILED"
+        job.error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at", "updated_at"])
+        return job
+
+    job.status = "COMPLETED"
+    job.progress = 100
+    job.result = result
+    job.finished_at = timezone.now()
+    job.save(
+        update_fields=["status", "progress", "result", "finished_at", "updated_at"]
+    )
+    return job
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from reports.rollups import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Rebuild the attendance and subscription report rollups from scratch"
+
+    def handle(self, *args, **options):
+        rebuild_all()
+        self.stdout.write(self.style.SUCCESS("Report rollups rebuilt."))
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from reports.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued report jobs (runs until stopped, or once with --once)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the pending jobs and exit instead of polling forever",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            requeue_stale_jobs()
+
+            job = claim_next_job()
+            if job is not None:
+                job = run_job(job)
+                self.stdout.write(f"Report job {job.pk} {job.status.lower()}")
+                continue
+
+            if options["once"]:
+                return
+            time.sleep(options["poll_interval"])
@@ -0,0 +1,77 @@
+# Generated by Django 5.2 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("classes", "0004_alter_fitnessclassimage_fitness_class"),
+        ("plans", "0004_payment_report_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubscriptionRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("subscription_count", models.IntegerField(default=0)),
+                (
+                    "membership",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="subscription_rollup",
+                        to="plans.membership",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="AttendanceRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("present_count", models.IntegerField(default=0)),
+                ("absent_count", models.IntegerField(default=0)),
+                ("total_count", models.IntegerField(default=0)),
+                (
+                    "fitness_class",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attendance_rollups",
+                        to="classes.fitnessclass",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["date"], name="attendance_rollup_date_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("fitness_class", "date"),
+                        name="unique_attendance_rollup",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def populate_rollups(apps, schema_editor):
+    Attendance = apps.get_model("classes", "Attendance")
+    Subscription = apps.get_model("plans", "Subscription")
+    AttendanceRollup = apps.get_model("reports", "AttendanceRollup")
+    SubscriptionRollup = apps.get_model("reports", "SubscriptionRollup")
+
+    AttendanceRollup.objects.bulk_create(
+        AttendanceRollup(**row)
+        for row in Attendance.objects.values("fitness_class_id", "date")
+        .annotate(
+            present_count=Count("id", filter=Q(status="PRESENT")),
+            absent_count=Count("id", filter=Q(status="ABSENT")),
+            total_count=Count("id"),
+        )
+        .order_by()
+    )
+    SubscriptionRollup.objects.bulk_create(
+        SubscriptionRollup(**row)
+        for row in Subscription.objects.values("membership_id")
+        .annotate(subscription_count=Count("id"))
+        .order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0001_report_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
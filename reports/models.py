@@ -1,4 +1,78 @@
+"""
+Rollup tables behind the report endpoints. They are kept up to date
+by the signal handlers in reports/signals.py and can be rebuilt from
+scratch with `python manage.py rebuild_report_rollups`.
+"""
+
 from django.db import models
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from classes.models import FitnessClass
+from plans.models import Membership
 
 
 # Create your models here.
+
+
+class AttendanceRollup(models.Model):
+    fitness_class = models.ForeignKey(
+        FitnessClass, on_delete=models.CASCADE, related_name="attendance_rollups"
+    )
+    date = models.DateField()
+    present_count = models.IntegerField(default=0)
+    absent_count = models.IntegerField(default=0)
+    total_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fitness_class", "date"], name="unique_attendance_rollup"
+            ),
+        ]
+        indexes = [models.Index(fields=["date"], name="attendance_rollup_date_idx")]
+
+
+class SubscriptionRollup(models.Model):
+    membership = models.OneToOneField(
+        Membership, on_delete=models.CASCADE, related_name="subscription_rollup"
+    )
+    subscription_count = models.IntegerField(default=0)
+
+
+class ReportJob(models.Model):
+    """
+    A report computed in the background by `python manage.py run_report_worker`.
+    The table doubles as the job queue: workers claim PENDING rows with
+    SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+
+    REPORT_CHOICES = [
+        ("ATTENDANCE", "Attendance"),
+        ("REVENUE", "Revenue"),
+    ]
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("COMPLETED", "Completed"),
+        ("FAILED", "Failed"),
+    ]
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="report_jobs"
+    )
+    report = models.CharField(max_length=20, choices=REPORT_CHOICES)
+    params = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent done")
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # queue scans: oldest pending job first
+            models.Index(fields=["status", "created_at"], name="report_job_queue_idx"),
+        ]
@@ -0,0 +1,173 @@
+"""
+Report querysets shared by the report endpoints and the background
+report jobs (reports/jobs.py).
+"""
+
+from datetime import timedelta
+from django.db.models import (
+    Count,
+    Sum,
+    F,
+    Func,
+    Window,
+    DateField,
+    DecimalField,
+    FloatField,
+    IntegerField,
+)
+from django.db.models.expressions import ValueRange
+from django.db.models.functions import Cast, Coalesce, ExtractMonth, ExtractYear, Trunc
+from plans.models import Membership, Payment
+from classes.models import FitnessClass
+from reports.models import AttendanceRollup
+from api.utils import datetime_range_filter
+
+GRANULARITIES = ["day", "week", "month"]
+
+# ?granularity= of a report (and of its background job) when none is given
+DEFAULT_GRANULARITY = {"ATTENDANCE": "day", "REVENUE": "month"}
+
+# buckets (current one included) covered by the rolling attendance rate
+ROLLING_BUCKETS = 4
+
+
+class WindowSum(Func):
+    """SUM() usable as a window over an aggregate: SUM(SUM(x)) OVER (...)"""
+
+    function = "SUM"
+    window_compatible = True
+
+
+class DayNumber(Func):
+    """Days between 1970-01-05 (a Monday) and a date."""
+
+    template = "(%(expressions)s - DATE '1970-01-05')"
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template=(
+                "CAST(julianday(%(expressions)s) - julianday('1970-01-05') AS INTEGER)"
+            ),
+            **extra_context,
+        )
+
+
+def bucket_number(period, granularity):
+    """
+    Consecutive integers for consecutive buckets, so a window frame can
+    count buckets by value instead of by rows.
+    """
+    if granularity == "month":
+        return ExtractYear(period) * 12 + ExtractMonth(period)
+    if granularity == "week":
+        return DayNumber(period) / 7
+    return DayNumber(period)
+
+
+def bucket_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def buckets_before(day, granularity, count):
+    """Start of the bucket `count` buckets before the one holding day."""
+    day = bucket_start(day, granularity)
+    if granularity == "week":
+        return day - timedelta(weeks=count)
+    if granularity == "month":
+        month = day.year * 12 + day.month - 1 - count
+        return day.replace(year=month // 12, month=month % 12 + 1)
+    return day - timedelta(days=count)
+
+
+def membership_report():
+    return Membership.objects.values("duration").annotate(
+        total_members=Coalesce(Sum("subscription_rollup__subscription_count"), 0),
+        total_revenue=Sum(
+            F("subscription_rollup__subscription_count") * F("price"),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+    )
+
+
+def attendance_report(start, end, granularity="day"):
+    """
+    Per class attendance per day, week or month between start and end,
+    with the attendance rate over the last ROLLING_BUCKETS buckets
+    (a rolling 4-week rate for weekly buckets) computed by a window
+    function. The buckets just before start are read as well so the
+    first rolling rates have a full window, and dropped afterwards.
+    """
+    first_bucket = bucket_start(start, granularity)
+    # a range frame on the bucket number: buckets without attendance have
+    # no row, so a frame counting rows would reach further back past them
+    rolling = {
+        "partition_by": [F("fitness_class__name")],
+        "order_by": bucket_number(F("period"), granularity).asc(),
+        "frame": ValueRange(start=-(ROLLING_BUCKETS - 1), end=0),
+    }
+
+    rows = (
+        AttendanceRollup.objects.filter(
+            total_count__gt=0,
+            date__gte=buckets_before(start, granularity, ROLLING_BUCKETS - 1),
+            date__lte=end,
+        )
+        .annotate(period=Trunc("date", granularity, output_field=DateField()))
+        .values("period", "fitness_class__name")
+        .annotate(
+            present=Sum("present_count"),
+            absent=Sum("absent_count"),
+            total=Sum("total_count"),
+        )
+        .annotate(attendance_rate=(F("present") * 100.0) / F("total"))
+        # the windows have to be annotated last, anything annotated after
+        # them would add them to the GROUP BY clause
+        .annotate(
+            rolling_present=Window(WindowSum(Sum("present_count")), **rolling),
+            rolling_total=Window(WindowSum(Sum("total_count")), **rolling),
+        )
+        .order_by("-period", "fitness_class__name")
+    )
+
+    report = []
+    for row in rows:
+        if row["period"] < first_bucket:
+            continue
+        row["rolling_attendance_rate"] = (
+            row["rolling_present"] * 100.0 / row["rolling_total"]
+        )
+        report.append(row)
+    return report
+
+
+def feedback_report():
+    return (
+        FitnessClass.objects.filter(rating_count__gt=0)
+        .values("name")
+        .annotate(
+            average_ratings=Cast(Sum("rating_sum"), FloatField()) / Sum("rating_count"),
+            total_feedbacks=Sum("rating_count"),
+            positive_feedbacks=Sum(F("rating_4_count") + F("rating_5_count")),
+            negative_feedbacks=Sum(F("rating_1_count") + F("rating_2_count")),
+        )
+        .order_by("-average_ratings")
+    )
+
+
+def revenue_report(start, end, granularity):
+    return (
+        Payment.objects.filter(
+            status="COMPLETED", **datetime_range_filter("payment_date", start, end)
+        )
+        .annotate(period=Trunc("payment_date", granularity, output_field=DateField()))
+        .values("period")
+        .annotate(total_revenue=Sum("amount"), total_payments=Count("id"))
+        .order_by("period")
+    )
@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models import Count, F, Q
+from classes.models import Attendance
+from plans.models import Subscription
+from reports.models import AttendanceRollup, SubscriptionRollup
+from reports.cache import bump_version
+
+
+""" INCREMENTAL UPDATES """
+
+
+def apply_attendance(fitness_class_id, date, status, sign):
+    """Add (sign=1) or remove (sign=-1) one attendance row from its bucket."""
+    # a removed row always has its bucket, unless the class itself is being
+    # deleted and the cascade already took the bucket: don't recreate it
+    if sign > 0:
+        AttendanceRollup.objects.get_or_create(
+            fitness_class_id=fitness_class_id, date=date
+        )
+    AttendanceRollup.objects.filter(
+        fitness_class_id=fitness_class_id, date=date
+    ).update(
+        total_count=F("total_count") + sign,
+        present_count=F("present_count") + (sign if status == "PRESENT" else 0),
+        absent_count=F("absent_count") + (sign if status == "ABSENT" else 0),
+    )
+
+
+def apply_subscription(membership_id, sign):
+    """Add (sign=1) or remove (sign=-1) one subscription from its membership."""
+    if sign > 0:
+        SubscriptionRollup.objects.get_or_create(membership_id=membership_id)
+    SubscriptionRollup.objects.filter(membership_id=membership_id).update(
+        subscription_count=F("subscription_count") + sign
+    )
+
+
+def refresh_attendance_rollups(buckets):
+    """
+    Recompute the given (fitness_class_id, date) buckets from the raw rows,
+    for attendance written without signals (bulk_create, update).
+    """
+    buckets = set(buckets)
+    if not buckets:
+        return
+
+    rows = {
+        (row["fitness_class_id"], row["date"]): row
+        for row in Attendance.objects.filter(
+            fitness_class_id__in={fitness_class_id for fitness_class_id, _ in buckets},
+            date__in={date for _, date in buckets},
+        )
+        .values("fitness_class_id", "date")
+        .annotate(
+            present_count=Count("id", filter=Q(status="PRESENT")),
+            absent_count=Count("id", filter=Q(status="ABSENT")),
+            total_count=Count("id"),
+        )
+        .order_by()
+    }
+    AttendanceRollup.objects.bulk_create(
+        [
+            AttendanceRollup(
+                **rows.get(
+                    bucket,
+                    {
+                        "fitness_class_id": bucket[0],
+                        "date": bucket[1],
+                        "present_count": 0,
+                        "absent_count": 0,
+                        "total_count": 0,
+                    },
+                )
+            )
+            for bucket in buckets
+        ],
+        update_conflicts=True,
+        unique_fields=["fitness_class", "date"],
+        update_fields=["present_count", "absent_count", "total_count"],
+    )
+
+
+""" FULL REBUILD """
+
+
+def rebuild_attendance_rollups():
+    rows = (
+        Attendance.objects.values("fitness_class_id", "date")
+        .annotate(
+            present_count=Count("id", filter=Q(status="PRESENT")),
+            absent_count=Count("id", filter=Q(status="ABSENT")),
+            total_count=Count("id"),
+        )
+        .order_by()
+    )
+    AttendanceRollup.objects.all().delete()
+    AttendanceRollup.objects.bulk_create(
+        (AttendanceRollup(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+def rebuild_subscription_rollups():
+    rows = (
+        Subscription.objects.values("membership_id")
+        .annotate(subscription_count=Count("id"))
+        .order_by()
+    )
+    SubscriptionRollup.objects.all().delete()
+    SubscriptionRollup.objects.bulk_create(
+        (SubscriptionRollup(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+def rebuild_all():
+    with transaction.atomic():
+        rebuild_attendance_rollups()
+        rebuild_subscription_rollups()
+    bump_version(Attendance, Subscription)
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from reports.models import ReportJob
+from reports.queries import GRANULARITIES, DEFAULT_GRANULARITY
 
 
 class MembershipReportSerializer(serializers.Serializer):
@@ -8,20 +10,106 @@ class MembershipReportSerializer(serializers.Serializer):
 
 
 class AttendanceReportSerializer(serializers.Serializer):
-    date = serializers.DateField()
+    date = serializers.DateField(source="period")
     class_name = serializers.CharField(source="fitness_class__name")
-    present_count = serializers.IntegerField()
-    absent_count = serializers.IntegerField()
+    present_count = serializers.IntegerField(source="present")
+    absent_count = serializers.IntegerField(source="absent")
     attendance_rate = serializers.FloatField()
+    rolling_attendance_rate = serializers.FloatField()
 
 
 class FeedbackReportSerializer(serializers.Serializer):
-    fitness_class = serializers.CharField(source="fitness_class__name")
+    fitness_class = serializers.CharField(source="name")
     average_ratings = serializers.FloatField()
     total_feedbacks = serializers.IntegerField()
     positive_feedbacks = serializers.IntegerField()
     negative_feedbacks = serializers.IntegerField()
 
 
+class RevenueReportSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    total_revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total_payments = serializers.IntegerField()
+
+
 class EmptySerializer(serializers.Serializer):
     pass
+
+
+""" REPORT JOB SERIALIZER """
+
+
+# to show a background report job with its result
+class ReportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReportJob
+        fields = [
+            "id",
+            "report",
+            "params",
+            "status",
+            "progress",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+
+
+# to list jobs without loading their (possibly large) results
+class ReportJobStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReportJob
+        fields = [
+            "id",
+            "report",
+            "params",
+            "status",
+            "progress",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+
+
+# to queue a new background report job
+class CreateReportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReportJob
+        fields = ["id", "report", "params"]
+
+    def validate_params(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError(
+                "Must be an object with from and to dates."
+            )
+        return value
+
+    def validate(self, data):
+        params = data.get("params") or {}
+        errors = {}
+        dates = {}
+
+        for name in ["from", "to"]:
+            try:
+                dates[name] = serializers.DateField().to_internal_value(params.get(name))
+            except serializers.ValidationError as exc:
+                errors[name] = exc.detail
+
+        if not errors and dates["from"] > dates["to"]:
+            errors["to"] = "Must be on or after the from date."
+
+        granularity = params.get("granularity", DEFAULT_GRANULARITY[data["report"]])
+        if granularity not in GRANULARITIES:
+            errors["granularity"] = f"Must be one of: {', '.join(GRANULARITIES)}."
+
+        if errors:
+            raise serializers.ValidationError({"params": errors})
+
+        data["params"] = {
+            "from": dates["from"].isoformat(),
+            "to": dates["to"].isoformat(),
+            "granularity": granularity,
+        }
+        return data
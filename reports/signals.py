@@ -0,0 +1,103 @@
+"""
+Keep the report rollup tables in step with the raw rows.
+pre_save remembers the stored values of an updated row so that
+post_save can move it from its old bucket to its new one.
+"""
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from classes.models import Attendance, FitnessClass
+from plans.models import Membership, Subscription, Payment
+from reviews.models import Feedback
+from reports import rollups
+from reports.cache import bump_version
+
+
+def remember_previous(instance, *fields):
+    instance._rollup_previous = None
+    if instance.pk and not instance._state.adding:
+        instance._rollup_previous = (
+            type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+        )
+
+
+""" ATTENDANCE """
+
+
+@receiver(pre_save, sender=Attendance)
+def attendance_pre_save(sender, instance, **kwargs):
+    remember_previous(instance, "fitness_class_id", "date", "status")
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_post_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_rollup_previous", None)
+    if previous == {
+        "fitness_class_id": instance.fitness_class_id,
+        "date": instance.date,
+        "status": instance.status,
+    }:
+        return
+    if previous:
+        rollups.apply_attendance(
+            previous["fitness_class_id"], previous["date"], previous["status"], -1
+        )
+    rollups.apply_attendance(
+        instance.fitness_class_id, instance.date, instance.status, 1
+    )
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_post_delete(sender, instance, **kwargs):
+    rollups.apply_attendance(
+        instance.fitness_class_id, instance.date, instance.status, -1
+    )
+
+
+""" SUBSCRIPTION """
+
+
+@receiver(pre_save, sender=Subscription)
+def subscription_pre_save(sender, instance, **kwargs):
+    remember_previous(instance, "membership_id")
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_post_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_rollup_previous", None)
+    if previous and previous["membership_id"] == instance.membership_id:
+        return
+    if previous:
+        rollups.apply_subscription(previous["membership_id"], -1)
+    rollups.apply_subscription(instance.membership_id, 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_post_delete(sender, instance, **kwargs):
+    rollups.apply_subscription(instance.membership_id, -1)
+
+
+""" REPORT CACHE VERSIONS """
+
+
+# every model a cached report reads from (directly or through a rollup)
+REPORT_SOURCE_MODELS = [
+    Attendance,
+    Feedback,
+    Subscription,
+    Payment,
+    Membership,
+    FitnessClass,
+]
+
+
+def bump_report_version(sender, **kwargs):
+    # bumped after commit so a report computed meanwhile can't be
+    # cached under the new version with the old data
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+for model in REPORT_SOURCE_MODELS:
+    post_save.connect(bump_report_version, sender=model)
+    post_delete.connect(bump_report_version, sender=model)
@@ -1,3 +1,552 @@
-from django.test import TestCase
+import gzip
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock, skipUnless
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from api import streaming
+from classes.models import FitnessClass, Attendance
+from plans.models import Membership, Subscription, Payment
+from reports import jobs
+from reports.models import AttendanceRollup, SubscriptionRollup, ReportJob
+from reports.cache import get_or_compute, bump_version
+from reports.queries import attendance_report, revenue_report
+from reports.serializers import CreateReportJobSerializer
+
+User = get_user_model()
+
 
 # Create your tests here.
+
+
+class RollupCascadeTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.member = User.objects.create_user("member@x.com", "pw")
+
+    def test_deleting_a_class_with_attendance_leaves_no_rollup(self):
+        fitness_class = FitnessClass.objects.create(
+            name="Yoga",
+            description="Stretch",
+            instructor=self.instructor,
+            schedule=date.today() - timedelta(days=1),
+            duration=60,
+            capacity=10,
+        )
+        Attendance.objects.create(
+            user=self.member,
+            fitness_class=fitness_class,
+            date=fitness_class.schedule,
+            status="PRESENT",
+        )
+        self.assertEqual(AttendanceRollup.objects.get().total_count, 1)
+
+        fitness_class.delete()
+
+        self.assertFalse(AttendanceRollup.objects.exists())
+        connection.check_constraints()
+
+    def test_deleting_a_membership_with_subscriptions_leaves_no_rollup(self):
+        membership = Membership.objects.create(
+            name="Gold", price=30, duration="MONTHLY"
+        )
+        Subscription.objects.create(
+            user=self.member,
+            membership=membership,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.assertEqual(SubscriptionRollup.objects.get().subscription_count, 1)
+
+        membership.delete()
+
+        self.assertFalse(SubscriptionRollup.objects.exists())
+        connection.check_constraints()
+
+    def test_deleting_attendance_updates_its_bucket(self):
+        fitness_class = FitnessClass.objects.create(
+            name="Spin",
+            description="Bike",
+            instructor=self.instructor,
+            schedule=date.today() - timedelta(days=1),
+            duration=45,
+            capacity=10,
+        )
+        attendance = Attendance.objects.create(
+            user=self.member,
+            fitness_class=fitness_class,
+            date=fitness_class.schedule,
+            status="ABSENT",
+        )
+
+        attendance.delete()
+
+        rollup = AttendanceRollup.objects.get()
+        self.assertEqual((rollup.total_count, rollup.absent_count), (0, 0))
+
+
+class AttendanceReportTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.member = User.objects.create_user("member@x.com", "pw")
+        self.fitness_class = FitnessClass.objects.create(
+            name="Yoga",
+            description="Stretch",
+            instructor=self.instructor,
+            schedule=date(2025, 1, 6),
+            duration=60,
+            capacity=10,
+        )
+
+    def attend(self, day, status):
+        Attendance.objects.create(
+            user=self.member, fitness_class=self.fitness_class, date=day, status=status
+        )
+
+    def test_rolling_rate_counts_weeks_without_attendance(self):
+        # present in the week of Jan 6, absent 4 weeks later, nothing between
+        self.attend(date(2025, 1, 6), "PRESENT")
+        self.attend(date(2025, 2, 3), "ABSENT")
+
+        rows = attendance_report(date(2025, 1, 6), date(2025, 2, 9), "week")
+
+        rates = {row["period"]: row["rolling_attendance_rate"] for row in rows}
+        self.assertEqual(rates, {date(2025, 1, 6): 100.0, date(2025, 2, 3): 0.0})
+
+    def test_rolling_rate_covers_the_last_four_months(self):
+        # December is five months before April, outside the window
+        self.attend(date(2024, 12, 10), "PRESENT")
+        self.attend(date(2025, 2, 10), "PRESENT")
+        self.attend(date(2025, 4, 10), "ABSENT")
+
+        rows = attendance_report(date(2025, 4, 1), date(2025, 4, 30), "month")
+
+        self.assertEqual(rows[0]["rolling_attendance_rate"], 50.0)
+
+    def test_jobs_default_to_the_granularity_of_the_endpoints(self):
+        for report, granularity in [("ATTENDANCE", "day"), ("REVENUE", "month")]:
+            serializer = CreateReportJobSerializer(
+                data={
+                    "report": report,
+                    "params": {"from": "2025-01-01", "to": "2025-01-31"},
+                }
+            )
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            self.assertEqual(
+                serializer.validated_data["params"]["granularity"], granularity
+            )
+
+
+class ReportCacheTests(TestCase):
+    def compute(self):
+        self.computed += 1
+        return {"total": self.computed}
+
+    def setUp(self):
+        self.computed = 0
+
+    def test_process_local_cache_is_bypassed(self):
+        # the test settings use LocMemCache, which other workers can't see
+        get_or_compute("Report", [Membership], {}, self.compute)
+        get_or_compute("Report", [Membership], {}, self.compute)
+        self.assertEqual(self.computed, 2)
+
+    def test_shared_cache_is_used_until_a_version_bump(self):
+        with tempfile.TemporaryDirectory() as location:
+            shared = {
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": location,
+                }
+            }
+            with override_settings(CACHES=shared):
+                get_or_compute("Report", [Membership], {}, self.compute)
+                get_or_compute("Report", [Membership], {}, self.compute)
+                self.assertEqual(self.computed, 1)
+
+                bump_version(Membership)
+                get_or_compute("Report", [Membership], {}, self.compute)
+                self.assertEqual(self.computed, 2)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin@x.com", "pw")
+        self.member = User.objects.create_user("member@x.com", "pw")
+        fitness_class = FitnessClass.objects.create(
+            name="Yoga",
+            description="Stretch",
+            instructor=self.admin,
+            schedule=date(2025, 1, 6),
+            duration=60,
+            capacity=10,
+        )
+        for day, status in [
+            (date(2025, 1, 6), "PRESENT"),
+            (date(2025, 1, 7), "ABSENT"),
+        ]:
+            Attendance.objects.create(
+                user=self.member, fitness_class=fitness_class, date=day, status=status
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def content(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_stream_csv_writes_headers_and_rows(self):
+        rows = [{"id": 1, "user__email": "a@x.com"}, {"id": 2, "user__email": "b,c"}]
+
+        response = streaming.stream_csv(rows, ["id", ("email", "user__email")], "rows")
+
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="rows.csv"'
+        )
+        self.assertEqual(
+            self.content(response).decode(), 'id,email\r\n1,a@x.com\r\n2,"b,c"\r\n'
+        )
+
+    def test_gzip_csv_round_trips(self):
+        rows = [{"id": i, "name": f"row {i}"} for i in range(500)]
+        plain = self.content(streaming.stream_csv(rows, ["id", "name"], "rows"))
+
+        # flush often, so the compressor sees many small chunks
+        with mock.patch("api.streaming.CSV_FLUSH_SIZE", 100):
+            response = streaming.stream_csv(rows, ["id", "name"], "rows", compress=True)
+            compressed = self.content(response)
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="rows.csv.gz"'
+        )
+        self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_export_streams_a_dataset_as_csv(self):
+        response = self.client.get(
+            "/api/v1/reports/export/", {"dataset": "attendance", "format": "csv"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="attendance.csv"'
+        )
+        lines = self.content(response).decode().splitlines()
+        self.assertEqual(
+            lines[0],
+            "id,user_id,user_email,fitness_class_id,fitness_class,date,status",
+        )
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(
+            lines[1].endswith(
+                ",member@x.com,{},Yoga,2025-01-06,PRESENT".format(
+                    Attendance.objects.first().fitness_class_id
+                )
+            )
+        )
+
+    def test_export_gzip_matches_the_csv(self):
+        params = {"dataset": "attendance", "from": "2025-01-07"}
+        plain = self.content(
+            self.client.get("/api/v1/reports/export/", {**params, "format": "csv"})
+        )
+        response = self.client.get(
+            "/api/v1/reports/export/", {**params, "format": "csv.gz"}
+        )
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertEqual(gzip.decompress(self.content(response)), plain)
+        self.assertEqual(len(plain.decode().splitlines()), 2)
+
+    def test_export_rejects_unknown_datasets_and_formats(self):
+        response = self.client.get(
+            "/api/v1/reports/export/", {"dataset": "users", "format": "csv"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(
+            "/api/v1/reports/export/", {"dataset": "attendance", "format": "json"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_reports_download_as_csv(self):
+        response = self.client.get(
+            "/api/v1/reports/AttendanceReport/",
+            {"from": "2025-01-01", "to": "2025-01-31", "format": "csv"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        lines = self.content(response).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+
+class RevenueReportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin@x.com", "pw")
+        membership = Membership.objects.create(
+            name="Gold", price=30, duration="MONTHLY"
+        )
+        subscription = Subscription.objects.create(
+            user=self.admin,
+            membership=membership,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 31),
+        )
+        for amount, status, day in [
+            (10, "COMPLETED", date(2025, 1, 1)),
+            (20, "COMPLETED", date(2025, 1, 2)),
+            (40, "COMPLETED", date(2025, 1, 8)),
+            (80, "COMPLETED", date(2025, 2, 3)),
+            (1000, "PENDING", date(2025, 1, 2)),
+            (500, "FAILED", date(2025, 1, 8)),
+        ]:
+            payment = Payment.objects.create(
+                user=self.admin, subscription=subscription, amount=amount, status=status
+            )
+            Payment.objects.filter(pk=payment.pk).update(
+                payment_date=timezone.make_aware(
+                    datetime(day.year, day.month, day.day, 12)
+                )
+            )
+
+    def totals(self, granularity):
+        rows = revenue_report(date(2025, 1, 1), date(2025, 2, 28), granularity)
+        return {
+            row["period"]: (row["total_revenue"], row["total_payments"]) for row in rows
+        }
+
+    def test_daily_buckets(self):
+        self.assertEqual(
+            self.totals("day"),
+            {
+                date(2025, 1, 1): (Decimal("10"), 1),
+                date(2025, 1, 2): (Decimal("20"), 1),
+                date(2025, 1, 8): (Decimal("40"), 1),
+                date(2025, 2, 3): (Decimal("80"), 1),
+            },
+        )
+
+    def test_weekly_buckets_start_on_monday(self):
+        self.assertEqual(
+            self.totals("week"),
+            {
+                date(2024, 12, 30): (Decimal("30"), 2),
+                date(2025, 1, 6): (Decimal("40"), 1),
+                date(2025, 2, 3): (Decimal("80"), 1),
+            },
+        )
+
+    def test_monthly_buckets(self):
+        self.assertEqual(
+            self.totals("month"),
+            {
+                date(2025, 1, 1): (Decimal("70"), 3),
+                date(2025, 2, 1): (Decimal("80"), 1),
+            },
+        )
+
+    def test_window_limits_the_payments_read(self):
+        rows = revenue_report(date(2025, 1, 2), date(2025, 1, 8), "month")
+
+        self.assertEqual(
+            [(row["total_revenue"], row["total_payments"]) for row in rows],
+            [(Decimal("60"), 2)],
+        )
+
+    def test_endpoint_validates_the_window_and_granularity(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        response = client.get(
+            "/api/v1/reports/RevenueReport/",
+            {"from": "2025-01-01", "to": "2025-02-28", "granularity": "month"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["total_payments"] for row in response.data], [3, 1])
+
+        response = client.get(
+            "/api/v1/reports/RevenueReport/",
+            {"from": "2025-01-01", "to": "2025-02-28", "granularity": "year"},
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = client.get("/api/v1/reports/RevenueReport/")
+        self.assertEqual(response.status_code, 400)
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin@x.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_job(self, report="REVENUE", **params):
+        return ReportJob.objects.create(
+            requested_by=self.admin,
+            report=report,
+            params={"from": "2025-01-01", "to": "2025-03-15", **params},
+        )
+
+    def test_create_queues_a_pending_job(self):
+        response = self.client.post(
+            "/api/v1/report-jobs/",
+            {"report": "REVENUE", "params": {"from": "2025-01-01", "to": "2025-01-31"}},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "PENDING")
+        job = ReportJob.objects.get()
+        self.assertEqual(job.requested_by, self.admin)
+        self.assertEqual(
+            job.params,
+            {"from": "2025-01-01", "to": "2025-01-31", "granularity": "month"},
+        )
+
+    def test_create_rejects_invalid_params(self):
+        for params in [["x"], "abc", 5, {"from": "2025-02-01", "to": "2025-01-01"}]:
+            response = self.client.post(
+                "/api/v1/report-jobs/",
+                {"report": "REVENUE", "params": params},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn("params", response.data)
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_jobs_are_claimed_oldest_first(self):
+        first = self.create_job()
+        second = self.create_job()
+        self.create_job().delete()
+        ReportJob.objects.filter(pk=second.pk).update(status="COMPLETED")
+        third = self.create_job()
+
+        claimed = jobs.claim_next_job()
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual(claimed.status, "RUNNING")
+        self.assertIsNotNone(claimed.started_at)
+
+        self.assertEqual(jobs.claim_next_job().pk, third.pk)
+        self.assertIsNone(jobs.claim_next_job())
+
+    def test_revenue_job_reports_progress_per_chunk(self):
+        membership = Membership.objects.create(
+            name="Gold", price=30, duration="MONTHLY"
+        )
+        subscription = Subscription.objects.create(
+            user=self.admin,
+            membership=membership,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 31),
+        )
+        # Friday Jan 31 and Saturday Feb 1 fall in two chunks but one week
+        for amount, day in [(10, date(2025, 1, 31)), (20, date(2025, 2, 1))]:
+            payment = Payment.objects.create(
+                user=self.admin, subscription=subscription, amount=amount
+            )
+            Payment.objects.filter(pk=payment.pk).update(
+                status="COMPLETED",
+                payment_date=timezone.make_aware(
+                    datetime(day.year, day.month, day.day, 12)
+                ),
+            )
+        self.create_job(granularity="week")
+        job = jobs.claim_next_job()
+
+        progress = []
+        set_progress = jobs.set_progress
+
+        def record(job, done, total):
+            set_progress(job, done, total)
+            progress.append(job.progress)
+
+        with mock.patch("reports.jobs.set_progress", record):
+            job = jobs.run_job(job)
+
+        self.assertEqual(progress, [33, 66, 100])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress), ("COMPLETED", 100))
+        self.assertEqual(
+            job.result["rows"],
+            [{"period": "2025-01-27", "total_revenue": "30.00", "total_payments": 2}],
+        )
+
+    def test_failed_runner_marks_the_job_failed(self):
+        self.create_job()
+        job = jobs.claim_next_job()
+
+        def fail(job):
+            raise RuntimeError("boom")
+
+        with mock.patch.dict(jobs.RUNNERS, {"REVENUE": fail}):
+            with self.assertLogs("reports.jobs", "ERROR"):
+                jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ("FAILED", "boom"))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_worker_runs_pending_and_stale_jobs_once(self):
+        pending = self.create_job()
+        stale = self.create_job()
+        ReportJob.objects.filter(pk=stale.pk).update(
+            status="RUNNING", updated_at=timezone.now() - timedelta(hours=1)
+        )
+        fresh = self.create_job()
+        ReportJob.objects.filter(pk=fresh.pk).update(status="RUNNING")
+
+        out = StringIO()
+        # closing the connection would end the transaction of the test
+        with mock.patch(
+            "reports.management.commands.run_report_worker.close_old_connections"
+        ):
+            call_command("run_report_worker", "--once", stdout=out)
+
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [f"Report job {pending.pk} completed", f"Report job {stale.pk} completed"],
+        )
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, "RUNNING")
+
+
+@skipUnless(
+    connection.features.has_select_for_update_skip_locked,
+    "SKIP LOCKED is not supported by this database",
+)
+class ReportJobQueueLockTests(TransactionTestCase):
+    def test_a_locked_job_is_skipped(self):
+        admin = User.objects.create_superuser("admin@x.com", "pw")
+        first, second = [
+            ReportJob.objects.create(
+                requested_by=admin,
+                report="REVENUE",
+                params={"from": "2025-01-01", "to": "2025-01-31"},
+            )
+            for _ in range(2)
+        ]
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            with transaction.atomic():
+                ReportJob.objects.select_for_update().get(pk=first.pk)
+                locked.set()
+                release.wait(10)
+            connection.close()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        locked.wait(10)
+        try:
+            self.assertEqual(jobs.claim_next_job().pk, second.pk)
+        finally:
+            release.set()
+            thread.join()
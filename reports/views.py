@@ -2,15 +2,34 @@ from reports.serializers import (
     MembershipReportSerializer,
     AttendanceReportSerializer,
     FeedbackReportSerializer,
+    RevenueReportSerializer,
     EmptySerializer,
+    ReportJobSerializer,
+    ReportJobStatusSerializer,
+    CreateReportJobSerializer,
 )
-from plans.models import Membership
-from classes.models import Attendance
+from plans.models import Membership, Subscription, Payment
+from classes.models import Attendance, FitnessClass
 from reviews.models import Feedback
+from reports.models import AttendanceRollup, ReportJob
+from reports.cache import cached_report, get_stats
+from reports import queries
+from reports.exports import DATASETS, get_dataset_queryset, column_keys
+from api.renderers import NDJSONRenderer, CSVRenderer, GzipCSVRenderer
+from api.streaming import (
+    STREAM_CHUNK_SIZE,
+    iter_rows,
+    serializer_columns,
+    stream_csv,
+    stream_ndjson,
+)
+from api.utils import get_date_param
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from rest_framework import status
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAdminUser
 from rest_framework.decorators import action
-from django.db.models import Count, Avg, Sum, Q, F
 from rest_framework.response import Response
 
 # Create your views here.
@@ -20,19 +39,34 @@ class ReportViewSet(ModelViewSet):
     """
     API endpoints for managing Report
      - Allow authenticated Admin to generate reports for
-        membership, attendance and feedback
+        membership, attendance, feedback and revenue
+     - Reports are read from the rollup tables in reports/models.py and
+        the rating aggregates on FitnessClass, not from the raw
+        subscription, attendance and feedback rows
+     - Results are cached until one of their source models is written
+     - Every report can be downloaded with ?format=csv or ?format=csv.gz,
+        and the raw datasets are streamed by the export endpoint
     """
 
+    replica_ok = True
+
     permission_classes = [IsAdminUser]
     http_method_names = ["get"]
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + [
+        CSVRenderer,
+        GzipCSVRenderer,
+        NDJSONRenderer,
+    ]
 
     def get_queryset(self):
         if self.action == "MembershipReport":
             return Membership.objects.all()
         if self.action == "AttendanceReport":
-            return Attendance.objects.all()
+            return AttendanceRollup.objects.all()
         if self.action == "FeedbackReport":
-            return Feedback.objects.all()
+            return FitnessClass.objects.filter(rating_count__gt=0)
+        if self.action == "RevenueReport":
+            return Payment.objects.filter(status="COMPLETED")
 
     def get_serializer_class(self):
         if self.action == "MembershipReport":
@@ -41,49 +75,161 @@ class ReportViewSet(ModelViewSet):
             return AttendanceReportSerializer
         if self.action == "FeedbackReport":
             return FeedbackReportSerializer
+        if self.action == "RevenueReport":
+            return RevenueReportSerializer
         return EmptySerializer
 
+    def get_report_window(self, request, default_granularity):
+        """Required ?from= / ?to= dates and the ?granularity= of a report."""
+        start = get_date_param(request, "from", required=True)
+        end = get_date_param(request, "to", required=True)
+        granularity = request.query_params.get("granularity", default_granularity)
+
+        if start > end:
+            raise ValidationError({"to": "Must be on or after the from date."})
+        if granularity not in queries.GRANULARITIES:
+            raise ValidationError(
+                {"granularity": f"Must be one of: {', '.join(queries.GRANULARITIES)}."}
+            )
+        return start, end, granularity
+
+    def report_response(self, report_data, filename):
+        """Serialize report rows, or stream them for CSV downloads."""
+        serializer_class = self.get_serializer_class()
+        export_format = self.request.accepted_renderer.format
+
+        if export_format in [CSVRenderer.format, GzipCSVRenderer.format]:
+            if hasattr(report_data, "iterator"):
+                report_data = report_data.iterator(chunk_size=STREAM_CHUNK_SIZE)
+            return stream_csv(
+                report_data,
+                serializer_columns(serializer_class),
+                filename,
+                compress=export_format == GzipCSVRenderer.format,
+            )
+
+        serializer = serializer_class(report_data, many=True)
+        return Response(serializer.data)
+
     @action(detail=False, methods=["get"])
+    @cached_report(Subscription, Membership)
     def MembershipReport(self, request):
-        report_data = Membership.objects.values("duration").annotate(
-            total_members=Count("subscriptions"),
-            total_revenue=Sum("subscriptions__membership__price"),
-        )
-        serializer = MembershipReportSerializer(report_data, many=True)
-        return Response(serializer.data)
+        report_data = queries.membership_report()
+        return self.report_response(report_data, "membership_report")
 
     @action(detail=False, methods=["get"])
+    @cached_report(Attendance, FitnessClass)
     def AttendanceReport(self, request):
-        queryset = Attendance.objects.all()
+        """
+        Per class attendance per day, week or month (?granularity=) with a
+        rolling attendance rate over the last 4 buckets. ?from= and ?to=
+        are required, from is rounded down to the start of its bucket.
+        """
+        start, end, granularity = self.get_report_window(
+            request, queries.DEFAULT_GRANULARITY["ATTENDANCE"]
+        )
 
-        """ SHOWING PER CALSS ATTENDANCE REPORT """
+        report_data = queries.attendance_report(
+            queries.bucket_start(start, granularity), end, granularity
+        )
+        return self.report_response(report_data, "attendance_report")
 
-        report_data = (
-            queryset.values("date", "fitness_class__name")
-            .annotate(
-                present_count=Count("id", filter=Q(status="PRESENT")),
-                absent_count=Count("id", filter=Q(status="ABSENT")),
-                total=Count("id"),
-            )
-            .annotate(attendance_rate=(F("present_count") * 100.0) / F("total"))
-            .order_by("-date")
+    @action(detail=False, methods=["get"])
+    @cached_report(Feedback, FitnessClass)
+    def FeedbackReport(self, request):
+        report_data = queries.feedback_report()
+        return self.report_response(report_data, "feedback_report")
+
+    @action(detail=False, methods=["get"])
+    @cached_report(Payment)
+    def RevenueReport(self, request):
+        """
+        Money actually received (completed payments) per day, week or month.
+        ?from= and ?to= are required so only the requested window is read
+        through the (status, payment_date) index.
+        """
+        start, end, granularity = self.get_report_window(
+            request, queries.DEFAULT_GRANULARITY["REVENUE"]
         )
 
-        serializer = AttendanceReportSerializer(report_data, many=True)
-        return Response(serializer.data)
+        report_data = queries.revenue_report(start, end, granularity)
+        return self.report_response(report_data, "revenue_report")
 
     @action(detail=False, methods=["get"])
-    def FeedbackReport(self, request):
-        report_data = (
-            Feedback.objects.values("fitness_class__name")
-            .annotate(
-                average_ratings=Avg("ratings"),
-                total_feedbacks=Count("id"),
-                positive_feedbacks=Count("id", filter=Q(ratings__gte=4)),
-                negative_feedbacks=Count("id", filter=Q(ratings__lte=2)),
+    def export(self, request):
+        """
+        Stream a raw dataset: ?dataset=attendance|feedback|subscriptions|payments
+        with ?format=csv, csv.gz or ndjson and optional ?from= / ?to= dates.
+        """
+        dataset = DATASETS.get(request.query_params.get("dataset"))
+        if dataset is None:
+            raise ValidationError(
+                {"dataset": f"Must be one of: {', '.join(DATASETS)}."}
             )
-            .order_by("-average_ratings")
+
+        export_format = request.accepted_renderer.format
+        if export_format not in [
+            CSVRenderer.format,
+            GzipCSVRenderer.format,
+            NDJSONRenderer.format,
+        ]:
+            raise ValidationError({"format": "Use csv, csv.gz or ndjson."})
+
+        queryset = get_dataset_queryset(
+            dataset,
+            get_date_param(request, "from"),
+            get_date_param(request, "to"),
         )
+        filename = request.query_params["dataset"]
 
-        serializer = FeedbackReportSerializer(report_data, many=True)
-        return Response(serializer.data)
+        if export_format == NDJSONRenderer.format:
+            rows = iter_rows(queryset, column_keys(dataset["columns"]))
+            return stream_ndjson(rows, filename=f"{filename}.ndjson")
+        return stream_csv(
+            iter_rows(queryset, column_keys(dataset["columns"])),
+            dataset["columns"],
+            filename,
+            compress=export_format == GzipCSVRenderer.format,
+        )
+
+    @action(detail=False, methods=["get"], url_path="cache-stats")
+    def cache_stats(self, request):
+        return Response(get_stats())
+
+
+class ReportJobViewSet(ModelViewSet):
+    """
+    API endpoints for background report jobs
+     - Allow authenticated Admin to queue a long running report (POST),
+        it is computed by `python manage.py run_report_worker`
+     - Allow authenticated Admin to poll the status, progress and
+        result of their jobs (GET)
+    """
+
+    permission_classes = [IsAdminUser]
+    http_method_names = ["get", "post"]
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            # Return empty queryset during schema generation
+            return ReportJob.objects.none()
+
+        queryset = ReportJob.objects.filter(requested_by=self.request.user)
+        if self.action == "list":
+            queryset = queryset.defer("result")
+        return queryset.order_by("-created_at")
+
+    def get_serializer_class(self):
+        if self.request.method == "POST":
+            return CreateReportJobSerializer
+        if self.action == "list":
+            return ReportJobStatusSerializer
+        return ReportJobSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(requested_by=request.user)
+        return Response(
+            ReportJobStatusSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
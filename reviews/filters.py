@@ -0,0 +1,15 @@
+from django_filters import rest_framework as filters
+from reviews.models import Feedback
+from api.filters import DayRangeFilter
+
+
+class FeedbackFilter(filters.FilterSet):
+    # feedback_class_created_idx, feedback_user_created_idx
+    created_at = DayRangeFilter()
+    ratings = filters.RangeFilter()
+    fitness_class = filters.NumberFilter()
+    user = filters.NumberFilter()
+
+    class Meta:
+        model = Feedback
+        fields = ["fitness_class", "user", "ratings", "created_at"]
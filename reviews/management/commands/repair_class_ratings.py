@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from classes.models import FitnessClass
+from reviews.ratings import recompute_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute the rating aggregates of fitness classes from their feedback"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "class_ids",
+            nargs="*",
+            type=int,
+            help="Only repair these fitness classes (default: all)",
+        )
+
+    def handle(self, *args, **options):
+        queryset = FitnessClass.objects.all()
+        if options["class_ids"]:
+            queryset = queryset.filter(pk__in=options["class_ids"])
+
+        updated = recompute_ratings(queryset)
+        self.stdout.write(self.style.SUCCESS(f"Repaired ratings of {updated} classes."))
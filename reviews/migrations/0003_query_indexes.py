@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 09:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0015_query_indexes"),
+        ("reviews", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="feedback",
+            index=models.Index(
+                fields=["fitness_class", "-created_at"],
+                name="feedback_class_created_idx",
+            ),
+        ),
+    ]
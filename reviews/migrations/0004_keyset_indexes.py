@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 09:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("classes", "0016_keyset_indexes"),
+        ("reviews", "0003_query_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="feedback",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="feedback_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feedback",
+            index=models.Index(
+                fields=["created_at", "id"], name="feedback_created_id_idx"
+            ),
+        ),
+    ]
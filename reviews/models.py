@@ -21,5 +21,18 @@ class Feedback(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # feedback of a class, newest first
+            models.Index(
+                fields=["fitness_class", "-created_at"], name="feedback_class_created_idx"
+            ),
+            # keyset pages of the feedback, newest first
+            models.Index(
+                fields=["user", "created_at", "id"], name="feedback_user_created_idx"
+            ),
+            models.Index(fields=["created_at", "id"], name="feedback_created_id_idx"),
+        ]
+
     def __str__(self):
         return f"Sent by {self.user.first_name} on {self.ratings}"
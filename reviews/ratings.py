@@ -0,0 +1,43 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from classes.models import FitnessClass
+from reviews.models import Feedback
+
+
+def apply_rating(fitness_class_id, ratings, sign):
+    """Add (sign=1) or remove (sign=-1) one rating from a class's aggregates."""
+    histogram_field = f"rating_{ratings}_count"
+    FitnessClass.objects.filter(pk=fitness_class_id).update(
+        rating_sum=F("rating_sum") + sign * ratings,
+        rating_count=F("rating_count") + sign,
+        **{histogram_field: F(histogram_field) + sign},
+    )
+
+
+def rating_subquery(aggregate):
+    return Coalesce(
+        Subquery(
+            Feedback.objects.filter(fitness_class=OuterRef("pk"))
+            .values("fitness_class")
+            .annotate(value=aggregate)
+            .values("value")
+        ),
+        0,
+    )
+
+
+def recompute_ratings(queryset=None):
+    """Recompute the rating aggregates of the given classes from Feedback."""
+    if queryset is None:
+        queryset = FitnessClass.objects.all()
+
+    return queryset.update(
+        rating_sum=rating_subquery(Sum("ratings")),
+        rating_count=rating_subquery(Count("id")),
+        **{
+            f"rating_{stars}_count": rating_subquery(
+                Count("id", filter=Q(ratings=stars))
+            )
+            for stars in range(1, 6)
+        },
+    )
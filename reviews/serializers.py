@@ -2,6 +2,7 @@ from rest_framework import serializers
 from reviews.models import Feedback
 from classes.models import FitnessClass
 from django.contrib.auth import get_user_model
+from api.fieldsets import SparseFieldsMixin
 
 User = get_user_model()
 
@@ -28,7 +29,7 @@ class SimpleFitnessClassSerializer(serializers.ModelSerializer):
         ]
 
 
-class FeedbackSerializer(serializers.ModelSerializer):
+class FeedbackSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = SimpleUserSerializer(read_only=True)
     fitness_class = SimpleFitnessClassSerializer(read_only=True)
 
@@ -0,0 +1,39 @@
+"""
+Keep the rating aggregates on FitnessClass in step with Feedback.
+pre_save remembers the stored rating of an updated feedback so that
+post_save can replace it instead of counting it twice.
+"""
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from reviews.models import Feedback
+from reviews.ratings import apply_rating
+
+
+@receiver(pre_save, sender=Feedback)
+def feedback_pre_save(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk and not instance._state.adding:
+        instance._previous_rating = (
+            Feedback.objects.filter(pk=instance.pk)
+            .values("fitness_class_id", "ratings")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Feedback)
+def feedback_post_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_rating", None)
+    if previous == {
+        "fitness_class_id": instance.fitness_class_id,
+        "ratings": instance.ratings,
+    }:
+        return
+    if previous:
+        apply_rating(previous["fitness_class_id"], previous["ratings"], -1)
+    apply_rating(instance.fitness_class_id, instance.ratings, 1)
+
+
+@receiver(post_delete, sender=Feedback)
+def feedback_post_delete(sender, instance, **kwargs):
+    apply_rating(instance.fitness_class_id, instance.ratings, -1)
@@ -1,3 +1,63 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from classes.models import FitnessClass
+from reviews.models import Feedback
+
+User = get_user_model()
+
 
 # Create your tests here.
+
+
+class FeedbackListQueryTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user("staff@x.com", "pw", is_staff=True)
+        self.admin = User.objects.create_superuser("admin@x.com", "pw")
+        self.members = [
+            User.objects.create_user(f"member{number}@x.com", "pw")
+            for number in range(5)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def add_feedback(self, count):
+        for number in range(count):
+            fitness_class = FitnessClass.objects.create(
+                name=f"Class {number}",
+                description="Class",
+                instructor=self.instructor,
+                schedule=timezone.now().date() - timedelta(days=number + 1),
+                duration=60,
+                capacity=10,
+            )
+            Feedback.objects.create(
+                user=self.members[number % len(self.members)],
+                fitness_class=fitness_class,
+                ratings=5,
+                comment="Great",
+            )
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/feedback/")
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data["results"]
+
+    def test_feedback_list_does_not_query_per_row(self):
+        self.add_feedback(1)
+        one_row, results = self.list_queries()
+        self.assertEqual(len(results), 1)
+
+        self.add_feedback(8)
+        many_rows, results = self.list_queries()
+        self.assertEqual(len(results), 9)
+
+        self.assertEqual(one_row, many_rows)
+        newest = Feedback.objects.latest("created_at", "id")
+        self.assertEqual(results[0]["user"]["email"], newest.user.email)
+        self.assertEqual(results[0]["fitness_class"]["name"], newest.fitness_class.name)
@@ -8,11 +8,14 @@ from reviews.models import Feedback
 from rest_framework.response import Response
 from reviews.permissions import IsReadOnly, IsWriteOnly
 from rest_framework.decorators import action
+from api.pagination import KeysetPagination
+from api.fieldsets import SparseFieldsViewMixin
+from reviews.filters import FeedbackFilter
 
 # Create your views here.
 
 
-class FeedbackViewSet(ModelViewSet):
+class FeedbackViewSet(SparseFieldsViewMixin, ModelViewSet):
     """
     API endpoints for managing feedback
      - Allow authenticated admin to view all feedbacks
@@ -21,7 +24,10 @@ class FeedbackViewSet(ModelViewSet):
     """
     
     serializer_class = FeedbackSerializer
+    filterset_class = FeedbackFilter
     http_method_names = ["post", "get", "delete", "patch"]
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-created_at", "-id")
 
     def get_permissions(self):
         user = self.request.user
@@ -40,9 +46,13 @@ class FeedbackViewSet(ModelViewSet):
         if user.is_superuser:
             return Feedback.objects.select_related("user", "fitness_class").all()
         if user.is_staff:
-            return Feedback.objects.filter(fitness_class__instructor=user)
+            return Feedback.objects.select_related("user", "fitness_class").filter(
+                fitness_class__instructor=user
+            )
         if user.is_active:
-            return Feedback.objects.filter(user=user)
+            return Feedback.objects.select_related("user", "fitness_class").filter(
+                user=user
+            )
         return Feedback.objects.select_related("user", "fitness_class").all()
 
     """
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 09:30
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import migrations
+from django.db.models import TextField
+from django.db.models.functions import Cast, Upper
+
+
+def email_index():
+    # same expression as the lhs of email__icontains on Postgres
+    return GinIndex(
+        OpClass(Upper(Cast("email", TextField())), name="gin_trgm_ops"),
+        name="user_email_trgm_idx",
+    )
+
+
+def add_search_index(apps, schema_editor):
+    """Postgres only: trigram index for substring searches on the email."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.add_index(apps.get_model("users", "User"), email_index())
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(apps.get_model("users", "User"), email_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]